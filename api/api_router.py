@@ -3,8 +3,12 @@ from fastapi import APIRouter
 from .endpoints.chat import router as chat_router
 from .endpoints.health import router as health_router
 from .endpoints.tts import router as tts_router
+from .endpoints.loan import router as loan_router
+from .endpoints.bundle import router as bundle_router
 
 api_router = APIRouter()
 api_router.include_router(health_router, prefix="/health", tags=["health"])
 api_router.include_router(chat_router,   prefix="/chat",   tags=["chat"])   
-api_router.include_router(tts_router,    prefix="/tts",    tags=["tts"]) 
+api_router.include_router(tts_router,    prefix="/tts",    tags=["tts"])
+api_router.include_router(loan_router,   prefix="/loan",   tags=["loan"])
+api_router.include_router(bundle_router, prefix="/bundle", tags=["bundle"])
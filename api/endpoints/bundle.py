@@ -0,0 +1,18 @@
+# api/endpoints/bundle.py
+from fastapi import APIRouter, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from src.tools.offline_bundle import offline_bundle_builder
+
+router = APIRouter()
+
+@router.get("", summary="Gói câu trả lời ngoại tuyến cho kiosk")
+async def get_bundle(request: Request):
+    bundle = await run_in_threadpool(offline_bundle_builder.get)
+    etag = f'"{bundle["version"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # Kiosk đã có đúng phiên bản này -> 304, không gửi lại
+    if request.headers.get("if-none-match", "").strip() == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(bundle, headers=headers)
@@ -1,8 +1,27 @@
 # api/endpoints/health.py
 from fastapi import APIRouter
 
+from src.core.cache import cache, answer_memo
+from src.tools.registry import tool_registry
+from src.services.tts_cache import tts_audio_cache
+from src.services.tts_service import tts_pool
+from src.generation.llm_gateway import llm_gateway
+from src.generation.extractive import extractive_answerer
+
 router = APIRouter()
 
 @router.get("", tags=["Health"], summary="Health Check") 
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/stats", tags=["Health"], summary="Tool & cache statistics")
+def health_stats():
+    return {
+        "tools": tool_registry.stats(),
+        "cache": cache.stats(),
+        "answer_memo": answer_memo.stats(),
+        "tts_cache": tts_audio_cache.stats(),
+        "tts_pool": tts_pool.stats(),
+        "llm": llm_gateway.stats(),
+        "extractive": extractive_answerer.stats(),
+    }
@@ -0,0 +1,42 @@
+# api/endpoints/loan.py
+from fastapi import APIRouter, HTTPException, Response
+from api.schemas.loan import LoanScheduleRequest, LoanScheduleResponse
+from src.tools.amortization import amortization_engine, RatePlan, METHODS, SCHEDULE_COLUMNS
+from src.tools.interest_service import interest_service
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _resolve_plan(req: LoanScheduleRequest) -> RatePlan:
+    # Lãi suất nhập tay -> ưu tiên; nếu không thì dùng kế hoạch lãi suất của gói vay
+    if req.annual_rate_percent:
+        return RatePlan(
+            promo_rate=req.annual_rate_percent,
+            promo_months=req.promo_months,
+            float_rate=req.float_rate_percent,
+        )
+    loan_key = interest_service.find_best_match_loan(req.loan_type or "")
+    loan_info = interest_service.loan_rates.get(loan_key, {}) if loan_key else {}
+    if not loan_info:
+        raise HTTPException(status_code=422, detail="Cần annual_rate_percent hoặc loan_type hợp lệ")
+    return interest_service.get_loan_rate_plan(loan_info)
+
+@router.post("/schedule", summary="Lịch trả nợ theo tháng (JSON/CSV)", response_model=LoanScheduleResponse)
+async def loan_schedule(req: LoanScheduleRequest):
+    if req.method not in METHODS:
+        raise HTTPException(status_code=422, detail=f"method phải là một trong {METHODS}")
+
+    plan = _resolve_plan(req)
+    try:
+        sched = amortization_engine.schedule(req.principal, plan, req.term_months, req.method)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if req.format.lower() == "csv":
+        return Response(
+            content=sched.to_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="loan_schedule.csv"'},
+        )
+    return LoanScheduleResponse(summary=sched.summary(), columns=list(SCHEDULE_COLUMNS), rows=sched.to_rows())
@@ -1,10 +1,17 @@
 # api/endpoints/tts.py
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
+import asyncio
 import logging
 
-from src.services.tts_service import TTSService, TTSConfig
+from config.config import settings
+from src.core.cache import answer_memo
+from src.services.tts_service import TTSConfig, tts_pool
+from src.services.tts_cache import tts_audio_cache, audio_key, normalize_text
+from src.services.text_segmenter import split_segments, StreamingSegmenter
+from src.services.audio_frames import encode_frame, MEDIA_TYPE as FRAMES_MEDIA_TYPE
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -22,33 +29,161 @@ class TTSRequest(BaseModel):
     provider: str | None = Field(None, description="google | gtts | auto")
 
 
+def _content_type(audio: bytes, audio_encoding: str) -> str:
+    # Nhận dạng theo magic bytes: provider dự phòng có thể trả định dạng khác yêu cầu
+    if audio[:4] == b"RIFF":
+        return "audio/wav"
+    if audio[:4] == b"OggS":
+        return "audio/ogg"
+    if audio[:3] == b"ID3" or (len(audio) > 1 and audio[0] == 0xFF and audio[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    enc = audio_encoding.upper()
+    return "audio/mpeg" if enc == "MP3" else ("audio/ogg" if enc == "OGG_OPUS" else "audio/wav")
+
+
+def _synthesize(text: str, cfg: TTSConfig):
+    result = tts_pool.synthesize(text, cfg)
+    return result.audio, result.cacheable
+
+
+def _config(req: TTSRequest) -> TTSConfig:
+    return TTSConfig(
+        provider=req.provider,
+        language_code=req.language_code,
+        voice_name=req.voice_name,
+        speaking_rate=req.speaking_rate,
+        pitch=req.pitch,
+        audio_encoding=req.audio_encoding,
+    )
+
+
+def _request_key(req: TTSRequest, text: str) -> str:
+    return audio_key(text, req.language_code, req.voice_name, req.speaking_rate, req.pitch, req.audio_encoding)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
 @router.post("/speak", summary="Tổng hợp giọng nói tiếng Việt", tags=["TTS"], response_class=Response)
 # Chuyển sang 'async def' để không block server
-async def speak(req: TTSRequest):
+async def speak(req: TTSRequest, request: Request):
+    # 1. Chuẩn hóa văn bản -> khóa nội dung (cũng là ETag)
+    text = normalize_text(req.text)
+    if not text:
+        raise HTTPException(status_code=422, detail="Văn bản rỗng sau khi chuẩn hóa")
+    key = _request_key(req, text)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+
+    # 2. Client đã có đúng audio này -> 304, không cần gửi lại
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
     try:
-        # 1. Tạo config từ request
-        cfg = TTSConfig(
-            provider=req.provider,
-            language_code=req.language_code,
-            voice_name=req.voice_name,
-            speaking_rate=req.speaking_rate,
-            pitch=req.pitch,
-            audio_encoding=req.audio_encoding,
-        )
-        
-        # 2. Khởi tạo service
-        service = TTSService(cfg)
-        
-        # 3. Chạy hàm 'synthesize' (blocking) trong threadpool
-        #    để không làm treo server.
-        audio_bytes = await run_in_threadpool(service.synthesize, req.text)
-        
-        # 4. Trả về audio
-        content_type = "audio/mpeg" if req.audio_encoding.upper() == "MP3" else (
-            "audio/ogg" if req.audio_encoding.upper() == "OGG_OPUS" else "audio/wav"
+        # 3. Cache (bộ nhớ -> đĩa); chỉ tổng hợp khi chưa có.
+        #    Hàm 'synthesize' là blocking nên chạy trong threadpool.
+        cfg = _config(req)
+        audio_bytes, cacheable = await run_in_threadpool(
+            tts_audio_cache.get_or_synthesize, key, lambda: _synthesize(text, cfg)
         )
-        return Response(content=audio_bytes, media_type=content_type)
-        
+        if not cacheable:
+            # Audio thay thế: không gắn ETag để client không giữ lại bản im lặng
+            headers = {"Cache-Control": "no-store"}
+        return Response(content=audio_bytes, media_type=_content_type(audio_bytes, req.audio_encoding),
+                        headers=headers)
+
     except Exception as e:
         logger.error(f"TTS error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"TTS error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"TTS error: {e}")
+
+
+@router.post("/stream", summary="TTS theo từng câu (streaming)", tags=["TTS"])
+async def speak_stream(req: TTSRequest):
+    """
+    Tách văn bản thành câu/mệnh đề, tổng hợp song song (giới hạn TTS_STREAM_CONCURRENCY)
+    và trả về từng đoạn audio theo đúng thứ tự (xem src/services/audio_frames.py).
+    Client phát được ngay khi nhận xong đoạn đầu tiên.
+    """
+    segments = split_segments(req.text, max_chars=settings.TTS_SEGMENT_MAX_CHARS)
+    if not segments:
+        raise HTTPException(status_code=422, detail="Văn bản rỗng sau khi chuẩn hóa")
+    cfg = _config(req)
+    sem = asyncio.Semaphore(settings.TTS_STREAM_CONCURRENCY)
+
+    async def synth(text: str) -> bytes:
+        async with sem:
+            audio, _ = await run_in_threadpool(
+                tts_audio_cache.get_or_synthesize, _request_key(req, text), lambda: _synthesize(text, cfg)
+            )
+            return audio
+
+    async def frames():
+        # Tạo task cho mọi đoạn ngay từ đầu; semaphore giữ số lời gọi TTS đồng thời
+        tasks = [asyncio.create_task(synth(t)) for t in segments]
+        try:
+            for i, task in enumerate(tasks):
+                try:
+                    audio = await task
+                except Exception as e:
+                    logger.warning(f"TTS stream: đoạn {i} lỗi: {e}")
+                    audio = b""
+                yield encode_frame(audio)
+        finally:
+            # Client ngắt kết nối giữa chừng -> hủy các đoạn chưa tổng hợp
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(frames(), media_type=FRAMES_MEDIA_TYPE,
+                             headers={"X-TTS-Segments": str(len(segments)), "Cache-Control": "no-store"})
+
+
+@router.get("/stats", summary="Thống kê cache audio và provider TTS", tags=["TTS"])
+def tts_stats():
+    return {"cache": tts_audio_cache.stats(), "pool": tts_pool.stats()}
+
+
+# --- WARM-UP ---
+def _warmup_segments(text: str):
+    """
+    Các đoạn mà kiosk thực sự yêu cầu cho `text`: kiosk đọc từng câu (StreamingSegmenter, mỗi câu
+    một lần gọi /tts/speak) hoặc cả bài qua /tts/stream (split_segments) -> cache theo từng đoạn.
+    """
+    segmenter = StreamingSegmenter()  # Cùng tham số mặc định với kiosk (frontend/screens/chat.py)
+    kiosk = segmenter.feed(text) + segmenter.flush()
+    stream = split_segments(text, max_chars=settings.TTS_SEGMENT_MAX_CHARS)
+    return [normalize_text(s) for s in kiosk + stream]
+
+
+def _warmup_items():
+    """Các đoạn của câu chào + câu trả lời được hỏi nhiều nhất, với thông số giọng mặc định của kiosk."""
+    texts = [settings.TTS_GREETING] + answer_memo.frequent_speech(settings.TTS_WARMUP_TOP_N)
+    segments = [s for t in texts for s in _warmup_segments(t)]
+    req = TTSRequest(text=".", voice_name=settings.TTS_DEFAULT_VOICE,
+                     speaking_rate=settings.TTS_DEFAULT_SPEAKING_RATE)
+    return [(_request_key(req, s), s) for s in dict.fromkeys(segments) if s], req
+
+
+def warm_up_once() -> int:
+    items, req = _warmup_items()
+    cfg = TTSConfig(voice_name=req.voice_name, speaking_rate=req.speaking_rate,
+                    language_code=req.language_code, pitch=req.pitch, audio_encoding=req.audio_encoding)
+    created = tts_audio_cache.warm_up(items, lambda t: _synthesize(t, cfg))
+    if created:
+        logger.info(f"TTS warm-up: đã tổng hợp trước {created} câu")
+    return created
+
+
+async def warm_up_loop():
+    """Chạy nền từ lúc khởi động; lặp lại theo TTS_WARMUP_INTERVAL."""
+    while True:
+        try:
+            await run_in_threadpool(warm_up_once)
+        except Exception as e:
+            logger.warning(f"TTS warm-up lỗi: {e}")
+        if settings.TTS_WARMUP_INTERVAL <= 0:
+            return
+        await asyncio.sleep(settings.TTS_WARMUP_INTERVAL)
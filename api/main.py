@@ -1,7 +1,11 @@
 # api/main.py
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api_router import api_router
+from fastapi.concurrency import run_in_threadpool
+from .endpoints.tts import warm_up_loop
+from src.services.tts_service import tts_pool
 from src.generation.rag_engine import rag_engine
 
 app = FastAPI(title="ABC AI Agent", version="1.0.0")
@@ -20,9 +24,14 @@ app.include_router(api_router, prefix="/api/v1")
 @app.on_event("startup")
 async def _startup():
     await rag_engine.start()
+    # Tạo sẵn client TTS (gRPC channel, credentials) dùng chung cho mọi request
+    await run_in_threadpool(tts_pool.start)
+    # Tổng hợp trước audio câu chào / câu trả lời phổ biến (chạy nền)
+    app.state.tts_warmup = asyncio.create_task(warm_up_loop())
 
 @app.on_event("shutdown")
 async def _shutdown():
+    app.state.tts_warmup.cancel()
     await rag_engine.shutdown()
 
 @app.get("/healthz")
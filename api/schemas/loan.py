@@ -0,0 +1,23 @@
+# api/schemas/loan.py
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+
+class LoanScheduleRequest(BaseModel):
+    """Request model for loan amortization schedule"""
+    principal: float = Field(..., gt=0, description="Loan amount in VND")
+    term_months: int = Field(..., ge=1, le=600, description="Loan term in months")
+    loan_type: Optional[str] = Field(
+        None,
+        description="Loan package key in loan_rates.json (e.g. 'vay_mua_nha'). Its promo/floating plan is used when no rate is given."
+    )
+    annual_rate_percent: Optional[float] = Field(None, gt=0, le=100, description="Fixed or promotional rate %/year")
+    promo_months: int = Field(0, ge=0, le=600, description="Number of months at the promotional rate")
+    float_rate_percent: Optional[float] = Field(None, gt=0, le=100, description="Floating rate %/year after the promo period")
+    method: str = Field("annuity", description="annuity | equal_principal")
+    format: str = Field("json", description="json | csv")
+
+class LoanScheduleResponse(BaseModel):
+    """Compact schedule: one row per month, values rounded to VND"""
+    summary: Dict[str, Any] = Field(..., description="Totals and plan used")
+    columns: List[str] = Field(..., description="Column names for each row")
+    rows: List[List[int]] = Field(..., description="[month, payment, principal, interest, balance]")
@@ -23,7 +23,25 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str
 
     # --- CHỌN LLM PROVIDER ---
-    LLM_PROVIDER: str = "gemini" 
+    LLM_PROVIDER: str = "gemini"  # gemini | openai | fake
+    # Provider / model riêng theo mục đích (để trống -> dùng LLM_PROVIDER + model mặc định)
+    LLM_PARSE_PROVIDER: Optional[str] = None
+    LLM_PARSE_MODEL: Optional[str] = None
+    LLM_GENERATE_PROVIDER: Optional[str] = None
+    LLM_GENERATE_MODEL: Optional[str] = None
+    LLM_CLASSIFY_PROVIDER: Optional[str] = None
+    LLM_CLASSIFY_MODEL: Optional[str] = None
+
+    # --- OPENAI-COMPATIBLE (OpenAI / llama.cpp server / vLLM) ---
+    OPENAI_BASE_URL: str = "http://localhost:8080/v1"
+    OPENAI_API_KEY: Optional[str] = None
+    OPENAI_CHAT_MODEL: str = "local-model"
+    OPENAI_TIMEOUT: float = 60.0
+
+    # --- FAKE LLM (benchmark, không gọi mạng) ---
+    FAKE_LLM_TTFT_MS: float = 300.0
+    FAKE_LLM_TOKEN_MS: float = 20.0
+    FAKE_LLM_ANSWER_WORDS: int = 40
 
     # --- MODEL NAMES ---
     GEMINI_EMBEDDING_MODEL: str = Field(default="models/text-embedding-004")
@@ -55,6 +73,49 @@ class Settings(BaseSettings):
     RETRIEVER_USE_MMR: bool = True
     RETRIEVER_SCORE_THRESHOLD: Optional[float] = None
 
+    # --- LLM GATEWAY ---
+    LLM_MAX_CONCURRENCY: int = 8       # tổng số lệnh gọi LLM đồng thời
+    LLM_PARSE_CONCURRENCY: int = 4
+    LLM_GENERATE_CONCURRENCY: int = 4
+    LLM_CLASSIFY_CONCURRENCY: int = 2
+    LLM_QUEUE_TIMEOUT: float = 10.0    # giây chờ slot tối đa, quá -> báo quá tải
+    LLM_PARSE_DEADLINE: float = 8.0    # giây cho mỗi lệnh gọi parse
+    LLM_GENERATE_DEADLINE: float = 45.0  # giây cho cả stream câu trả lời
+    LLM_CLASSIFY_DEADLINE: float = 20.0
+    # Hedging: quá LLM_HEDGE_AFTER giây chưa có token đầu -> gửi thêm tới provider/model dự phòng
+    # Để trống -> 4s nếu LLM_HEDGE_PROVIDER/MODEL khác provider chính, ngược lại tắt; 0 = tắt
+    LLM_HEDGE_AFTER: Optional[float] = None
+    LLM_HEDGE_PROVIDER: Optional[str] = None  # để trống -> LLM_PROVIDER
+    LLM_HEDGE_MODEL: Optional[str] = None
+    LLM_HEDGE_CONCURRENCY: int = 2     # slot riêng cho lệnh gọi dự phòng
+
+    # --- EXTRACTIVE ANSWER (trả thẳng chunk FAQ, bỏ qua LLM) ---
+    EXTRACTIVE_DOMAINS: str = "faq,network"  # các kho bật chế độ này; để trống = tắt
+    EXTRACTIVE_MIN_SCORE: float = 0.82       # cosine tối thiểu (0..1) của chunk top-1
+    EXTRACTIVE_MAX_SENTENCES: int = 4        # 0 = không cắt câu
+
+    # --- TOOLS ---
+    TOOL_DEADLINE: float = 6.0  # giây, deadline chung cho các tool chạy song song
+
+    # --- TTS PROVIDERS ---
+    TTS_PROVIDER_ORDER: str = "google,gtts,local"
+    TTS_MAX_CONCURRENCY: int = 4
+    TTS_QUEUE_TIMEOUT: float = 10.0  # giây chờ tối đa khi pool đang bận
+    TTS_PROVIDER_COOLDOWN: float = 30.0  # giây bỏ qua provider vừa lỗi
+    TTS_STREAM_CONCURRENCY: int = 3  # số đoạn tổng hợp song song cho mỗi request /tts/stream
+    TTS_SEGMENT_MAX_CHARS: int = 180
+
+    # --- TTS CACHE ---
+    TTS_CACHE_DIR: str = Field(default_factory=lambda: os.path.join(BASE_DIR_PATH, "data", "tts_cache"))
+    TTS_CACHE_MEMORY_MB: int = 32
+    TTS_CACHE_DISK_MB: int = 256
+    TTS_WARMUP_INTERVAL: int = 600  # giây, 0 = chỉ warm-up một lần lúc khởi động
+    TTS_WARMUP_TOP_N: int = 20
+    # Thông số giọng của kiosk (phải khớp frontend/config.py để warm-up trúng khóa)
+    TTS_DEFAULT_VOICE: str = "vi-VN-Standard-A"
+    TTS_DEFAULT_SPEAKING_RATE: float = 1.1
+    TTS_GREETING: str = "Xin chào! Tôi có thể giúp gì cho bạn hôm nay?"
+
     # --- UX / SESSION ---
     LLM_TEMPERATURE: float = 0.0
     SESSION_TTL: int = 3600
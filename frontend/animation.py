@@ -0,0 +1,177 @@
+# frontend/animation.py
+"""
+Bộ lập lịch animation dùng chung cho kiosk.
+
+- Khung hình được chọn theo đồng hồ monotonic (thời gian đã trôi / khoảng cách khung),
+  không phải bằng cách đếm số lần after() chạy -> không bị trôi khi main loop bận.
+- Main loop bị chặn lâu -> nhảy thẳng tới khung đúng thời điểm và đếm số khung bị bỏ.
+- Chỉ một callback (bound method) được đặt lại bằng after(), không tạo closure mỗi khung.
+- Việc UI không gấp (defer) chạy sau khi đã vẽ khung, trong phần thời gian còn lại của khung.
+"""
+import time
+from collections import deque
+
+
+class _Animation:
+    def __init__(self, name, frames, apply, start, stop, loop, on_done):
+        self.name = name
+        self.frames = frames
+        self.apply = apply
+        self.start = start
+        self.stop = len(frames) if stop is None else min(stop, len(frames))
+        self.loop = loop  # (đầu, cuối) tính theo index; None = chạy một lần
+        self.on_done = on_done
+        self.shown = 0
+        self.dropped = 0
+        self.last_step = -1
+
+    def index_for(self, step):
+        """Index khung cho bước thứ `step`, hoặc None nếu animation một lần đã hết."""
+        idx = self.start + step
+        if self.loop is None:
+            return idx if idx < self.stop else None
+        first, last = self.loop
+        if idx > last:
+            idx = first + (idx - first) % (last - first + 1)
+        return idx
+
+
+class AnimationScheduler:
+    def __init__(self, widget, frame_ms=60, defer_budget=0.5):
+        self.widget = widget
+        self.frame_s = frame_ms / 1000.0
+        # Phần của mỗi khung được dùng cho việc defer (phần còn lại để dành cho vẽ/event)
+        self.defer_budget = defer_budget
+        self._anim = None
+        self._t0 = 0.0
+        self._job = None
+        self._tick_cb = self._tick
+        self._deferred = deque()
+
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self.deferred_run = 0
+        self.max_lag_ms = 0.0
+
+    # --- API ---
+    def play(self, frames, apply, name="", start=0, stop=None, loop=None, on_done=None):
+        """
+        Chạy frames[start:stop]; apply(frame) hiển thị một khung.
+        loop=(đầu, cuối): sau khung `cuối` quay về khung `đầu` (lặp tới khi stop()/play() khác).
+        on_done: gọi khi animation một lần chạy hết.
+        """
+        self._finish()
+        if not frames or start >= len(frames):
+            return
+        self._anim = _Animation(name, frames, apply, start, stop, loop, on_done)
+        self._t0 = time.monotonic()
+        self._cancel_job()
+        self._tick()
+
+    def stop(self):
+        self._finish()
+        if not self._deferred:
+            self._cancel_job()
+
+    def defer(self, fn):
+        """Xếp việc không gấp; chạy sau khung hình hiện tại, không chen vào animation."""
+        self._deferred.append(fn)
+        if self._job is None:
+            self._schedule(0)
+
+    def is_running(self):
+        return self._anim is not None
+
+    def stats(self):
+        return {
+            "frames_shown": self.frames_shown,
+            "frames_dropped": self.frames_dropped,
+            "drop_rate": round(self.frames_dropped / max(1, self.frames_shown + self.frames_dropped), 3),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "deferred_run": self.deferred_run,
+            "deferred_pending": len(self._deferred),
+        }
+
+    # --- Nội bộ ---
+    def _schedule(self, delay_s):
+        try:
+            self._job = self.widget.after(max(1, int(delay_s * 1000)), self._tick_cb)
+        except Exception:
+            self._job = None  # Widget đã bị hủy
+
+    def _cancel_job(self):
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+
+    def _finish(self):
+        anim, self._anim = self._anim, None
+        if anim is not None:
+            self._report(anim)
+
+    @staticmethod
+    def _report(anim):
+        # Số khung bị bỏ của từng animation, để chỉnh frame_ms cho phần cứng (Pi)
+        if anim.dropped:
+            print(f"[anim] {anim.name or 'animation'}: bỏ {anim.dropped}/{anim.shown + anim.dropped} khung")
+
+    def _tick(self):
+        self._job = None
+        now = time.monotonic()
+        anim = self._anim
+        next_due = None
+
+        if anim is not None:
+            step = int((now - self._t0) / self.frame_s)
+            if step > anim.last_step:
+                due = self._t0 + step * self.frame_s
+                self.max_lag_ms = max(self.max_lag_ms, (now - due) * 1000)
+                last = step if anim.loop is not None else min(step, anim.stop - anim.start)
+                skipped = max(0, last - anim.last_step - 1)
+                anim.dropped += skipped
+                self.frames_dropped += skipped
+                anim.last_step = step
+                idx = anim.index_for(step)
+                if idx is None:
+                    # Animation một lần đã xong
+                    self._anim = None
+                    self._finish_done(anim)
+                else:
+                    try:
+                        anim.apply(anim.frames[idx])
+                    except Exception as e:
+                        print(f"[anim] lỗi hiển thị khung: {e}")
+                        self._anim = None
+                        anim = None
+                    else:
+                        anim.shown += 1
+                        self.frames_shown += 1
+            if self._anim is anim and anim is not None:
+                next_due = self._t0 + (anim.last_step + 1) * self.frame_s
+
+        # Việc defer: trong ngân sách còn lại của khung này (ít nhất một việc mỗi tick để không bị đói)
+        deadline = now + self.frame_s * self.defer_budget
+        ran = 0
+        while self._deferred and (ran == 0 or time.monotonic() < deadline):
+            ran += 1
+            fn = self._deferred.popleft()
+            try:
+                fn()
+            except Exception as e:
+                print(f"[anim] lỗi việc defer: {e}")
+            self.deferred_run += 1
+
+        if self._job is not None:
+            return  # on_done đã bắt đầu animation mới (và tự đặt lịch)
+        if next_due is not None:
+            self._schedule(next_due - time.monotonic())
+        elif self._deferred:
+            self._schedule(0)
+
+    def _finish_done(self, anim):
+        self._report(anim)
+        if anim.on_done:
+            anim.on_done()
@@ -5,6 +5,9 @@ import os
 import sys
 import re
 
+from frontend.avatar_atlas import AvatarAtlas
+from frontend.config import AVATAR_CACHE_ENTRIES
+
 class AssetsManager:
     def __init__(self):
         # --- SỬA LỖI ĐƯỜNG DẪN TẠI ĐÂY ---
@@ -29,7 +32,6 @@ class AssetsManager:
             print(f"✅ Đã tìm thấy thư mục assets.")
 
         self.icons = {}
-        self.avatars = {}
         
         self._load_icons()
         self._load_avatars()
@@ -49,40 +51,8 @@ class AssetsManager:
         self.icons["speaker"] = load("speaker_icon.png", size=(24, 24))
 
     def _load_avatars(self):
-        def load_ava(name, size=(300, 350)): # Kích thước ảnh nhân vật
-            p = os.path.join(self.avatar_path, name)
-            if os.path.exists(p): 
-                return ctk.CTkImage(Image.open(p), size=size)
-            print(f"⚠️ Thiếu avatar: {name} (tại {p})")
-            return None
-        
-        # [MỚI] Hàm load cả thư mục thành 1 danh sách ảnh
-        def load_folder_sequence(folder_name, size=(300, 350)):
-            frames = []
-            folder_path = os.path.join(self.avatar_path, folder_name)
-            
-            if not os.path.exists(folder_path):
-                print(f"⚠️ Không tìm thấy folder anim: {folder_name}")
-                return []
-
-            # Lấy tất cả file png, sắp xếp theo tên (001, 002...)
-            files = sorted([f for f in os.listdir(folder_path) if f.endswith('.png')])
-            
-            print(f"Loading {len(files)} frames from {folder_name}...")
-            
-            for f in files:
-                img_path = os.path.join(folder_path, f)
-                # Load ảnh
-                frames.append(ctk.CTkImage(Image.open(img_path), size=size))
-            
-            return frames
-
-        # Đảm bảo bạn đã copy ảnh vào banking-rag-agent/assets/avatar/
-        self.avatars["normal"] = load_ava("normal.png")
-        self.avatars["listening"] = load_ava("listening.png")
-        self.avatars["thinking"] = load_ava("thinking.png")
-        self.avatars["answering_anim"] = load_folder_sequence("answering")
-        self.avatars["waving_anim"] = load_folder_sequence("waving")
+        # Không giải mã ảnh lúc khởi động: atlas chỉ đọc manifest, khung hình được giải mã khi hiển thị
+        self.avatar_atlas = AvatarAtlas(self.avatar_path, max_entries=AVATAR_CACHE_ENTRIES)
 
 # Singleton instance
 assets = AssetsManager()
@@ -0,0 +1,195 @@
+# frontend/avatar_atlas.py
+"""
+Atlas khung hình avatar (tạo bởi src/scripts/build_avatar_atlas.py).
+
+- Mỗi trạng thái (normal, answering, waving...) ở mỗi kích thước đích được đóng gói thành
+  một file RGBA thô: các khung hình đã scale sẵn, xếp liền nhau theo thứ tự.
+- File atlas được memory-map; khung hình chỉ được giải mã khi hiển thị lần đầu.
+- Các dãy khung hình nằm trong LRU theo khóa (trạng thái, kích thước) nên đổi kích thước
+  cửa sổ không làm bộ nhớ tăng mãi.
+- Chưa build atlas (hoặc ảnh gốc mới hơn atlas) -> đọc thẳng PNG gốc, vẫn lazy theo từng khung.
+"""
+import json
+import mmap
+import os
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import customtkinter as ctk
+from PIL import Image
+
+ATLAS_FORMAT = 1
+MANIFEST_NAME = "atlas.json"
+
+# Trạng thái -> nguồn trong assets/avatar (file .png = ảnh tĩnh, thư mục = animation)
+AVATAR_SOURCES = {
+    "normal": "normal.png",
+    "listening": "listening.png",
+    "thinking": "thinking.png",
+    "answering": "answering",
+    "waving": "waving",
+}
+
+
+def atlas_file_name(state, size):
+    return f"{state}_{size[0]}x{size[1]}.rgba"
+
+
+def size_key(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def source_frames(avatar_dir, state):
+    """Danh sách file PNG gốc của một trạng thái, theo thứ tự khung hình."""
+    src = AVATAR_SOURCES.get(state)
+    if not src:
+        return []
+    path = os.path.join(avatar_dir, src)
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".png")]
+    return [path] if os.path.exists(path) else []
+
+
+def sources_mtime(paths):
+    return max((os.path.getmtime(p) for p in paths), default=0.0)
+
+
+class FrameSequence(Sequence):
+    """Dãy khung hình lazy: mỗi khung chỉ giải mã + tạo CTkImage một lần, khi được truy cập."""
+    def __init__(self, count, decode, make_image):
+        self._frames = [None] * count
+        self._decode = decode
+        self._make_image = make_image
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self._frames))[index]]
+        index = range(len(self._frames))[index]
+        img = self._frames[index]
+        if img is None:
+            img = self._frames[index] = self._make_image(self._decode(index))
+        return img
+
+    def decoded(self):
+        return sum(1 for f in self._frames if f is not None)
+
+
+class AvatarAtlas:
+    def __init__(self, avatar_dir, atlas_dir=None, max_entries=6, make_image=None):
+        self.avatar_dir = avatar_dir
+        self.atlas_dir = atlas_dir or os.path.join(avatar_dir, "atlas")
+        self.max_entries = max_entries
+        self._make_image = make_image or (lambda img, size: ctk.CTkImage(light_image=img, size=size))
+        self._lru = OrderedDict()
+        self._maps = {}
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        path = os.path.join(self.atlas_dir, MANIFEST_NAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            print("⚠️ Chưa có avatar atlas, dùng PNG gốc (chạy src/scripts/build_avatar_atlas.py)")
+            return {}
+        if manifest.get("format") != ATLAS_FORMAT:
+            print("⚠️ Avatar atlas khác phiên bản, dùng PNG gốc")
+            return {}
+        return manifest
+
+    # --- Truy vấn ---
+    def is_animated(self, state):
+        entry = self.manifest.get("states", {}).get(state)
+        if entry is not None:
+            return entry["animated"]
+        src = AVATAR_SOURCES.get(state)
+        return bool(src) and os.path.isdir(os.path.join(self.avatar_dir, src))
+
+    def has(self, state):
+        return state in self.manifest.get("states", {}) or bool(source_frames(self.avatar_dir, state))
+
+    def frames(self, state, size):
+        """FrameSequence của `state` ở kích thước `size`, hoặc None nếu không có ảnh."""
+        size = (int(size[0]), int(size[1]))
+        key = (state, size)
+        seq = self._lru.get(key)
+        if seq is not None:
+            self._lru.move_to_end(key)
+            return seq
+
+        seq = self._from_atlas(state, size) or self._from_sources(state, size)
+        if seq is None:
+            return None
+        self._lru[key] = seq
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+        return seq
+
+    def image(self, state, size):
+        """Khung đầu tiên (dùng cho ảnh tĩnh)."""
+        seq = self.frames(state, size)
+        return seq[0] if seq else None
+
+    def stats(self):
+        return {
+            "entries": len(self._lru),
+            "decoded_frames": sum(seq.decoded() for seq in self._lru.values()),
+            "mapped_files": len(self._maps),
+        }
+
+    # --- Nguồn khung hình ---
+    def _atlas_entry(self, state):
+        entry = self.manifest.get("states", {}).get(state)
+        if entry is None:
+            return None
+        # Ảnh gốc đã sửa sau lần build -> atlas cũ, bỏ qua
+        if sources_mtime(source_frames(self.avatar_dir, state)) > entry["sources_mtime"]:
+            return None
+        return entry
+
+    def _mapped(self, file_name):
+        mm = self._maps.get(file_name)
+        if mm is None:
+            with open(os.path.join(self.atlas_dir, file_name), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[file_name] = mm
+        return mm
+
+    def _from_atlas(self, state, size):
+        entry = self._atlas_entry(state)
+        if entry is None:
+            return None
+        files = entry["files"]
+        if size_key(size) in files:
+            atlas_size, rescale = size, False
+        else:
+            # Không có đúng kích thước: lấy bản nhỏ nhất còn >= size (hoặc lớn nhất) rồi scale
+            built = sorted((tuple(int(v) for v in k.split("x")) for k in files), key=lambda s: s[0] * s[1])
+            atlas_size = next((s for s in built if s[0] >= size[0] and s[1] >= size[1]), built[-1])
+            rescale = True
+        try:
+            mm = self._mapped(files[size_key(atlas_size)])
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Lỗi đọc avatar atlas {state}: {e}")
+            return None
+        frame_bytes = atlas_size[0] * atlas_size[1] * 4
+
+        def decode(i):
+            img = Image.frombytes("RGBA", atlas_size, mm[i * frame_bytes:(i + 1) * frame_bytes])
+            return img.resize(size, Image.LANCZOS) if rescale else img
+
+        return FrameSequence(entry["frames"], decode, lambda img: self._make_image(img, size))
+
+    def _from_sources(self, state, size):
+        paths = source_frames(self.avatar_dir, state)
+        if not paths:
+            return None
+
+        def decode(i):
+            with Image.open(paths[i]) as img:
+                return img.convert("RGBA").resize(size, Image.LANCZOS)
+
+        return FrameSequence(len(paths), decode, lambda img: self._make_image(img, size))
@@ -3,6 +3,13 @@
 # --- API ---
 API_URL = "http://localhost:8000/api/v1/chat/query"
 TTS_URL = "http://localhost:8000/api/v1/tts/speak"
+TTS_STREAM_URL = "http://localhost:8000/api/v1/tts/stream"
+BUNDLE_URL = "http://localhost:8000/api/v1/bundle"
+# HTTP: timeout (giây) tách connect / read; read = thời gian tối đa giữa hai lần nhận dữ liệu
+API_CONNECT_TIMEOUT = 3
+CHAT_READ_TIMEOUT = 60
+TTS_READ_TIMEOUT = 20
+API_RETRIES = 2  # Thử lại lỗi kết nối (mọi lệnh gọi) và lỗi đọc / 5xx (chỉ TTS)
 
 # --- APP SETTINGS ---
 APP_TITLE = "Bank Kiosk AI"
@@ -44,9 +51,29 @@ KEY_BG = "#FFFFFF"            # White Keys
 KEY_TEXT = "#0F172A"
 CAPS_COLOR = "#0EA5E9"        # Active State
 
+# --- CHAT ---
+STREAM_RENDER_FPS = 20  # Tần số cập nhật bong bóng chat khi đang stream
+CHAT_MAX_LIVE_BUBBLES = 30  # Số bong bóng giữ widget thật; tin cũ hơn chỉ giữ dữ liệu
+LAYOUT_DEBOUNCE_MS = 120  # Gom các sự kiện resize liên tiếp thành một lượt reflow
+
+# --- OFFLINE BUNDLE ---
+import os as _os
+OFFLINE_BUNDLE_PATH = _os.path.join(_os.path.dirname(_os.path.dirname(_os.path.abspath(__file__))), "data", "offline_bundle.json")
+OFFLINE_DEADLINE_S = 8            # Chưa có byte đầu tiên sau ngần này giây -> trả lời từ gói lưu sẵn (nếu khớp)
+OFFLINE_BUNDLE_REFRESH_S = 900    # Chu kỳ tải lại gói từ server
+
+# --- AVATAR ---
+# Kích thước được đóng gói sẵn trong atlas (chat, welcome, màn hình nhỏ)
+AVATAR_ATLAS_SIZES = [(300, 350), (250, 275), (240, 280)]
+AVATAR_CACHE_ENTRIES = 6  # Số dãy khung hình (trạng thái, kích thước) giữ trong bộ nhớ
+AVATAR_FRAME_MS = 60      # ~16 FPS
+
 # --- TTS SETTINGS ---
 TTS_VOICE_NAME = "vi-VN-Standard-A"
 TTS_SPEAKING_RATE = 1.1
 
 # --- KEYWORDS FOR QR ---
+QR_MAX_PAYLOAD_BYTES = 360  # Nội dung QR được rút gọn trong giới hạn này (giữ phiên bản QR nhỏ)
+QR_DEEP_LINK = ""           # Link đính kèm cuối nội dung QR (để trống nếu không dùng)
+QR_CACHE_ENTRIES = 32       # Số ảnh QR giữ trong cache theo hash nội dung
 QR_KEYWORDS = ["BẢNG TÍNH", "DỰ TÍNH", "KẾ HOẠCH", "THÔNG TIN GÓI", "LÃI SUẤT", "TỶ GIÁ", "GIÁ VÀNG", "BẢNG GIÁ"]
@@ -0,0 +1,97 @@
+# frontend/layout.py
+"""
+Quản lý reflow cho màn hình chat.
+
+- Chỉ nghe <Configure> của đúng widget quyết định bề rộng (khung chat), không phải của cả cửa sổ
+  (Tk gửi <Configure> của mọi widget con lên toplevel).
+- Nhiều sự kiện liên tiếp được gom lại (debounce) thành một lượt layout.
+- Mỗi lượt tính khóa layout (vd. wraplength) đúng một lần; khóa không đổi -> bỏ qua cả lượt.
+- Không gọi update_idletasks(): Tk tự vẽ lại khi rảnh.
+- Ghi lại thời gian mỗi lượt để theo dõi trên phần cứng yếu (Pi).
+"""
+import time
+
+
+class LayoutManager:
+    def __init__(self, widget, compute, apply, debounce_ms=120, slow_ms=16.0):
+        """
+        compute(width) -> khóa layout (so sánh được); width có thể là None (tự đo).
+        apply(key) áp dụng khóa mới (chỉ chạm vào widget đang hiển thị).
+        """
+        self.widget = widget
+        self.compute = compute
+        self.apply = apply
+        self.debounce_ms = debounce_ms
+        self.slow_ms = slow_ms
+        self._job = None
+        self._width = None      # Bề rộng mới nhất nhận từ <Configure>
+        self._key = None        # Khóa của lượt layout đã áp dụng gần nhất
+
+        self.passes = 0
+        self.skipped = 0
+        self.events = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    # --- Sự kiện ---
+    def on_configure(self, event=None):
+        self.events += 1
+        width = getattr(event, "width", None)
+        if width is not None:
+            if width == self._width:
+                return  # Chỉ đổi chiều cao / vị trí: không ảnh hưởng wraplength
+            self._width = width
+        self.request()
+
+    def request(self):
+        """Xếp một lượt layout (gộp với các yêu cầu đang chờ)."""
+        if self._job is not None:
+            return
+        try:
+            self._job = self.widget.after(self.debounce_ms, self._run)
+        except Exception:
+            self._job = None  # Widget đã bị hủy
+
+    def flush(self):
+        """Chạy ngay lượt đang chờ (nếu có)."""
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+        self._run()
+
+    def invalidate(self):
+        """Buộc lượt sau áp dụng lại dù khóa không đổi."""
+        self._key = None
+
+    # --- Nội bộ ---
+    def _run(self):
+        self._job = None
+        t0 = time.perf_counter()
+        try:
+            key = self.compute(self._width)
+            if key is None or key == self._key:
+                self.skipped += 1
+                return
+            self.apply(key)
+            self._key = key
+        except Exception as e:
+            print(f"[layout] lỗi: {e}")
+            return
+        ms = (time.perf_counter() - t0) * 1000
+        self.passes += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if ms > self.slow_ms:
+            print(f"[layout] lượt reflow chậm: {ms:.1f} ms (key={key})")
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "passes": self.passes,
+            "skipped": self.skipped,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / max(1, self.passes), 2),
+            "max_ms": round(self.max_ms, 1),
+        }
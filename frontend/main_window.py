@@ -2,7 +2,9 @@
 import customtkinter as ctk
 from frontend.config import *
 from frontend.screens.welcome import WelcomeScreen
-from frontend.screens.chat import ChatScreen
+from frontend.screens.chat import ChatScreen, AudioClient
+from frontend.offline_bundle import OfflineBundle
+from src.services.api_client import ApiClient
 
 class KioskApp(ctk.CTk):
     def __init__(self):
@@ -14,25 +16,50 @@ class KioskApp(ctk.CTk):
         
         self.current_frame = None
         self.idle_timer = None
+
+        # Dùng chung cho mọi phiên: mixer, mic, kết nối HTTP chỉ khởi tạo một lần
+        self.api_client = ApiClient(connect_timeout=API_CONNECT_TIMEOUT, read_timeout=TTS_READ_TIMEOUT,
+                                    retries=API_RETRIES)
+        self.audio_client = AudioClient(tts_url=TTS_URL, stream_url=TTS_STREAM_URL, api_client=self.api_client)
+        # Câu trả lời lưu sẵn khi backend chậm / mất kết nối; tự làm mới trong nền
+        self.offline_bundle = OfflineBundle(OFFLINE_BUNDLE_PATH, BUNDLE_URL, self.api_client)
+        self.offline_bundle.start_refresh(OFFLINE_BUNDLE_REFRESH_S)
+
+        # Hai màn hình được dựng một lần rồi chỉ ẩn/hiện
+        self.welcome_screen = WelcomeScreen(self, on_start_callback=self.show_chat)
+        self.chat_screen = None
         
         self.show_welcome()
+        # Dựng sẵn màn hình chat (bàn phím, layout) sau khi màn hình chào đã hiện
+        self.after(200, self._ensure_chat_screen)
+
+    def _ensure_chat_screen(self):
+        if self.chat_screen is None:
+            self.chat_screen = ChatScreen(self, controller=self, audio_client=self.audio_client,
+                                          api_client=self.api_client, offline_bundle=self.offline_bundle)
+        return self.chat_screen
 
     def show_welcome(self):
-        self._clear_frame()
-        self.current_frame = WelcomeScreen(self, on_start_callback=self.show_chat)
-        self.current_frame.pack(fill="both", expand=True)
+        if self.current_frame is self.chat_screen and self.chat_screen is not None:
+            # Kết thúc phiên: xóa trạng thái, giữ nguyên widget
+            self.chat_screen.reset_session()
+        self._show(self.welcome_screen)
         self._stop_timer() # Welcome screen không cần timer
 
     def show_chat(self):
-        self._clear_frame()
-        self.current_frame = ChatScreen(self, controller=self)
-        self.current_frame.pack(fill="both", expand=True)
+        chat = self._ensure_chat_screen()
+        # Mọi phiên (kể cả phiên đầu) bắt đầu ở đây, khi màn hình chat thực sự hiện ra
+        chat.start_session()
+        self._show(chat)
         self.reset_timer()
 
-    def _clear_frame(self):
+    def _show(self, frame):
+        if self.current_frame is frame:
+            return
         if self.current_frame:
-            self.current_frame.destroy()
-            self.current_frame = None
+            self.current_frame.pack_forget()
+        self.current_frame = frame
+        frame.pack(fill="both", expand=True)
 
     def reset_timer(self, event=None):
         self._stop_timer()
@@ -0,0 +1,166 @@
+# frontend/offline_bundle.py
+"""
+Gói câu trả lời ngoại tuyến phía kiosk (tạo bởi src/tools/offline_bundle.py).
+
+- Gói được lưu tại OFFLINE_BUNDLE_PATH và nạp khi khởi động; một luồng nền tải lại định kỳ
+  (GET kèm If-None-Match -> 304 nếu không đổi), ghi file mới rồi thay chỉ mục.
+- Chỉ mục cục bộ: mỗi cụm từ khóa -> tập token (bỏ dấu, chữ thường); chỉ mục ngược token -> cụm.
+  Một câu hỏi khớp một cụm khi chứa đủ mọi token của cụm và cụm phủ ít nhất `min_coverage`
+  số token nội dung của câu hỏi (bỏ từ đệm "bao nhiêu", "cho tôi"...); điểm = tổng IDF của các
+  token đó, nên cụm cụ thể ("lãi suất 6 tháng") thắng cụm chung ("lãi suất").
+- Mục có danh sách từ loại trừ (exclude, so khớp CÓ dấu): câu hỏi chứa "vay" / "thẻ" / "tín dụng"
+  không bao giờ nhận câu trả lời lãi suất tiết kiệm.
+- match() chỉ tốn vài phép tra dict, dùng được ngay khi backend trễ deadline.
+"""
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+BUNDLE_FORMAT = 2
+_TOKEN = re.compile(r"[a-z0-9]+")
+_WORD = re.compile(r"\w+")
+# Từ đệm (đã bỏ dấu) không tính khi đo độ phủ câu hỏi
+# ("vay" không có ở đây: "vậy" và "vay" trùng nhau khi bỏ dấu)
+_FILLER = frozenset(
+    "a ah oi da la thi bao nhieu cho toi minh em anh chi hoi muon biet xin vui long hien nay "
+    "the nao gi sao co khong duoc cua o trong voi va nhu ra nhe".split()
+)
+
+
+def tokens(text):
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return _TOKEN.findall(text)
+
+
+def _words(text):
+    """Từ giữ nguyên dấu, ghép lại bằng khoảng trắng (để so cụm từ loại trừ)."""
+    return " " + " ".join(_WORD.findall(unicodedata.normalize("NFC", text.lower()))) + " "
+
+
+class _Index:
+    def __init__(self, entries, min_coverage=0.5):
+        self.entries = entries
+        self.min_coverage = min_coverage
+        self.phrases = []                 # (entry index, frozenset token)
+        self.excludes = [[_words(x) for x in entry.get("exclude") or [] if x.strip()] for entry in entries]
+        postings = defaultdict(list)      # token -> [phrase index]
+        for i, entry in enumerate(entries):
+            for kw in entry.get("keywords") or [entry.get("title", "")]:
+                toks = frozenset(tokens(kw))
+                if not toks:
+                    continue
+                pid = len(self.phrases)
+                self.phrases.append((i, toks))
+                for t in toks:
+                    postings[t].append(pid)
+        self.postings = dict(postings)
+        n = max(1, len(self.phrases))
+        self.idf = {t: math.log(1 + n / len(p)) for t, p in self.postings.items()}
+
+    def match(self, question):
+        q = set(tokens(question))
+        content = (q - _FILLER) or q
+        words = _words(question)
+        hits = defaultdict(int)
+        for t in q:
+            for pid in self.postings.get(t, ()):
+                hits[pid] += 1
+        best, best_score = None, 0.0
+        for pid, count in hits.items():
+            entry_idx, toks = self.phrases[pid]
+            if count != len(toks):
+                continue  # Thiếu token của cụm -> không khớp
+            if len(toks & content) < self.min_coverage * len(content):
+                continue  # Cụm chỉ phủ một phần nhỏ câu hỏi -> câu hỏi nói về chuyện khác
+            if any(x in words for x in self.excludes[entry_idx]):
+                continue  # Câu hỏi có từ loại trừ của mục (vd. "vay" với lãi suất tiết kiệm)
+            score = sum(self.idf[t] for t in toks)
+            if score > best_score:
+                best, best_score = entry_idx, score
+        return (self.entries[best], best_score) if best is not None else (None, 0.0)
+
+
+class OfflineBundle:
+    def __init__(self, path, url=None, api_client=None, min_score=2.0, min_coverage=0.5):
+        self.path = path
+        self.url = url
+        self.api = api_client
+        self.min_score = min_score
+        self.min_coverage = min_coverage
+        self.version = None
+        self.built_at = None
+        self._index = _Index([])
+        self._stop = threading.Event()
+        self._load_file()
+
+    # --- Truy vấn ---
+    def match(self, question):
+        """Câu trả lời lưu sẵn cho câu hỏi, hoặc None nếu không có mục nào đủ khớp."""
+        entry, score = self._index.match(question)
+        if entry is None or score < self.min_score:
+            return None
+        return entry["answer"]
+
+    def __len__(self):
+        return len(self._index.entries)
+
+    # --- Nạp / làm mới ---
+    def _install(self, bundle):
+        if bundle.get("format") != BUNDLE_FORMAT:
+            print("⚠️ Offline bundle khác phiên bản, bỏ qua")
+            return False
+        # Thay cả chỉ mục một lần: luồng đang match() vẫn dùng chỉ mục cũ trọn vẹn
+        self._index = _Index(bundle.get("entries", []), self.min_coverage)
+        self.version = bundle.get("version")
+        self.built_at = bundle.get("built_at")
+        return True
+
+    def _load_file(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._install(json.load(f))
+        except (OSError, ValueError):
+            print("⚠️ Chưa có offline bundle (chạy src/scripts/export_offline_bundle.py hoặc chờ tải từ server)")
+
+    def refresh(self):
+        """Tải gói mới nếu server có phiên bản khác. Trả về True nếu đã thay gói."""
+        if not self.url or self.api is None:
+            return False
+        headers = {"If-None-Match": f'"{self.version}"'} if self.version else None
+        try:
+            response = self.api.get("bundle", self.url, headers=headers)
+            if response.status_code == 304 or not response.ok:
+                return False
+            bundle = response.json()
+        except Exception as e:
+            print(f"Offline bundle refresh error: {e}")
+            return False
+        if not self._install(bundle):
+            return False
+        try:
+            tmp = self.path + ".tmp"
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(bundle, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Offline bundle save error: {e}")
+        print(f"📦 Offline bundle: {len(self)} mục (version {self.version})")
+        return True
+
+    def start_refresh(self, interval_s):
+        """Làm mới ngay rồi lặp lại mỗi `interval_s` giây trong luồng nền."""
+        def _run():
+            while not self._stop.is_set():
+                self.refresh()
+                if self._stop.wait(interval_s):
+                    break
+        threading.Thread(target=_run, daemon=True, name="offline-bundle").start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,134 @@
+# frontend/qr_service.py
+"""
+Tạo mã QR cho bong bóng trả lời, ngoài main thread.
+
+- Nội dung QR được rút gọn (compact_payload): bỏ markdown, khoảng trắng thừa, cắt theo dòng
+  trong giới hạn byte (+ deep link nếu có cấu hình) -> phiên bản QR nhỏ, quét dễ, encode nhanh.
+- Encode + vẽ ảnh chạy trong thread pool; kết quả được đưa về main thread bằng after(0, ...).
+- Ảnh đã tạo nằm trong LRU theo hash nội dung: cùng câu trả lời (hoặc bong bóng được tái sử dụng)
+  không phải encode lại. Các yêu cầu trùng nội dung đang chạy được gộp vào một job.
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import customtkinter as ctk
+from PIL import Image
+
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+QR_HEADER = "KẾT QUẢ TƯ VẤN:"
+
+
+def compact_payload(text, max_bytes=360, link=""):
+    """Bản rút gọn của câu trả lời để đưa vào QR (tính theo byte UTF-8)."""
+    text = text.replace("**", "")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+
+    tail = ("\n" + link) if link else ""
+    budget = max_bytes - len(tail.encode("utf-8"))
+    out = [QR_HEADER]
+    used = len(QR_HEADER.encode("utf-8"))
+    truncated = False
+    for line in lines:
+        size = len(line.encode("utf-8")) + 1
+        if used + size > budget:
+            truncated = True
+            # Dòng đầu tiên đã quá dài: cắt theo từ để vẫn có nội dung
+            if len(out) == 1:
+                room = budget - used - 4
+                cut = line.encode("utf-8")[:max(0, room)].decode("utf-8", "ignore")
+                cut = cut.rsplit(" ", 1)[0] if " " in cut else cut
+                if cut:
+                    out.append(cut)
+            break
+        out.append(line)
+        used += size
+    if truncated:
+        out[-1] += "…"
+    return "\n".join(out) + tail
+
+
+def _encode(payload, size):
+    """Chạy trong worker: trả về PIL.Image đã scale sẵn về `size`."""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=4, border=2)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").get_image().convert("RGB")
+    # NEAREST giữ cạnh module sắc nét; scale sẵn ở đây để main thread không phải resize
+    return img.resize(size, Image.NEAREST)
+
+
+class QRService:
+    def __init__(self, widget, size=(180, 180), max_workers=1, cache_entries=32,
+                 max_bytes=360, link=""):
+        self.widget = widget
+        self.size = size
+        self.max_bytes = max_bytes
+        self.link = link
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()   # hash -> CTkImage
+        self._waiting = {}            # hash -> [callback] (job đang chạy)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qr")
+        self.hits = 0
+        self.encoded = 0
+
+    def request(self, text, callback):
+        """
+        callback(image) trên main thread khi ảnh sẵn sàng (image=None nếu lỗi / thiếu qrcode).
+        Ảnh đã có trong cache -> callback được gọi ngay.
+        """
+        if qrcode is None:
+            callback(None)
+            return
+        payload = compact_payload(text, self.max_bytes, self.link)
+        key = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+        img = self._cache.get(key)
+        if img is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            callback(img)
+            return
+        if key in self._waiting:
+            self._waiting[key].append(callback)
+            return
+        self._waiting[key] = [callback]
+        future = self._pool.submit(_encode, payload, self.size)
+        future.add_done_callback(lambda f, k=key: self._post(k, f))
+
+    def _post(self, key, future):
+        # Worker thread -> main thread
+        try:
+            self.widget.after(0, lambda: self._deliver(key, future))
+        except Exception:
+            pass  # Widget đã bị hủy
+
+    def _deliver(self, key, future):
+        callbacks = self._waiting.pop(key, [])
+        img = None
+        try:
+            img = ctk.CTkImage(light_image=future.result(), size=self.size)
+            self.encoded += 1
+            self._cache[key] = img
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        except Exception as e:
+            print(f"QR error: {e}")
+        for cb in callbacks:
+            try:
+                cb(img)
+            except Exception as e:
+                print(f"QR callback error: {e}")
+
+    def stats(self):
+        return {"cached": len(self._cache), "hits": self.hits, "encoded": self.encoded,
+                "pending": len(self._waiting)}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
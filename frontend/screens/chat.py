@@ -1,15 +1,22 @@
 # frontend/screens/chat.py
 import customtkinter as ctk
 import threading
-import requests
 import uuid
-import qrcode
 import re
 import time
 import queue
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from collections.abc import Sequence
 
 from frontend.config import *
 from frontend.assets import assets
+from frontend.animation import AnimationScheduler
+from frontend.stream_renderer import StreamRenderer
+from frontend.transcript import Transcript
+from frontend.layout import LayoutManager
+from frontend.qr_service import QRService
+from frontend.offline_bundle import OfflineBundle
+from frontend.telex import TelexComposer, Edit
 
 try:
     from src.services.audio_client import AudioClient
@@ -18,59 +25,59 @@ except ImportError:
     class AudioClient: 
         def __init__(self, **kw): pass
         def speak(self, *a, **kw): pass
+        def fetch(self, *a, **kw): return None
+        def play_blocking(self, *a, **kw): pass
+        def enqueue(self, *a, **kw): return None
+        def wait_idle(self, *a, **kw): return True
+        def stop(self): pass
         def listen(self, *a, **kw): return None
+        def cancel_listen(self): pass
 
-# =========================
-# Mini Telex (gọn + chuẩn)
-# =========================
-TONE_KEYS = {"s": 1, "f": 2, "r": 3, "x": 4, "j": 5}
-
-_VOWELS = {
-    "a": ["a", "á", "à", "ả", "ã", "ạ"],
-    "ă": ["ă", "ắ", "ằ", "ẳ", "ẵ", "ặ"],
-    "â": ["â", "ấ", "ầ", "ẩ", "ẫ", "ậ"],
-    "e": ["e", "é", "è", "ẻ", "ẽ", "ẹ"],
-    "ê": ["ê", "ế", "ề", "ể", "ễ", "ệ"],
-    "i": ["i", "í", "ì", "ỉ", "ĩ", "ị"],
-    "o": ["o", "ó", "ò", "ỏ", "õ", "ọ"],
-    "ô": ["ô", "ố", "ồ", "ổ", "ỗ", "ộ"],
-    "ơ": ["ơ", "ớ", "ờ", "ở", "ỡ", "ợ"],
-    "u": ["u", "ú", "ù", "ủ", "ũ", "ụ"],
-    "ư": ["ư", "ứ", "ừ", "ử", "ữ", "ự"],
-    "y": ["y", "ý", "ỳ", "ỷ", "ỹ", "ỵ"],
-}
-
-_BASE_BY_CHAR = {}
-_FORMS_BY_BASE = {}
-for base, forms in _VOWELS.items():
-    _FORMS_BY_BASE[base] = forms
-    _FORMS_BY_BASE[base.upper()] = [c.upper() for c in forms]
-    for c in forms:
-        _BASE_BY_CHAR[c] = base
-        _BASE_BY_CHAR[c.upper()] = base.upper()
-
-_PRIORITY_BASES = set(list("âăêôơưÂĂÊÔƠƯ"))
+from src.services.api_client import ApiClient
+
+try:
+    from src.core.utils import speech_text
+except ImportError:
+    speech_text = None
+
+try:
+    from src.services.text_segmenter import StreamingSegmenter
+except ImportError:
+    StreamingSegmenter = None
 
 class ChatScreen(ctk.CTkFrame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, audio_client=None, api_client=None, offline_bundle=None):
         super().__init__(parent, fg_color="transparent")
         self.controller = controller 
 
         self.session_id = str(uuid.uuid4())
-        self.audio_client = AudioClient(tts_url=TTS_URL)
+        # Shared with the app: the mixer / mic / HTTP session are set up once, not per session
+        self.api = api_client or ApiClient(connect_timeout=API_CONNECT_TIMEOUT, read_timeout=TTS_READ_TIMEOUT,
+                                           retries=API_RETRIES)
+        self.audio_client = audio_client or AudioClient(tts_url=TTS_URL, stream_url=TTS_STREAM_URL, api_client=self.api)
+        # Cached answers used when the backend misses OFFLINE_DEADLINE_S or is unreachable
+        self.offline_bundle = offline_bundle or OfflineBundle(OFFLINE_BUNDLE_PATH, BUNDLE_URL, self.api)
         
         self.chat_history = []
-        self.message_labels = []
         self.stop_requested = False
-        self.current_ai_container = None
+        self.current_ai_message = None
+        self._scroll_job = None
         
         # --- TTS Streaming Queue ---
+        # Items are (epoch, Future[audio bytes]); the fetch starts as soon as a segment is queued,
+        # so the next segment downloads while the current one is playing.
         self.tts_queue = queue.Queue()
         self.stop_tts = False
+        self._tts_epoch = 0
+        self._tts_fetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts-fetch")
+        self._segmenter = StreamingSegmenter() if StreamingSegmenter else None
 
         self.current_state = None   
-        self.anim_job = None
-        self.anim_frame_idx = 0
+        # Avatar animation + non-urgent UI work (QR...) share one frame-timed scheduler
+        self.animator = AnimationScheduler(self, frame_ms=AVATAR_FRAME_MS)
+        # QR encoding runs on a worker; images are cached by content hash across sessions
+        self.qr_service = QRService(self, size=(180, 180), cache_entries=QR_CACHE_ENTRIES,
+                                    max_bytes=QR_MAX_PAYLOAD_BYTES, link=QR_DEEP_LINK)
 
         # --- NEW: Track playing state ---
         self.current_playing_btn = None
@@ -80,28 +87,73 @@ class ChatScreen(ctk.CTkFrame):
         self.vkbd_frame = None
         self.vkbd_keys = []
         self.telex_enabled = True
+        # Word-local composer; _telex_sync is the (caret, length) it last left the entry in
+        self.composer = TelexComposer()
+        self._telex_sync = None
         self.vkbd_shift = True          # bắt đầu in hoa
         self.shift_oneshot = True       # auto-off sau 1 chữ cái
         self.caps_locked = False        # double-tap Shift = caps lock
         self._last_shift_tap = 0.0
         self._double_tap_window = 0.38  # giây
         
-        # --- Avatar Cache ---
-        self._avatar_cache = {}
-        self._resize_job = None
+        # --- Layout ---
         self.CHAT_WRAP_MAX = 460
+        self.layout = LayoutManager(self, compute=self._bubble_wrap_length,
+                                    apply=self._apply_wrap_length, debounce_ms=LAYOUT_DEBOUNCE_MS)
         self.keyboard_visible = False
         
         self._build_layout()
-        
+
+        # --- GLOBAL CLICK BINDING FOR KEYBOARD HIDE ---
+        self.controller.bind_all("<Button-1>", self._on_global_click, add="+")
+        # Wrap width only depends on the chat card, so only its own resizes trigger a reflow
+        self.chat_card.bind("<Configure>", self.layout.on_configure, add="+")
+
+    # --- SESSION ---
+    # The screen is built once and reused: a new session clears state instead of rebuilding widgets.
+    # show_chat starts every session, including the first one (the screen is pre-built while hidden).
+    def start_session(self):
+        self.current_state = None
         self.set_avatar_state("waving", play_once=True)
         
         # Câu chào mặc định
         self.add_chat_bubble("ai", "Xin chào! Tôi có thể giúp gì cho bạn hôm nay?")
 
-        # --- GLOBAL CLICK BINDING FOR KEYBOARD HIDE ---
-        self.controller.bind_all("<Button-1>", self._on_global_click, add="+")
-        self.controller.bind("<Configure>", self._on_window_resize, add="+")
+    def reset_session(self):
+        """Stop everything in flight and clear the conversation; widgets are kept."""
+        # New session id: late callbacks from the old session's threads are ignored
+        self.session_id = str(uuid.uuid4())
+        self.chat_history = []
+
+        self.stop_requested = True
+        self._clear_tts_queue()
+        self.audio_client.stop()
+        if getattr(self, "is_recording", False):
+            self._listen_cancelled = True
+            self.audio_client.cancel_listen()
+        self.is_recording = False
+
+        self.current_ai_message = None
+        self.current_playing_btn = None
+        self.current_playing_text = None
+        self.transcript.clear()
+        self.animator.stop()
+
+        # Input + keyboard back to defaults
+        self.set_generating_state(False)
+        self.set_listening_state(False)
+        self.entry.delete(0, "end")
+        self.composer.reset()
+        self._telex_sync = None
+        self.hide_keyboard()
+        if not self.telex_enabled:
+            self.toggle_language()
+        self.caps_locked = False
+        self.vkbd_shift = True
+        self.shift_oneshot = True
+        self.apply_shift_style()
+        self.update_key_labels()
+        self.status_label.configure(text="")
 
     def _on_global_click(self, event):
         """
@@ -135,93 +187,20 @@ class ChatScreen(ctk.CTkFrame):
             # print(f"Global click error: {e}")
             pass
 
-    def _on_window_resize(self, event=None):
-        try:
-            if self._resize_job:
-                self.after_cancel(self._resize_job)
-            self._resize_job = self.after(120, self._apply_layout_policy)
-        except Exception:
-            pass
-
     def _compute_avatar_size(self):
         return (300, 350)
 
-    def _reflow_layout(self):
-        try:
-            wrap = max(260, self.chat_card.winfo_width() - 80)
-            for lbl in getattr(self, "message_labels", []):
-                try:
-                    # Clamp to CHAT_WRAP_MAX to avoid overflow on Pi
-                    lbl.configure(wraplength=min(self.CHAT_WRAP_MAX, wrap))
-                except Exception:
-                    pass
-            # Reassert input container min height and column minsizes
-            try:
-                if self.input_container:
-                    self.input_container.configure(height=70)
-                if self.input_bg:
-                    self.input_bg.grid_columnconfigure(1, minsize=48)
-                    self.input_bg.grid_columnconfigure(2, minsize=48)
-            except Exception:
-                pass
-            # Keyboard slot keeps layout stable; nothing to reposition
-        except Exception:
-            pass
-
-    def _refresh_ui(self):
-        try:
-            wrap = self._bubble_wrap_length()
-            for lbl in getattr(self, "message_labels", []):
-                try:
-                    lbl.configure(wraplength=wrap)
-                except Exception:
-                    pass
-            self.chat_frame.update_idletasks()
-        except Exception:
-            pass
-
-    def _apply_layout_policy(self):
-        try:
-            # Update bubble wraplength
-            wrap = self._bubble_wrap_length()
-            for lbl in getattr(self, "message_labels", []):
-                try:
-                    lbl.configure(wraplength=wrap)
-                except Exception:
-                    pass
-
-            # Reassert input container and buttons sizing
-            if self.input_container:
-                self.input_container.configure(height=70)
-            if self.input_bg:
-                self.input_bg.grid_rowconfigure(0, minsize=36)
-                self.input_bg.grid_columnconfigure(0, weight=1)
-                self.input_bg.grid_columnconfigure(1, minsize=48)
-                self.input_bg.grid_columnconfigure(2, minsize=48)
-
-            # Keep keyboard slot sizing stable
-            if self.keyboard_slot:
-                self.keyboard_slot.grid_columnconfigure(0, weight=1)
-                if self.keyboard_visible:
-                    self.keyboard_slot.configure(height=220)
-                    if self.vkbd_frame:
-                        try:
-                            self.vkbd_frame.grid_configure(sticky="ew", padx=10, pady=(6, 10))
-                        except Exception:
-                            pass
-                else:
-                    self.keyboard_slot.configure(height=0)
-
-            self.update_idletasks()
-        except Exception:
-            pass
+    def _bubble_wrap_length(self, width=None):
+        """Wrap width for bubbles from the chat card width; None while the card is not laid out."""
+        if width is None:
+            width = self.chat_card.winfo_width()
+        if width <= 1:
+            return None
+        return min(self.CHAT_WRAP_MAX, max(260, width - 80))
 
-    def _bubble_wrap_length(self):
-        try:
-            w = max(260, self.chat_card.winfo_width() - 80)
-            return min(self.CHAT_WRAP_MAX, w)
-        except Exception:
-            return self.CHAT_WRAP_MAX
+    def _apply_wrap_length(self, wrap):
+        # Only live bubbles are touched; recycled ones pick it up when rebound
+        self.transcript.set_wraplength(wrap)
 
     def _build_layout(self):
         self.grid_columnconfigure(0, weight=0) # Cột Avatar
@@ -296,6 +275,18 @@ class ChatScreen(ctk.CTkFrame):
         )
         self.chat_frame.pack(expand=True, fill="both", padx=15, pady=15)
         # Global click handler handles this now
+
+        # Only the most recent bubbles are live widgets; older messages are kept as data
+        self.transcript = Transcript(
+            self.chat_frame,
+            on_speaker=self._on_speaker_click,
+            make_qr=self.qr_service.request,
+            defer=self.animator.defer,
+            on_change=self._schedule_scroll,
+            on_recycle=self._on_bubble_recycled,
+            speaker_icon=assets.icons["speaker"],
+            wraplength=self.CHAT_WRAP_MAX,
+        )
         
         # Status
         self.status_label = ctk.CTkLabel(
@@ -540,9 +531,7 @@ class ChatScreen(ctk.CTkFrame):
                 self.keyboard_slot.configure(height=220)
                 self.vkbd_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(6, 10))
                 self.keyboard_visible = True
-                self.update_idletasks()
                 self.scroll_bottom()
-                self.after(0, self._apply_layout_policy)
         except Exception:
             pass
 
@@ -552,8 +541,6 @@ class ChatScreen(ctk.CTkFrame):
                 self.vkbd_frame.grid_remove()
                 self.keyboard_slot.configure(height=0)
                 self.keyboard_visible = False
-                self.update_idletasks()
-                self.after(0, self._apply_layout_policy)
         except Exception:
             pass
 
@@ -635,18 +622,11 @@ class ChatScreen(ctk.CTkFrame):
             else:
                 c = char
 
-            if self.telex_enabled and is_letter:
+            if self.telex_enabled:
                 self.process_telex_input(c)
             else:
-                cur = self.entry.get()
-                idx = self.entry.index("insert")
-                new = cur[:idx] + c + cur[idx:]
-                self.entry.delete(0, "end")
-                self.entry.insert(0, new)
-                try:
-                    self.entry.icursor(idx + len(c))
-                except Exception:
-                    pass
+                self._apply_edit(Edit(0, c))
+                self._telex_sync = None  # Composer resyncs when Telex is turned back on
 
             # auto-off oneshot after 1 letter (if not caps)
             if is_letter and (not self.caps_locked) and self.vkbd_shift and self.shift_oneshot:
@@ -663,131 +643,49 @@ class ChatScreen(ctk.CTkFrame):
         except Exception as e:
             print(f"VKbd error: {e}")
 
+    def _apply_edit(self, edit):
+        """Apply a composer Edit at the caret: only the changed characters are touched."""
+        idx = self.entry.index("insert")
+        start = max(0, idx - edit.delete)
+        if edit.delete:
+            self.entry.delete(start, idx)
+        if edit.insert:
+            self.entry.insert(start, edit.insert)
+        self._telex_sync = (self.entry.index("insert"), self.entry.index("end"))
+
+    def _sync_composer(self):
+        # Caret moved or text changed outside the composer -> re-read only the word before the caret
+        idx = self.entry.index("insert")
+        if self._telex_sync == (idx, self.entry.index("end")):
+            return
+        before = self.entry.get()[:idx]
+        i = len(before)
+        while i > 0 and before[i - 1].isalpha():
+            i -= 1
+        self.composer.reset(before[i:])
+
     def process_telex_input(self, char: str):
         try:
-            cur = self.entry.get()
-            idx = self.entry.index("insert")
-            before, after = cur[:idx], cur[idx:]
-            key = char.lower()
-
-            def set_text(new_before: str):
-                new = new_before + after
-                self.entry.delete(0, "end")
-                self.entry.insert(0, new)
-                try:
-                    self.entry.icursor(len(new_before))
-                except Exception:
-                    pass
-
-            # dd -> đ
-            if key == "d" and before and before[-1] in ("d", "D"):
-                set_text(before[:-1] + ("Đ" if before[-1] == "D" else "đ"))
-                return
-
-            # aa/ee/oo ; aw/ow/uw
-            if before:
-                prev = before[-1]
-                prev_low = prev.lower()
-                if key == "a" and prev_low == "a":
-                    set_text(before[:-1] + ("Â" if prev.isupper() else "â"))
-                    return
-                if key == "e" and prev_low == "e":
-                    set_text(before[:-1] + ("Ê" if prev.isupper() else "ê"))
-                    return
-                if key == "o" and prev_low == "o":
-                    set_text(before[:-1] + ("Ô" if prev.isupper() else "ô"))
-                    return
-                if key == "w":
-                    if prev_low == "a":
-                        set_text(before[:-1] + ("Ă" if prev.isupper() else "ă"))
-                        return
-                    if prev_low == "o":
-                        set_text(before[:-1] + ("Ơ" if prev.isupper() else "ơ"))
-                        return
-                    if prev_low == "u":
-                        set_text(before[:-1] + ("Ư" if prev.isupper() else "ư"))
-                        return
-
-            # tone keys
-            if key in TONE_KEYS:
-                j = len(before)
-                i = j
-                while i > 0 and before[i - 1].isalpha():
-                    i -= 1
-                word = before[i:j]
-                if not word:
-                    set_text(before + char)
-                    return
-
-                vowels = []
-                for pos, ch in enumerate(word):
-                    base = _BASE_BY_CHAR.get(ch)
-                    if base and base.lower() in _VOWELS:
-                        vowels.append(pos)
-
-                if not vowels:
-                    set_text(before + char)
-                    return
-
-                wl = word.lower()
-
-                def is_qu(pos): return pos == 1 and len(wl) >= 2 and wl[0] == "q" and wl[1] == "u"
-                def is_gi(pos): return pos == 1 and len(wl) >= 2 and wl[0] == "g" and wl[1] == "i"
-
-                vowels2 = [p for p in vowels if not (is_qu(p) or is_gi(p))]
-                if vowels2:
-                    vowels = vowels2
-
-                target = None
-                for p in vowels:
-                    if _BASE_BY_CHAR.get(word[p]) in _PRIORITY_BASES:
-                        target = p
-                if target is None:
-                    last_base = _BASE_BY_CHAR.get(word[vowels[-1]], "").lower()
-                    if len(vowels) >= 2 and last_base in ("i", "y", "u"):
-                        target = vowels[-2]
-                    else:
-                        target = vowels[-1]
-
-                ch = word[target]
-                base = _BASE_BY_CHAR.get(ch, ch)
-                forms = _FORMS_BY_BASE.get(base)
-                if not forms:
-                    set_text(before + char)
-                    return
-
-                new_ch = forms[TONE_KEYS[key]]
-                new_word = word[:target] + new_ch + word[target + 1:]
-                set_text(before[:i] + new_word)
-                return
-
-            set_text(before + char)
-
+            self._sync_composer()
+            self._apply_edit(self.composer.feed(char))
         except Exception as e:
             print(f"Telex error: {e}")
 
     def virtual_backspace(self):
         self.controller.reset_timer()
         try:
-            cur = self.entry.get()
-            idx = self.entry.index("insert")
-            if idx == 0:
-                if cur == "" and not self.caps_locked:
+            if self.entry.index("insert") == 0:
+                if self.entry.get() == "" and not self.caps_locked:
                     self.vkbd_shift = True
                     self.shift_oneshot = True
                     self.apply_shift_style()
                     self.update_key_labels()
                 return
 
-            new = cur[:max(0, idx - 1)] + cur[idx:]
-            self.entry.delete(0, "end")
-            self.entry.insert(0, new)
-            try:
-                self.entry.icursor(idx - 1)
-            except Exception:
-                pass
+            self._sync_composer()
+            self._apply_edit(self.composer.backspace())
 
-            if new == "" and not self.caps_locked:
+            if self.entry.index("end") == 0 and not self.caps_locked:
                 self.vkbd_shift = True
                 self.shift_oneshot = True
                 self.apply_shift_style()
@@ -801,40 +699,17 @@ class ChatScreen(ctk.CTkFrame):
 
     def _get_resized_frames(self, state):
         """
-        Resize avatar frames to fit 340px width (approx 300x330).
-        Cache results to avoid lag.
+        Avatar frames at the current avatar size, from the pre-scaled atlas.
+        Animations are lazy sequences (decoded on first display); still states are a single image.
+        The atlas keeps an LRU keyed by (state, size), so resizes don't grow memory.
         """
-        if state in self._avatar_cache:
-            return self._avatar_cache[state]
-
-        # 1. Get original frames
-        # Handle _anim logic here to simplify set_avatar_state
-        raw = assets.avatars.get(f"{state}_anim") or assets.avatars.get(state)
-        
-        if not raw:
+        atlas = assets.avatar_atlas
+        if not atlas.has(state):
             return None
-
-        TARGET_SIZE = self._compute_avatar_size()
-
-        def resize_one(img_obj):
-            try:
-                # Access internal PIL image and create new CTkImage
-                # Note: This relies on CTkImage implementation detail (_light_image)
-                if hasattr(img_obj, "_light_image"):
-                     return ctk.CTkImage(light_image=img_obj._light_image, size=TARGET_SIZE)
-                return img_obj # Fallback
-            except:
-                return img_obj
-
-        # 2. Resize
-        if isinstance(raw, list):
-            resized = [resize_one(img) for img in raw]
-        else:
-            resized = resize_one(raw)
-
-        # 3. Cache
-        self._avatar_cache[state] = resized
-        return resized
+        frames = atlas.frames(state, self._compute_avatar_size())
+        if not frames:
+            return None
+        return frames if atlas.is_animated(state) else frames[0]
 
     def set_avatar_state(self, state, play_once=False):
         """
@@ -846,144 +721,78 @@ class ChatScreen(ctk.CTkFrame):
         
         self.current_state = state
 
-        # Hủy animation cũ nếu đang chạy
-        if self.anim_job:
-            self.after_cancel(self.anim_job)
-            self.anim_job = None
-
         # 1. Tìm ảnh (Đã resize)
         frames = self._get_resized_frames(state)
 
-        # 2. Nếu là List ảnh -> Chạy Animation
-        if frames and isinstance(frames, list) and len(frames) > 0:
-            self.anim_frame_idx = 0
-            # delay=60ms (~15 FPS) là tốc độ vừa phải cho Anime
-            self._animate_loop(frames, delay=60, play_once=play_once)
+        # 2. Nếu là List ảnh -> Chạy Animation (thay thế animation cũ nếu đang chạy)
+        if frames and isinstance(frames, Sequence) and len(frames) > 0:
+            self._animate_loop(frames, play_once=play_once)
         
         # 3. Nếu là Ảnh đơn -> Hiển thị tĩnh
         else:
+            self.animator.stop()
             # Fallback về normal nếu không tìm thấy ảnh
             if not frames: 
                 frames = self._get_resized_frames("normal")
             
             # Xử lý trường hợp list chỉ có 1 ảnh
-            img = frames if not isinstance(frames, list) else frames[0]
+            img = frames if not isinstance(frames, Sequence) else frames[0]
             
             if img:
                 self.avatar_label.configure(image=img)
-    
-    def _animate_loop(self, frames, delay, play_once):
-        # 1. Kiểm tra an toàn
-        if play_once and self.current_state != "waving": return 
-        if not play_once and self.current_state not in ["answering", "speaking"]: return
-
-        # 2. Hiển thị khung hình hiện tại
-        if self.anim_frame_idx < len(frames):
-            self.avatar_label.configure(image=frames[self.anim_frame_idx])
-            
-            # --- LOGIC ĐIỀU KHIỂN VÒNG LẶP ---
-            
-            # Kiểm tra cả 2 tên cho chắc chắn
-            if self.current_state in ["answering", "speaking"]:
-                self.anim_frame_idx += 1
-                
-                # CẤU HÌNH (Dựa theo yêu cầu của bạn: Ảnh 9 -> 24)
-                # Index = Số thứ tự ảnh - 1
-                LOOP_START = 7   # Ảnh số 8
-                LOOP_END   = 22  # Ảnh số 23
-                
-                # [DEBUG] Bỏ comment dòng dưới để xem nó đang chạy ảnh số mấy
-                # print(f"Frame: {self.anim_frame_idx} (State: {self.current_state})")
 
-                # Nếu chạy vượt quá ảnh 24 -> Quay lại ảnh 9
-                if self.anim_frame_idx > LOOP_END:
-                    self.anim_frame_idx = LOOP_START
-            
-            # Các trạng thái khác (Waving...) -> Chạy thẳng
-            else:
-                self.anim_frame_idx += 1
+    def _show_avatar_frame(self, img):
+        self.avatar_label.configure(image=img)
+    
+    def _animate_loop(self, frames, play_once):
+        # Waving...: chạy thẳng một lần rồi về normal
+        if play_once:
+            self.animator.play(frames, self._show_avatar_frame, name=self.current_state,
+                               on_done=lambda: self.set_avatar_state("normal"))
+            return
 
-            # Tiếp tục chạy
-            self.anim_job = self.after(delay, lambda: self._animate_loop(frames, delay, play_once))
-        
+        # Answering: chạy từ đầu rồi lặp đoạn giữa (Ảnh 8 -> 23) cho tới khi đổi trạng thái
+        # Index = Số thứ tự ảnh - 1
+        LOOP_START = 7   # Ảnh số 8
+        LOOP_END   = 22  # Ảnh số 23
+        if self.current_state in ["answering", "speaking"] and len(frames) > LOOP_START:
+            loop = (LOOP_START, min(LOOP_END, len(frames) - 1))
         else:
-            # 3. Khi chạy hết danh sách ảnh (Chỉ xảy ra với Waving)
-            if play_once:
-                self.set_avatar_state("normal")
-            else:
-                # Phòng hờ: Nếu lỡ lọt vào đây thì reset về 0
-                self.anim_frame_idx = 0
-                self.anim_job = self.after(delay, lambda: self._animate_loop(frames, delay, play_once))
+            loop = (0, len(frames) - 1)
+        self.animator.play(frames, self._show_avatar_frame, name=self.current_state, loop=loop)
 
     # --- LOGIC CHAT ---
     def add_chat_bubble(self, role, text, is_loading=False):
-        # (Logic vẽ bong bóng chat giữ nguyên từ code cũ)
-        # Chỉ copy phần logic vẽ khung, label
-        # ... [BẠN COPY LẠI HÀM add_chat_bubble TỪ FILE kiosk_ui.py CŨ VÀO ĐÂY] ...
-        # Để ngắn gọn tôi viết tóm tắt:
-        if role == "ai":
-            container = ctk.CTkFrame(self.chat_frame, fg_color="transparent")
-            container.pack(anchor="w", padx=10, pady=5, fill="x")
-            if is_loading: self.current_ai_container = container
-            
-            # Professional: White bubble with soft text
-            bubble = ctk.CTkFrame(container, fg_color=AI_BUBBLE_COLOR, corner_radius=20)
-            bubble.pack(side="left")
-            label = ctk.CTkLabel(
-                bubble, 
-                text=text, 
-                font=(FONT_FAMILY, 16), 
-                text_color=TEXT_COLOR_DARK, 
-                justify="left", 
-                wraplength=self._bubble_wrap_length()
-            )
-            label.pack(padx=20, pady=15)
-            try:
-                self.message_labels.append(label)
-            except Exception:
-                pass
-            
-            if not is_loading: 
-                self._add_speaker_btn(container, text)
-                self._check_qr(container, text)
-        else:
-            container = ctk.CTkFrame(self.chat_frame, fg_color="transparent")
-            container.pack(anchor="e", padx=10, pady=5, fill="x")
-            
-            # Professional: Dark bubble with white text
-            bubble = ctk.CTkFrame(container, fg_color=USER_BUBBLE_COLOR, corner_radius=20)
-            bubble.pack(anchor="e", padx=10, pady=5)
-            label = ctk.CTkLabel(
-                bubble, 
-                text=text, 
-                font=(FONT_FAMILY, 16), 
-                text_color=USER_TEXT_COLOR, 
-                justify="right", 
-                wraplength=self._bubble_wrap_length()
-            )
-            label.pack(padx=20, pady=15)
-            try:
-                self.message_labels.append(label)
-            except Exception:
-                pass
-
-        self.after(50, self.scroll_bottom)
-        return label
-
-    def _add_speaker_btn(self, container, text):
-        btn = ctk.CTkButton(container, image=assets.icons["speaker"], text="", width=30, height=30, 
-                            fg_color="transparent", hover_color=BORDER_COLOR)
-        
-        # Bind click event with current button and text
-        btn.configure(command=lambda b=btn, t=text: self._on_speaker_click(b, t))
-        
-        btn.pack(side="left", padx=10, anchor="s")
-        return btn  # Return button reference
+        """Append a message to the transcript; returns its Message (widgets are recycled)."""
+        qr = role == "ai" and not is_loading and self._needs_qr(text)
+        msg = self.transcript.append(role, text, final=not is_loading, qr=qr)
+        if is_loading:
+            self.current_ai_message = msg
+        return msg
+
+    def _on_bubble_recycled(self, btn):
+        # The bubble scrolled out of the live window; its button will be reused for another message
+        if self.current_playing_btn is btn:
+            self.current_playing_btn = None
 
     def _clear_tts_queue(self):
         self.stop_requested = True
+        # New epoch: workers and in-flight fetches of the old one are discarded
+        self._tts_epoch += 1
         with self.tts_queue.mutex:
+            pending = list(self.tts_queue.queue)
             self.tts_queue.queue.clear()
+        for _, future in pending:
+            future.cancel()
+        if self._segmenter:
+            self._segmenter.reset()
+
+    def _enqueue_tts(self, text, epoch):
+        """Queue one utterance for playback and start fetching its audio right away."""
+        if not text or epoch != self._tts_epoch:
+            return
+        future = self._tts_fetcher.submit(self.audio_client.fetch, text, TTS_VOICE_NAME, TTS_SPEAKING_RATE)
+        self.tts_queue.put((epoch, future))
 
     def _on_speaker_click(self, btn, text):
         # Case 1: Clicked the button that is currently playing -> STOP
@@ -1034,23 +843,17 @@ class ChatScreen(ctk.CTkFrame):
             btn.configure(image=assets.icons["speaker"])
         except: pass
 
-    def _check_qr(self, container, text):
-        if any(kw in text for kw in QR_KEYWORDS):
-             self._append_qr(container, text)
+    def _needs_qr(self, text):
+        return any(kw in text for kw in QR_KEYWORDS)
 
-    def _append_qr(self, container, text):
-        try:
-            bubble = container.winfo_children()[0]
-            ctk.CTkFrame(bubble, height=1, fg_color=BORDER_COLOR).pack(fill="x", padx=20, pady=5)
-            
-            qr = qrcode.QRCode(box_size=10, border=2)
-            qr.add_data("KẾT QUẢ TƯ VẤN:\n" + text)
-            qr.make(fit=True)
-            img = ctk.CTkImage(light_image=qr.make_image(fill_color="black", back_color="white").get_image(), size=(180, 180))
-            
-            ctk.CTkLabel(bubble, image=img, text="").pack(pady=10)
-            self.scroll_bottom()
-        except: pass
+    def _schedule_scroll(self):
+        # Several transcript changes in a row -> a single scroll
+        if self._scroll_job is None:
+            self._scroll_job = self.after(50, self._run_scroll)
+
+    def _run_scroll(self):
+        self._scroll_job = None
+        self.scroll_bottom()
 
     def scroll_bottom(self):
         try:
@@ -1156,19 +959,14 @@ class ChatScreen(ctk.CTkFrame):
         # Toggle Logic: If already listening (checked via attribute or state), stop it.
         # But currently on_mic just starts a thread. We need a flag.
         if getattr(self, "is_recording", False):
-            # User wants to stop recording manually
-            # Since audio_client.listen is blocking, we can't easily stop it unless we use a non-blocking stream
-            # or kill the thread (unsafe). 
-            # For now, we just update UI and let the listen timeout/finish.
-            # OR if we had a proper stream client.
-            # Assuming legacy listen() blocks until silence. 
-            # We can't force stop 'speech_recognition' easily without logic change.
-            # So we'll just update UI to show "Stopping..."
-            self.status_label.configure(text="Đang xử lý...")
+            # Bấm lần nữa khi đang nghe -> hủy thật sự (listen() trả về None ngay)
+            self._listen_cancelled = True
+            self.audio_client.cancel_listen()
             return
 
         self.controller.reset_timer()
         self.is_recording = True
+        self._listen_cancelled = False
         self.set_listening_state(True)
         self.status_label.configure(text="Đang nghe...")
         self.set_avatar_state("listening")
@@ -1176,11 +974,14 @@ class ChatScreen(ctk.CTkFrame):
 
     def _thread_listen(self):
         def cb(msg): self.after(0, lambda: self.status_label.configure(text=msg))
-        # Note: listen() blocks until silence
+        # listen() chặn tới khi VAD phát hiện hết câu (hoặc bị hủy)
+        session = self.session_id
         text = self.audio_client.listen(status_callback=cb)
-        self.after(0, lambda: self._on_listen_done(text))
+        self.after(0, lambda: self._on_listen_done(text, session))
 
-    def _on_listen_done(self, text):
+    def _on_listen_done(self, text, session=None):
+        if session is not None and session != self.session_id:
+            return  # Cancelled by a session reset
         self.is_recording = False
         self.set_listening_state(False)
         
@@ -1188,7 +989,8 @@ class ChatScreen(ctk.CTkFrame):
             self.on_send_submit(text) 
         else:
             self.set_avatar_state("normal")
-            self.status_label.configure(text="Không nghe rõ.")
+            cancelled = getattr(self, "_listen_cancelled", False)
+            self.status_label.configure(text="Đã hủy." if cancelled else "Không nghe rõ.")
 
     def on_send_submit(self, text):
         self.add_chat_bubble("user", text)
@@ -1198,65 +1000,132 @@ class ChatScreen(ctk.CTkFrame):
 
     def _thread_ask_ai(self, question):
         self.stop_requested = False
-        self.after(0, lambda: setattr(self, "ai_bubble_label", self.add_chat_bubble("ai", "...", True)))
+        # Tokens are buffered here and drawn at a fixed frame rate on the main thread
+        renderer = StreamRenderer(self, fps=STREAM_RENDER_FPS, on_frame=self.scroll_bottom)
+        session = self.session_id
+        self.after(0, lambda: self._begin_stream(renderer, session))
         
-        # --- Start TTS Worker ---
+        # --- Start TTS Worker (new epoch: a previous answer's worker exits) ---
         self.stop_tts = False
-        while not self.tts_queue.empty():
-            try: self.tts_queue.get_nowait()
-            except: pass
-        threading.Thread(target=self._process_tts_queue, daemon=True).start()
+        self._tts_epoch += 1
+        epoch = self._tts_epoch
+        with self.tts_queue.mutex:
+            self.tts_queue.queue.clear()
+        if self._segmenter:
+            self._segmenter.reset()
+        threading.Thread(target=self._process_tts_queue, args=(epoch,), daemon=True).start()
         
         full = ""
-        # Removed buffer splitting logic to support full-text reading
+        # The request runs on its own thread so a missed first-byte deadline can be answered
+        # from the offline bundle without waiting for the read timeout
+        chunks = queue.Queue()
+        abandon = threading.Event()
+        threading.Thread(target=self._pump_chat, args=(question, session, chunks, abandon), daemon=True).start()
         
         try:
-            with requests.post(API_URL, json={"question": question, "history": [], "session_id": self.session_id}, stream=True, timeout=60) as res:
-                first = True
-                for chunk in res.iter_content(chunk_size=None, decode_unicode=True):
-                    if self.stop_requested: break
-                    clean = chunk.replace("__END__", "")
-                    self.after(0, lambda c=clean, f=first: self._update_stream(c, f))
-                    full += clean
-                    first = False
+            first = True
+            while True:
+                try:
+                    kind, data = chunks.get(timeout=OFFLINE_DEADLINE_S if first else None)
+                except queue.Empty:
+                    kind, data = "deadline", None
+                if first and kind in ("deadline", "error"):
+                    answer = self.offline_bundle.match(question)
+                    if answer:
+                        abandon.set()
+                        kind, data = "offline", answer
+                    elif kind == "deadline":
+                        first = False  # Nothing cached: keep waiting for the backend
+                        continue
+                if kind == "end":
+                    break
+                if kind == "error":
+                    full += f"[Error: {data}]"
+                    break
+                first = False
+                if self.stop_requested:
+                    abandon.set()
+                    break
+                clean = data.replace("__END__", "")
+                renderer.push(clean)
+                full += clean
+                # Speak each sentence as soon as it is complete
+                if self._segmenter:
+                    for seg in self._segmenter.feed(clean):
+                        self._enqueue_tts(seg, epoch)
+                if kind == "offline":
+                    print(f"📦 Trả lời từ offline bundle (backend quá {OFFLINE_DEADLINE_S}s / lỗi)")
+                    break
                     
         except Exception as e:
             full += f"[Error: {e}]"
         finally:
+            if self._segmenter and not self.stop_requested:
+                for seg in self._segmenter.flush():
+                    self._enqueue_tts(seg, epoch)
             self.stop_tts = True 
-            self.after(0, lambda: self._finalize_response(full))
+            self.after(0, lambda: self._finish_stream(renderer, full, session))
+
+    def _pump_chat(self, question, session, out, abandon):
+        """Streams the backend answer into `out` as ("chunk", text) ... then ("end" | "error", ...)."""
+        try:
+            # Not idempotent: only connection failures (request never sent) are retried
+            with self.api.stream("chat", API_URL, json={"question": question, "session_id": session},
+                                 read_timeout=CHAT_READ_TIMEOUT, decode_unicode=True) as chunks:
+                for chunk in chunks:
+                    if abandon.is_set():
+                        return  # Answered offline / stopped: closing the response ends the request
+                    out.put(("chunk", chunk))
+            out.put(("end", None))
+        except Exception as e:
+            out.put(("error", e))
 
     def _clean_for_tts(self, text):
         """Remove special characters from entire string for smoother TTS"""
         if not text: return ""
+        # Same normalisation as the server, so repeated answers map to the same audio
+        if speech_text is not None:
+            return speech_text(text)
         # Remove markdown chars (*, #, _, `, ~) but keep standard punctuation
         # Also remove square brackets [] often used for links/citations
         cleaned = re.sub(r"[\*\#_`~\[\]]", "", text)
         return cleaned.strip()
 
-    def _process_tts_queue(self):
-        # Removed premature state change
-        
-        while not self.stop_requested:
+    def _process_tts_queue(self, epoch):
+        started = False
+        while not self.stop_requested and epoch == self._tts_epoch:
             try:
-                # Wait for text with timeout to check stop_requested
-                text = self.tts_queue.get(timeout=0.5)
-                
-                # Check if this is a "Replay" action (full text) or stream
-                # For stream, we just speak blocking
-                if text:
-                    self.after(0, lambda: self.set_avatar_state("answering", play_once=False))
-                    self.audio_client.speak_blocking(text, voice_name=TTS_VOICE_NAME, speed=TTS_SPEAKING_RATE)
-                    
-                self.tts_queue.task_done()
+                # Wait with timeout to re-check stop_requested / epoch
+                item_epoch, future = self.tts_queue.get(timeout=0.5)
             except queue.Empty:
                 if self.stop_tts and self.tts_queue.empty():
                     break
+                continue
+            try:
+                if item_epoch != epoch:
+                    continue
+                # Usually already downloaded while the previous segment was playing
+                audio = future.result()
+                if audio and epoch == self._tts_epoch and not self.stop_requested:
+                    if not started:
+                        started = True
+                        self.after(0, lambda: self.set_avatar_state("answering", play_once=False))
+                    # Queued behind the current segment for gapless playback (non-blocking)
+                    self.audio_client.enqueue(audio)
+            except CancelledError:
+                pass
             except Exception as e:
                 print(f"TTS Worker Error: {e}")
+            finally:
+                self.tts_queue.task_done()
                 
-        # When done (or stopped), play finish animation and reset button
-        self.after(0, self._on_tts_finished)
+        # Let the queued segments finish (stop() releases this immediately)
+        self.audio_client.wait_idle()
+
+        # When done, play finish animation and reset button
+        # (a stopped/superseded worker leaves the UI to whoever stopped it)
+        if epoch == self._tts_epoch:
+            self.after(0, self._on_tts_finished)
 
     def _on_tts_finished(self):
         self._play_finish_animation()
@@ -1270,67 +1139,52 @@ class ChatScreen(ctk.CTkFrame):
         Interrupt current animation and play the closing sequence (speak_024 -> speak_033).
         Then return to normal state.
         """
-        # 1. Stop any running loop animation
-        if self.anim_job:
-            self.after_cancel(self.anim_job)
-            self.anim_job = None
-            
         self.current_state = "finishing"
 
-        # 2. Get frames (RESIZED)
+        # 1. Get frames (RESIZED)
         frames = self._get_resized_frames("answering")
         if not frames:
             self.set_avatar_state("normal")
             return
             
-        # 3. Slice frames: speak_024 (index 23) to speak_033 (index 32)
-        # We take up to index 33 (exclusive) to include 32.
-        # If the list is shorter, python slicing handles it safely.
-        finish_frames = frames[23:33]
-        
-        if not finish_frames:
+        # 2. Play speak_024 (index 23) to speak_033 (index 32); the scheduler replaces any running loop
+        if len(frames) <= 23:
             self.set_avatar_state("normal")
             return
 
-        self._animate_oneshot(finish_frames)
+        self.animator.play(frames, self._show_avatar_frame, name="finishing", start=23, stop=33,
+                           on_done=lambda: self.set_avatar_state("normal"))
 
-    def _animate_oneshot(self, frames, idx=0):
-        if idx >= len(frames):
-            self.set_avatar_state("normal")
-            return
-            
-        self.avatar_label.configure(image=frames[idx])
-        # Use self.anim_job so it can be cancelled if needed
-        self.anim_job = self.after(60, lambda: self._animate_oneshot(frames, idx+1))
+    def _begin_stream(self, renderer, session):
+        if session != self.session_id:
+            return  # Session was reset before the answer started
+        msg = self.add_chat_bubble("ai", "...", True)
+        renderer.start(lambda t: self.transcript.set_text(msg, t))
 
-    def _update_stream(self, text, is_first):
-        if self.ai_bubble_label:
-            cur = self.ai_bubble_label.cget("text")
-            new = text if is_first else (cur + text)
-            self.ai_bubble_label.configure(text=new.replace("**",""))
-            self.scroll_bottom()
+    def _finish_stream(self, renderer, text, session):
+        renderer.finish()
+        if session == self.session_id:
+            self._finalize_response(text)
 
     def _finalize_response(self, text):
         # If user stopped generation, don't queue TTS and don't set active state
         if self.stop_requested:
-            if self.current_ai_container:
-                self._add_speaker_btn(self.current_ai_container, text)
-                self._check_qr(self.current_ai_container, text)
+            if self.current_ai_message:
+                self.transcript.finalize(self.current_ai_message, text, qr=self._needs_qr(text))
             return
 
         self.set_generating_state(False)
-        # Queue full text for smooth reading
-        if text and not text.startswith("[Error"):
+        # Without the segmenter, fall back to reading the full text at once
+        if not self._segmenter and text and not text.startswith("[Error"):
             cleaned = self._clean_for_tts(text)
             if cleaned:
-                self.tts_queue.put(cleaned)
+                self._enqueue_tts(cleaned, self._tts_epoch)
         
         # Thêm nút loa và QR
         speaker_btn = None
-        if self.current_ai_container:
-            # Capture the button returned by _add_speaker_btn
-            speaker_btn = self._add_speaker_btn(self.current_ai_container, text)
-            self._check_qr(self.current_ai_container, text)
+        if self.current_ai_message:
+            # Speaker button of the (live) bubble, None if it already scrolled out of the window
+            speaker_btn = self.transcript.finalize(self.current_ai_message, text, qr=self._needs_qr(text))
 
         # Update button state to "Playing" (Stop icon) because we just queued the text
         if speaker_btn and text and not text.startswith("[Error"):
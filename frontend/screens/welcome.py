@@ -22,17 +22,10 @@ class WelcomeScreen(ctk.CTkFrame):
         container.place(relx=0.5, rely=0.5, anchor="center")
 
         # 1. Avatar (Compact for 600px height)
-        avatar_img = assets.avatars.get("normal")
+        # Welcome screen size (250x275) is pre-scaled in the avatar atlas
+        avatar_img = assets.avatar_atlas.image("normal", (250, 275))
         if avatar_img:
-            # Resize for welcome screen (Scale 50% from 500x550 -> 250x275)
-            # Access internal PIL image to create new CTkImage with different size
-            try:
-                pil_img = avatar_img._light_image
-                resized_avatar = ctk.CTkImage(light_image=pil_img, size=(250, 275))
-                ctk.CTkLabel(container, text="", image=resized_avatar).pack(pady=(0, 10))
-            except:
-                # Fallback if internal access fails
-                ctk.CTkLabel(container, text="", image=avatar_img).pack(pady=(0, 20))
+            ctk.CTkLabel(container, text="", image=avatar_img).pack(pady=(0, 10))
 
         # 2. Title
         ctk.CTkLabel(
@@ -0,0 +1,90 @@
+# frontend/stream_renderer.py
+"""
+Hiển thị câu trả lời đang stream theo nhịp khung hình cố định.
+
+- Luồng mạng chỉ push() token vào bộ đệm (có lock), không đụng tới Tk và không xếp after() mỗi chunk.
+- Trên main thread, mỗi khung (mặc định 20 FPS) gom toàn bộ token đã tới, bỏ '**' trên phần
+  mới (kể cả khi '**' bị cắt đôi giữa hai chunk), nối vào văn bản đã có và cập nhật label một lần.
+- on_frame (vd. cuộn xuống cuối) chạy tối đa một lần mỗi khung, chỉ khi văn bản thay đổi.
+"""
+import threading
+
+
+class StreamRenderer:
+    def __init__(self, widget, fps=20, on_frame=None):
+        self.widget = widget
+        self.interval_ms = max(1, int(1000 / fps))
+        self.on_frame = on_frame
+        self._lock = threading.Lock()
+        self._pending = []
+        self._carry = ""  # '*' lẻ cuối chunk, chờ chunk sau để biết có phải '**'
+        self._text = ""
+        self._set_text = None
+        self._job = None
+        self._tick_cb = self._tick
+        self.frames = 0
+        self.chunks = 0
+
+    @property
+    def text(self):
+        return self._text
+
+    # --- Luồng mạng ---
+    def push(self, chunk):
+        if not chunk:
+            return
+        with self._lock:
+            self._pending.append(chunk)
+            self.chunks += 1
+
+    # --- Main thread ---
+    def start(self, set_text):
+        """Bắt đầu vẽ vào `set_text(full_text)`; các chunk đã push trước đó vẫn được giữ."""
+        self._set_text = set_text
+        self._tick()
+
+    def finish(self):
+        """Vẽ nốt phần còn lại và dừng. Trả về toàn bộ văn bản đã hiển thị."""
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+        self._render(final=True)
+        self._set_text = None
+        return self._text
+
+    def _take(self, final):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending and not (final and self._carry):
+            return ""
+        delta = self._carry + "".join(pending)
+        self._carry = ""
+        if not final and delta.endswith("*") and not delta.endswith("**"):
+            delta, self._carry = delta[:-1], "*"
+        return delta.replace("**", "")
+
+    def _render(self, final=False):
+        delta = self._take(final)
+        if not delta or self._set_text is None:
+            return
+        self._text += delta
+        try:
+            self._set_text(self._text)
+            self.frames += 1
+            if self.on_frame:
+                self.on_frame()
+        except Exception as e:
+            print(f"Stream render error: {e}")
+
+    def _tick(self):
+        self._job = None
+        if self._set_text is None:
+            return
+        self._render()
+        try:
+            self._job = self.widget.after(self.interval_ms, self._tick_cb)
+        except Exception:
+            self._job = None  # Widget đã bị hủy
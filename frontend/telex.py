@@ -0,0 +1,306 @@
+# frontend/telex.py
+"""
+Bộ gõ tiếng Việt (Telex / VNI) độc lập với UI.
+
+- Trạng thái chỉ gồm từ đang gõ trước con trỏ (âm đầu, cụm nguyên âm, âm cuối, dấu thanh);
+  ký tự thường được thêm vào trạng thái từng bước, không quét lại cả ô nhập.
+- Vị trí dấu thanh tra trong bảng tính sẵn theo (cụm nguyên âm, có âm cuối hay không),
+  và tự dời khi cụm nguyên âm thay đổi (mù + a -> mùa, hoà + n -> hoàn).
+- Mỗi phím trả về một Edit tối thiểu: xóa `delete` ký tự ngay trước con trỏ rồi chèn `insert`,
+  nên widget chỉ phải sửa đúng các ký tự thay đổi.
+- Gõ lặp phím biến đổi để hoàn tác (aaa -> aa, ss -> s); từ không hợp lệ (tiếng Anh...) giữ nguyên.
+"""
+from itertools import product
+from typing import List, NamedTuple, Optional
+
+
+class Edit(NamedTuple):
+    delete: int  # Số ký tự xóa ngay trước con trỏ
+    insert: str  # Văn bản chèn vào sau khi xóa
+
+
+# Dạng có dấu theo thứ tự: không dấu, sắc, huyền, hỏi, ngã, nặng
+_VOWELS = {
+    "a": "aáàảãạ", "ă": "ăắằẳẵặ", "â": "âấầẩẫậ",
+    "e": "eéèẻẽẹ", "ê": "êếềểễệ",
+    "i": "iíìỉĩị",
+    "o": "oóòỏõọ", "ô": "ôốồổỗộ", "ơ": "ơớờởỡợ",
+    "u": "uúùủũụ", "ư": "ưứừửữự",
+    "y": "yýỳỷỹỵ",
+}
+_PRIORITY = set("ăâêôơư")  # Nguyên âm có mũ/móc nhận dấu trước
+_FINALS = ("c", "ch", "m", "n", "ng", "nh", "p", "t")
+_FINAL_PREFIXES = {f[:i] for f in _FINALS for i in range(1, len(f) + 1)}
+
+# ký tự -> (nguyên âm gốc thường, thanh, viết hoa)
+_DECOMPOSE = {}
+_COMPOSE = {}
+for _base, _forms in _VOWELS.items():
+    for _tone, _ch in enumerate(_forms):
+        _DECOMPOSE[_ch] = (_base, _tone, False)
+        _DECOMPOSE[_ch.upper()] = (_base, _tone, True)
+        _COMPOSE[(_base, _tone)] = _ch
+
+# Biến đổi nguyên âm gốc: mũ (â ê ô), móc (ơ ư), trăng (ă)
+_HAT = {"a": "â", "e": "ê", "o": "ô"}
+_HORN = {"o": "ơ", "u": "ư"}
+_BREVE = {"a": "ă"}
+
+
+def _placement(bases, has_final):
+    """Index trong cụm nguyên âm nhận dấu thanh (kiểu mới: hoà, khoẻ, thuỷ)."""
+    pri = [i for i, b in enumerate(bases) if b in _PRIORITY]
+    if pri:
+        return pri[-1]
+    if len(bases) == 1:
+        return 0
+    if has_final:
+        return len(bases) - 1        # hoàn, toán, huýt
+    if len(bases) == 3:
+        return 1                     # ngoài, khuỷu
+    if bases in (("o", "a"), ("o", "e"), ("u", "y")):
+        return 1                     # hoà, khoẻ, thuỷ
+    return 0                         # mùa, mía, hài, cháu
+
+
+# Bảng tính sẵn cho mọi cụm 1-3 nguyên âm
+_TONE_TABLE = {
+    (bases, has_final): _placement(bases, has_final)
+    for n in (1, 2, 3)
+    for bases in product(_VOWELS, repeat=n)
+    for has_final in (False, True)
+}
+
+TELEX_TONES = {"s": 1, "f": 2, "r": 3, "x": 4, "j": 5, "z": 0}
+VNI_TONES = {"1": 1, "2": 2, "3": 3, "4": 4, "5": 5, "0": 0}
+
+
+def _with(ch, base=None, tone=None):
+    """Đổi nguyên âm gốc và/hoặc thanh của một ký tự nguyên âm, giữ hoa/thường."""
+    b, t, upper = _DECOMPOSE[ch]
+    out = _COMPOSE[(base if base is not None else b, tone if tone is not None else t)]
+    return out.upper() if upper else out
+
+
+class TelexComposer:
+    def __init__(self, method: str = "telex"):
+        self.method = method
+        self.tones = VNI_TONES if method == "vni" else TELEX_TONES
+        self.reset()
+
+    # --- Trạng thái từ ---
+    def reset(self, word: str = "") -> None:
+        """Đồng bộ với từ đang đứng trước con trỏ (khi con trỏ di chuyển / ô nhập bị sửa ngoài)."""
+        self._undo = None  # (phím, ký tự trước khi biến đổi) để gõ lặp là hoàn tác
+        self._parse(list(word))
+
+    @property
+    def word(self) -> str:
+        return "".join(self.chars)
+
+    def _parse(self, chars: List[str]) -> None:
+        self.chars = []
+        self.v0 = self.v1 = -1   # Cụm nguyên âm: chars[v0:v1]
+        self.final = ""
+        self.valid = True
+        for ch in chars:
+            self._push(ch)
+
+    def _push(self, ch: str) -> None:
+        """Thêm một chữ cái vào cuối từ, cập nhật âm đầu / cụm nguyên âm / âm cuối."""
+        pos = len(self.chars)
+        self.chars.append(ch)
+        if not self.valid:
+            return
+        if ch in _DECOMPOSE:
+            if self.final or (self.v1 != -1 and self.v1 != pos):
+                self.valid = False          # Nguyên âm sau âm cuối: không phải tiếng Việt
+            elif self.v0 == -1:
+                self.v0, self.v1 = pos, pos + 1
+            else:
+                self.v1 = pos + 1
+                if self.v1 - self.v0 > 3:
+                    self.valid = False
+        elif self.v0 != -1:
+            self.final += ch.lower()
+            if self.final not in _FINAL_PREFIXES:
+                self.valid = False
+
+    def _cluster(self):
+        """(đầu, cuối) của phần nguyên âm thật, bỏ 'u' của qu và 'i' của gi."""
+        v0, v1 = self.v0, self.v1
+        if v0 == -1:
+            return -1, -1
+        onset = "".join(self.chars[:v0]).lower()
+        first = _DECOMPOSE[self.chars[v0]][0]
+        if v1 - v0 > 1 and ((onset == "q" and first == "u") or (onset == "g" and first == "i")):
+            v0 += 1
+        return v0, v1
+
+    def _tone(self):
+        """(thanh, vị trí) hiện tại của từ; (0, -1) nếu chưa có dấu."""
+        for i in range(max(self.v0, 0), max(self.v1, 0)):
+            t = _DECOMPOSE[self.chars[i]][1]
+            if t:
+                return t, i
+        return 0, -1
+
+    def _target(self):
+        v0, v1 = self._cluster()
+        if v0 == -1:
+            return -1
+        bases = tuple(_DECOMPOSE[c][0] for c in self.chars[v0:v1])
+        return v0 + _TONE_TABLE[(bases, bool(self.final))]
+
+    def _place_tone(self, chars: List[str]) -> List[str]:
+        """Dời dấu thanh về đúng vị trí sau khi cụm nguyên âm / âm cuối thay đổi."""
+        tone, pos = self._tone()
+        if not tone or not self.valid:
+            return chars
+        target = self._target()
+        if target == pos or target == -1:
+            return chars
+        chars = list(chars)
+        chars[pos] = _with(chars[pos], tone=0)
+        chars[target] = _with(chars[target], tone=tone)
+        return chars
+
+    # --- Edit ---
+    def _commit(self, old: List[str], new_chars: List[str]) -> Edit:
+        """Chuyển trạng thái sang `new_chars` (đã dời dấu nếu cần) và trả về Edit so với `old`."""
+        self._parse(new_chars)
+        fixed = self._place_tone(self.chars)
+        if fixed is not self.chars:
+            self._parse(fixed)
+        new_chars = self.chars
+        p = 0
+        n = min(len(old), len(new_chars))
+        while p < n and old[p] == new_chars[p]:
+            p += 1
+        return Edit(len(old) - p, "".join(new_chars[p:]))
+
+    def feed(self, ch: str) -> Edit:
+        """Xử lý một phím; trả về Edit cần áp dụng tại con trỏ."""
+        is_vni_key = self.method == "vni" and ch.isdigit() and bool(self.chars)
+        if not ch.isalpha() and not is_vni_key:
+            # Ranh giới từ (khoảng trắng, dấu câu, số...)
+            self.reset()
+            return Edit(0, ch)
+
+        key = ch.lower()
+        old = list(self.chars)
+        if self._undo is not None and self._undo[0] == key:
+            # Gõ lặp phím biến đổi -> trả lại ký tự cũ và thêm phím như chữ thường
+            edit = self._commit(old, self._undo[1] + [ch])
+            self._undo = None
+            self.valid = False  # Người dùng chủ động gõ chữ thường: không biến đổi tiếp trong từ này
+            return edit
+
+        new = self._modify(key) if self.valid and self.chars else None
+        if new is None and key == "w" and self.method == "telex" and self.valid and self.v0 == -1:
+            new = self.chars + ["Ư" if ch.isupper() else "ư"]  # 'w' đứng riêng -> ư
+        if new is not None:
+            edit = self._commit(old, new)
+            self._undo = (key, old)
+            return edit
+
+        self._undo = None
+        if is_vni_key:
+            # Số không biến đổi được gì -> kết thúc từ
+            self.reset()
+            return Edit(0, ch)
+
+        # Chữ thường: thêm từng bước, chỉ sửa lại nếu dấu thanh phải dời (mù + a -> mùa)
+        self._push(ch)
+        fixed = self._place_tone(self.chars)
+        if fixed is self.chars:
+            return Edit(0, ch)
+        return self._commit(old, fixed)
+
+    def backspace(self) -> Edit:
+        if self.chars:
+            self._undo = None
+            self._parse(self.chars[:-1])
+        return Edit(1, "")
+
+    # --- Phím biến đổi ---
+    def _modify(self, key: str) -> Optional[List[str]]:
+        if key in self.tones:
+            return self._apply_tone(self.tones[key])
+        if self.method == "vni":
+            if key == "6":
+                return self._apply_mark(_HAT, None)
+            if key == "7":
+                return self._apply_mark(_HORN, None, horn=True)
+            if key == "8":
+                return self._apply_mark(_BREVE, None)
+            if key == "9":
+                return self._apply_d()
+            return None
+        if key in _HAT:
+            return self._apply_mark(_HAT, key)
+        if key == "w":
+            new = self._apply_mark(_HORN, None, horn=True)
+            return new if new is not None else self._apply_mark(_BREVE, None)
+        if key == "d":
+            return self._apply_d()
+        return None
+
+    def _apply_tone(self, tone: int) -> Optional[List[str]]:
+        if self.v0 == -1:
+            return None
+        cur, pos = self._tone()
+        if tone == 0:
+            if not cur:
+                return None
+            new = list(self.chars)
+            new[pos] = _with(new[pos], tone=0)
+            return new
+        if cur == tone:
+            return None
+        new = list(self.chars)
+        if cur:
+            new[pos] = _with(new[pos], tone=0)
+        target = self._target()
+        new[target] = _with(new[target], tone=tone)
+        return new
+
+    def _apply_mark(self, table, letter, horn=False) -> Optional[List[str]]:
+        v0, v1 = self.v0, self.v1
+        if v0 == -1:
+            return None
+        bases = [_DECOMPOSE[c][0] for c in self.chars[v0:v1]]
+        new = list(self.chars)
+        if horn:
+            # uo + w -> ươ (người, được, thương)
+            for i in range(len(bases) - 1):
+                if bases[i] == "u" and bases[i + 1] == "o":
+                    new[v0 + i] = _with(new[v0 + i], base="ư")
+                    new[v0 + i + 1] = _with(new[v0 + i + 1], base="ơ")
+                    return new
+        for i in range(len(bases) - 1, -1, -1):
+            b = bases[i]
+            if b in table and (letter is None or b == letter):
+                new[v0 + i] = _with(new[v0 + i], base=table[b])
+                return new
+        return None
+
+    def _apply_d(self) -> Optional[List[str]]:
+        first = self.chars[0]
+        if first in ("d", "D"):
+            new = list(self.chars)
+            new[0] = "Đ" if first == "D" else "đ"
+            return new
+        return None
+
+
+def compose(keys: str, method: str = "telex") -> str:
+    """Gõ cả chuỗi phím và trả về văn bản (dùng cho kiểm thử / benchmark)."""
+    composer = TelexComposer(method)
+    out: List[str] = []
+    for k in keys:
+        edit = composer.feed(k)
+        if edit.delete:
+            del out[-edit.delete:]
+        out.extend(edit.insert)
+    return "".join(out)
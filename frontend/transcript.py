@@ -0,0 +1,253 @@
+# frontend/transcript.py
+"""
+Transcript hội thoại ảo hóa (virtualized) cho màn hình chat.
+
+- Mọi tin nhắn được giữ dưới dạng dữ liệu (Message); chỉ một cửa sổ tối đa `max_live` tin gần
+  nhất có widget thật. Tin cũ hơn bị gỡ widget, người dùng xem lại bằng nút "tin nhắn cũ hơn".
+- Widget bong bóng (khung, nhãn, nút loa, QR) được tái sử dụng qua pool theo vai trò,
+  nên bộ nhớ và chi phí relayout (đổi wraplength) không tăng theo độ dài phiên.
+- make_qr(text, callback) là bất đồng bộ (xem frontend/qr_service.py).
+"""
+import customtkinter as ctk
+
+from frontend.config import *
+
+
+class Message:
+    __slots__ = ("role", "text", "raw", "final", "qr")
+
+    def __init__(self, role, text, final=True):
+        self.role = role
+        self.text = text   # Văn bản hiển thị
+        self.raw = text    # Văn bản gốc (cho loa / QR)
+        self.final = final  # False khi đang stream (chưa có nút loa / QR)
+        self.qr = False
+
+
+class _BubbleView:
+    """Một bộ widget bong bóng; được gắn lần lượt cho nhiều Message."""
+    def __init__(self, transcript, role):
+        self.transcript = transcript
+        self.role = role
+        self.message = None
+        self.qr_separator = None
+        self.qr_label = None
+        self.speaker_btn = None
+
+        self.container = ctk.CTkFrame(transcript.frame, fg_color="transparent")
+        if role == "ai":
+            # Professional: White bubble with soft text
+            self.bubble = ctk.CTkFrame(self.container, fg_color=AI_BUBBLE_COLOR, corner_radius=20)
+            self.bubble.pack(side="left")
+            self.label = ctk.CTkLabel(self.bubble, text="", font=(FONT_FAMILY, 16), text_color=TEXT_COLOR_DARK,
+                                      justify="left", wraplength=transcript.wraplength)
+            self.label.pack(padx=20, pady=15)
+        else:
+            # Professional: Dark bubble with white text
+            self.bubble = ctk.CTkFrame(self.container, fg_color=USER_BUBBLE_COLOR, corner_radius=20)
+            self.bubble.pack(anchor="e", padx=10, pady=5)
+            self.label = ctk.CTkLabel(self.bubble, text="", font=(FONT_FAMILY, 16), text_color=USER_TEXT_COLOR,
+                                      justify="right", wraplength=transcript.wraplength)
+            self.label.pack(padx=20, pady=15)
+        self._wrap = transcript.wraplength
+
+    def pack(self, before=None):
+        anchor = "w" if self.role == "ai" else "e"
+        kw = {"before": before} if before is not None else {}
+        self.container.pack(anchor=anchor, padx=10, pady=5, fill="x", **kw)
+
+    def bind(self, message):
+        self.message = message
+        self.set_wraplength(self.transcript.wraplength)
+        self.label.configure(text=message.text)
+        self.refresh_extras()
+
+    def unbind(self):
+        self.container.pack_forget()
+        self._hide_qr()
+        if self.speaker_btn is not None:
+            self.speaker_btn.pack_forget()
+            self.transcript.on_recycle(self.speaker_btn)
+        self.message = None
+
+    def set_wraplength(self, wrap):
+        if wrap != self._wrap:
+            self.label.configure(wraplength=wrap)
+            self._wrap = wrap
+
+    def refresh_extras(self):
+        """Nút loa + QR cho tin AI đã hoàn chỉnh."""
+        msg = self.message
+        if self.role != "ai" or msg is None:
+            return
+        if msg.final:
+            btn = self._speaker()
+            btn.configure(image=self.transcript.speaker_icon)
+            btn.pack(side="left", padx=10, anchor="s")
+        elif self.speaker_btn is not None:
+            self.speaker_btn.pack_forget()
+        if msg.final and msg.qr:
+            # QR được encode ngoài main thread; khi có ảnh mới chèn widget (giữa các khung animation)
+            self.transcript.make_qr(msg.raw, lambda img, m=msg: self.transcript.defer(lambda: self._show_qr(m, img)))
+        else:
+            self._hide_qr()
+
+    def _speaker(self):
+        if self.speaker_btn is None:
+            self.speaker_btn = ctk.CTkButton(self.container, text="", width=30, height=30,
+                                             fg_color="transparent", hover_color=BORDER_COLOR,
+                                             command=self._on_speaker)
+        return self.speaker_btn
+
+    def _on_speaker(self):
+        if self.message is not None:
+            self.transcript.on_speaker(self.speaker_btn, self.message.raw)
+
+    def _show_qr(self, message, img):
+        # Bỏ qua nếu view đã được gắn cho tin khác trong lúc chờ ảnh
+        if self.message is not message or img is None:
+            return
+        if self.qr_label is None:
+            self.qr_separator = ctk.CTkFrame(self.bubble, height=1, fg_color=BORDER_COLOR)
+            self.qr_label = ctk.CTkLabel(self.bubble, text="")
+        self.qr_separator.pack(fill="x", padx=20, pady=5)
+        self.qr_label.configure(image=img)
+        self.qr_label.pack(pady=10)
+        self.transcript.on_change()
+
+    def _hide_qr(self):
+        if self.qr_label is not None:
+            self.qr_separator.pack_forget()
+            self.qr_label.pack_forget()
+            self.qr_label.configure(image=None)
+
+
+class Transcript:
+    def __init__(self, frame, on_speaker, make_qr, defer, on_change, on_recycle=None,
+                 speaker_icon=None, wraplength=460, max_live=CHAT_MAX_LIVE_BUBBLES):
+        self.frame = frame
+        self.on_speaker = on_speaker
+        self.make_qr = make_qr
+        self.defer = defer
+        self.on_change = on_change
+        self.on_recycle = on_recycle or (lambda btn: None)
+        self.speaker_icon = speaker_icon
+        self.wraplength = wraplength
+        self.max_live = max(2, max_live)
+
+        self.messages = []
+        self._start = 0   # Cửa sổ hiển thị: messages[_start:_end]
+        self._end = 0
+        self._live = []   # Các _BubbleView đang gắn, theo thứ tự hiển thị
+        self._views = {}  # id(Message) -> _BubbleView
+        self._pool = {"ai": [], "user": []}
+
+        self._older_btn = ctk.CTkButton(frame, text="▲ Xem tin nhắn cũ hơn", height=28, corner_radius=14,
+                                        fg_color="transparent", text_color=MUTED, hover_color=BORDER_COLOR,
+                                        font=(FONT_FAMILY, 13), command=self.show_older)
+        self._newer_btn = ctk.CTkButton(frame, text="▼ Tin nhắn mới nhất", height=28, corner_radius=14,
+                                        fg_color="transparent", text_color=MUTED, hover_color=BORDER_COLOR,
+                                        font=(FONT_FAMILY, 13), command=self.show_latest)
+
+    # --- Tin nhắn ---
+    def append(self, role, text, final=True, qr=False):
+        msg = Message(role, text, final)
+        msg.qr = qr
+        self.messages.append(msg)
+        if self._end < len(self.messages) - 1:
+            # Đang xem tin cũ -> nhảy về cuối
+            self.show_latest()
+            return msg
+        self._end = len(self.messages)
+        self._live.append(self._attach(msg))
+        while len(self._live) > self.max_live:
+            self._detach(self._live.pop(0))
+            self._start += 1
+        self._update_nav()
+        self.on_change()
+        return msg
+
+    def set_text(self, msg, text):
+        """Cập nhật văn bản hiển thị (dùng khi stream)."""
+        msg.text = text
+        view = self._views.get(id(msg))
+        if view is not None:
+            view.label.configure(text=text)
+
+    def finalize(self, msg, raw, qr=False):
+        """Tin AI đã stream xong: gắn nút loa (+ QR). Trả về nút loa nếu tin đang hiển thị."""
+        msg.raw = raw
+        msg.final = True
+        msg.qr = qr
+        view = self._views.get(id(msg))
+        if view is None:
+            return None
+        view.refresh_extras()
+        return view.speaker_btn
+
+    def speaker_button(self, msg):
+        view = self._views.get(id(msg))
+        return view.speaker_btn if view is not None else None
+
+    def clear(self):
+        for view in self._live:
+            self._detach(view)
+        self._live = []
+        self.messages = []
+        self._start = self._end = 0
+        self._update_nav()
+
+    # --- Layout ---
+    def set_wraplength(self, wrap):
+        """Chỉ chạm vào các bong bóng đang hiển thị (tối đa max_live)."""
+        self.wraplength = wrap
+        for view in self._live:
+            view.set_wraplength(wrap)
+
+    def live_count(self):
+        return len(self._live)
+
+    # --- Cửa sổ hiển thị ---
+    def show_older(self):
+        self._render(max(0, self._start - self.max_live // 2))
+
+    def show_latest(self):
+        self._render(max(0, len(self.messages) - self.max_live))
+
+    def _render(self, start):
+        for view in self._live:
+            self._detach(view)
+        self._older_btn.pack_forget()
+        self._newer_btn.pack_forget()
+        self._start = start
+        self._end = min(len(self.messages), start + self.max_live)
+        self._live = [self._attach(m) for m in self.messages[self._start:self._end]]
+        self._update_nav()
+        self.on_change()
+
+    def _update_nav(self):
+        first = self._live[0].container if self._live else None
+        if self._start > 0:
+            kw = {"before": first} if first is not None else {}
+            self._older_btn.pack(pady=(0, 5), **kw)
+        else:
+            self._older_btn.pack_forget()
+        if self._end < len(self.messages):
+            self._newer_btn.pack(pady=(5, 0))
+        else:
+            self._newer_btn.pack_forget()
+
+    # --- Pool ---
+    def _attach(self, msg):
+        pool = self._pool[msg.role]
+        view = pool.pop() if pool else _BubbleView(self, msg.role)
+        view.bind(msg)
+        view.pack()
+        self._views[id(msg)] = view
+        return view
+
+    def _detach(self, view):
+        if view.message is not None:
+            self._views.pop(id(view.message), None)
+        view.unbind()
+        self._pool[view.role].append(view)
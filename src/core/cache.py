@@ -3,9 +3,12 @@
 Simple in-memory cache service with TTL (Time To Live) support.
 """
 import time
-from typing import Any, Optional, Dict, Tuple
+from collections import Counter
+from typing import Any, Optional, Dict, Tuple, List
 from cachetools import TTLCache
 
+from src.core.utils import speech_text
+
 class ResponseCache:
     def __init__(self, maxsize: int = 1000, ttl: int = 300):
         """
@@ -54,5 +57,58 @@ class ResponseCache:
             'ttl': self.cache.ttl
         }
 
+class AnswerMemo:
+    """
+    Memoize data-only tool answers per (query signature, data version).
+
+    Each entry also keeps the speech form of the answer (see src.core.utils.speech_text)
+    so the TTS path synthesizes exactly the same string and its audio can be cached too.
+    """
+    def __init__(self, maxsize: int = 512, ttl: int = 24 * 3600):
+        self._cache = ResponseCache(maxsize=maxsize, ttl=ttl)
+        self._counts: Counter = Counter()
+
+    @staticmethod
+    def _key(namespace: str, signature: str, data_version: str) -> str:
+        return f"{namespace}:{data_version}:{signature}"
+
+    def get(self, namespace: str, signature: str, data_version: str) -> Optional[str]:
+        key = self._key(namespace, signature, data_version)
+        entry, hit = self._cache.get(key)
+        if not hit:
+            return None
+        self._counts[key] += 1
+        return entry[0]
+
+    def set(self, namespace: str, signature: str, data_version: str, text: str) -> None:
+        key = self._key(namespace, signature, data_version)
+        self._cache.set(key, (text, speech_text(text)))
+        self._counts[key] += 1
+        # Drop counters of evicted entries so the counter stays bounded
+        if len(self._counts) > 4 * self._cache.cache.maxsize:
+            for k in [k for k in self._counts if k not in self._cache.cache]:
+                del self._counts[k]
+
+    def frequent_speech(self, n: int = 20) -> List[str]:
+        """Speech text of the most requested answers still in the cache (for TTS warm-up)."""
+        out = []
+        for key, _ in self._counts.most_common():
+            entry = self._cache.cache.get(key)
+            if entry and entry[1]:
+                out.append(entry[1])
+            if len(out) >= n:
+                break
+        return out
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._counts.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
 # Global cache instance with default 5-minute TTL and max 1000 items
 cache = ResponseCache(maxsize=1000, ttl=300)
+
+# Global memo for deterministic tool answers
+answer_memo = AnswerMemo()
@@ -0,0 +1,41 @@
+# src/core/utils.py
+"""Small shared helpers used by both the API server and the kiosk client."""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any, Iterable, Optional
+
+# Ký tự markdown không cần đọc thành tiếng: *, #, _, `, ~ và ngoặc vuông (link/citation)
+_MARKDOWN_CHARS = re.compile(r"[\*\#_`~\[\]]")
+_SPACES = re.compile(r"[ \t]+")
+
+
+def speech_text(text: str) -> str:
+    """
+    Chuẩn hóa câu trả lời thành văn bản để đọc (TTS).
+    Dùng chung cho kiosk và server để cùng một câu trả lời luôn cho cùng một chuỗi,
+    nhờ đó audio của nó có thể được cache.
+    """
+    if not text:
+        return ""
+    cleaned = _MARKDOWN_CHARS.sub("", unicodedata.normalize("NFC", text))
+    cleaned = _SPACES.sub(" ", cleaned)
+    return cleaned.strip()
+
+
+def stable_hash(obj: Any, length: int = 16) -> str:
+    """Hash ổn định (không phụ thuộc PYTHONHASHSEED) cho dict/list/str."""
+    if not isinstance(obj, (str, bytes)):
+        obj = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    if isinstance(obj, str):
+        obj = obj.encode("utf-8")
+    return hashlib.sha1(obj).hexdigest()[:length]
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """Phân vị q (0..1) theo nearest-rank, làm tròn 2 chữ số; None nếu rỗng."""
+    data = sorted(values)
+    if not data:
+        return None
+    return round(data[min(len(data) - 1, int(q * len(data)))], 2)
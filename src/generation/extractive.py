@@ -0,0 +1,130 @@
+# src/generation/extractive.py
+"""
+Trả lời trích xuất (extractive): bỏ qua LLM khi câu hỏi khớp gần như nguyên văn một mục FAQ.
+
+Nhiều câu hỏi ở kiosk (giờ làm việc chi nhánh, câu hỏi thường gặp) ứng với đúng một chunk
+mà nội dung đã là câu trả lời. Chỉ chạy khi câu hỏi được định tuyến tới một kho bật chế độ này
+(EXTRACTIVE_DOMAINS); câu hỏi vay / tiết kiệm... đi thẳng đường RAG, không tốn thêm lượt tìm. Khi:
+- chunk top-1 trong kho đó có độ tương đồng cosine >= EXTRACTIVE_MIN_SCORE, và
+- header sâu nhất của chunk có dạng câu hỏi FAQ ("...?", "Hỏi: ...", "Q1. ..."), và
+- chunk chứa trọn mục đó (metadata section_chunks == 1, ghi lúc ingest): mục dài bị cắt thành
+  nhiều chunk (có overlap) thì một chunk chỉ là một phần câu trả lời -> đi đường LLM,
+thì trả thẳng nội dung chunk (bỏ tiền tố "Trả lời:"), cắt còn EXTRACTIVE_MAX_SENTENCES câu
+liên quan nhất nếu dài. Mỗi lần như vậy là một lệnh gọi LLM được tiết kiệm (xem stats()).
+"""
+from __future__ import annotations
+import logging
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from config.config import settings
+from src.retrieval.vector_db_service import vector_db_service
+
+logger = logging.getLogger(__name__)
+
+_HEADER_KEYS = ("Header 3", "Header 2", "Header 1")
+_FAQ_HEADER = re.compile(r"(\?\s*\**\s*$)|(^\s*\**\s*(câu hỏi|hỏi|q)\s*\d*\s*[:.)])", re.IGNORECASE)
+_ANSWER_PREFIX = re.compile(r"^\s*\**\s*(trả lời|đáp|a)\s*\d*\s*[:.)]\s*\**\s*", re.IGNORECASE)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def faq_header(doc: Document) -> Optional[str]:
+    """Header sâu nhất của chunk nếu nó là một câu hỏi FAQ, ngược lại None."""
+    for key in _HEADER_KEYS:
+        header = (doc.metadata or {}).get(key)
+        if header:
+            return header if _FAQ_HEADER.search(header) else None
+    return None
+
+
+def trim_sentences(question: str, text: str, max_sentences: int) -> str:
+    """
+    Giữ câu đầu (thường là câu trả lời trực tiếp) + các câu trùng nhiều từ với câu hỏi nhất,
+    tối đa `max_sentences` câu, theo thứ tự gốc. max_sentences <= 0 -> giữ nguyên.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    if max_sentences <= 0 or len(sentences) <= max_sentences:
+        return text.strip()
+    q = set(_words(question))
+    scores = []
+    for i, sent in enumerate(sentences[1:], start=1):
+        words = _words(sent)
+        overlap = sum(1 for w in words if w in q)
+        scores.append((overlap / (len(words) ** 0.5) if words else 0.0, -i))
+    keep = {0} | {-i for _, i in sorted(scores, reverse=True)[:max_sentences - 1]}
+    return "\n".join(sentences[i] for i in sorted(keep))
+
+
+class ExtractiveAnswerer:
+    def __init__(self, domains: Iterable[str], min_score: float = 0.75, max_sentences: int = 4):
+        self.domains = [d.strip().lower() for d in domains if d and d.strip()]
+        self.min_score = min_score
+        self.max_sentences = max_sentences
+        self.llm_calls_avoided = 0
+        self.by_domain: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def handles(self, domain: str) -> bool:
+        return domain in self.domains
+
+    async def answer(self, question: str, domain: str) -> Optional[str]:
+        """Câu trả lời trích xuất từ kho `domain`, hoặc None nếu phải đi đường LLM."""
+        if not self.handles(domain):
+            return None
+        try:
+            hits = await vector_db_service.asearch_scored(question, [domain], k=1)
+        except Exception as e:
+            logger.warning(f"Extractive search error: {e}")
+            self.misses["error"] += 1
+            return None
+        if not hits:
+            self.misses["no_hit"] += 1
+            return None
+
+        doc, score = hits[0]
+        if score < self.min_score:
+            self.misses["low_score"] += 1
+            return None
+        header = faq_header(doc)
+        if header is None:
+            self.misses["not_faq"] += 1
+            return None
+        if doc.metadata.get("section_chunks") != 1:
+            # Chunk là một phần của mục (hoặc index cũ chưa có thông tin này)
+            self.misses["partial_section"] += 1
+            return None
+        text = _ANSWER_PREFIX.sub("", doc.page_content, count=1).strip()
+        if not text:
+            self.misses["empty"] += 1
+            return None
+
+        domain = doc.metadata.get("domain", "general")
+        self.llm_calls_avoided += 1
+        self.by_domain[domain] += 1
+        logger.info(f"[Extractive] '{question}' -> '{header}' ({domain}, score={score:.3f})")
+        return trim_sentences(question, text, self.max_sentences)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "domains": list(self.domains),
+            "min_score": self.min_score,
+            "llm_calls_avoided": self.llm_calls_avoided,
+            "by_domain": dict(self.by_domain),
+            "misses": dict(self.misses),
+        }
+
+
+# Instance dùng chung
+extractive_answerer = ExtractiveAnswerer(
+    domains=settings.EXTRACTIVE_DOMAINS.split(","),
+    min_score=settings.EXTRACTIVE_MIN_SCORE,
+    max_sentences=settings.EXTRACTIVE_MAX_SENTENCES,
+)
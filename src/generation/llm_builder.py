@@ -1,23 +1,80 @@
 # src/generation/llm_builder.py
+"""
+Registry các LLM provider.
+
+- gemini: Google Gemini (langchain-google-genai).
+- openai: backend OpenAI-compatible (OpenAI, llama.cpp server, vLLM...) qua OPENAI_BASE_URL.
+- fake:   LLM giả lập tất định, không cần mạng (benchmark / load test).
+
+Provider và model chọn được theo mục đích (parse / generate / classify), xem provider_for().
+Provider không có trong registry -> ValueError (không âm thầm chuyển về Gemini).
+Mỗi builder tự import thư viện của nó nên chỉ cần cài gói của provider đang dùng.
+"""
 import logging
+from typing import Callable, Dict, Optional, Tuple
 from config.config import settings
-from src.generation.llms.gemini import build_gemini_llm
 
 logger = logging.getLogger(__name__)
 
-def get_llm(streaming: bool = True):
+DEFAULT_PROVIDER = "gemini"
+
+
+def _gemini(streaming: bool, model: Optional[str], timeout: Optional[float] = None):
+    from src.generation.llms.gemini import build_gemini_llm
+    return build_gemini_llm(streaming, model, timeout)
+
+
+def _openai(streaming: bool, model: Optional[str], timeout: Optional[float] = None):
+    from src.generation.llms.openai_compat import build_openai_compat_llm
+    return build_openai_compat_llm(streaming, model, timeout)
+
+
+def _fake(streaming: bool, model: Optional[str], timeout: Optional[float] = None):
+    from src.generation.llms.fake import build_fake_llm
+    return build_fake_llm(streaming, model)
+
+
+_PROVIDERS: Dict[str, Callable] = {
+    "gemini": _gemini,
+    "openai": _openai,
+    "fake": _fake,
+}
+
+
+def register_provider(name: str, builder: Callable) -> None:
+    """Đăng ký provider mới: builder(streaming, model, timeout=None) -> chat model của LangChain."""
+    _PROVIDERS[name.lower()] = builder
+
+
+def available_providers():
+    return sorted(_PROVIDERS)
+
+
+def provider_for(purpose: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    (provider, model) cho một mục đích. Đọc LLM_<PURPOSE>_PROVIDER / LLM_<PURPOSE>_MODEL,
+    thiếu thì dùng LLM_PROVIDER và model mặc định của provider đó.
+    """
+    provider = model = None
+    if purpose:
+        provider = getattr(settings, f"LLM_{purpose.upper()}_PROVIDER", None)
+        model = getattr(settings, f"LLM_{purpose.upper()}_MODEL", None)
+    provider = (provider or settings.LLM_PROVIDER or DEFAULT_PROVIDER).strip().lower()
+    return provider, (model or None)
+
+
+def get_llm(streaming: bool = True, provider: Optional[str] = None, model: Optional[str] = None,
+            timeout: Optional[float] = None):
     """
-    Hàm Factory: Đọc cấu hình và trả về LLM tương ứng.
-    Hiện tại chỉ hỗ trợ Gemini.
+    Hàm Factory: trả về LLM của `provider` (mặc định LLM_PROVIDER) với `model`
+    (mặc định model cấu hình của provider). `timeout` (giây) là timeout của client cho mỗi
+    lệnh gọi; None -> mặc định của provider.
     """
-    provider = (settings.LLM_PROVIDER or "").lower()
-    
-    # Mặc định hoặc cấu hình rõ ràng là gemini
-    if provider == 'gemini' or not provider:
-        logger.info("LLM Factory: Selecting Gemini.")
-        return build_gemini_llm(streaming)
-        
-    else:
-        logger.warning(f"LLM Provider '{provider}' không được hỗ trợ. Đang chuyển về Gemini làm mặc định.")
-        # Fallback về Gemini để đảm bảo ổn định
-        return build_gemini_llm(streaming)
+    provider = (provider or settings.LLM_PROVIDER or DEFAULT_PROVIDER).strip().lower()
+    builder = _PROVIDERS.get(provider)
+    if builder is None:
+        raise ValueError(f"LLM Provider '{provider}' không được hỗ trợ (có: {', '.join(available_providers())})")
+    logger.info(f"LLM Factory: Selecting {provider}" + (f" ({model})" if model else ""))
+    if timeout is None:
+        return builder(streaming, model)
+    return builder(streaming, model, timeout)
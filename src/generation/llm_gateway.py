@@ -0,0 +1,386 @@
+# src/generation/llm_gateway.py
+"""
+Cổng gọi LLM dùng chung cho cả tiến trình (parse / generate / classify).
+
+- Instance LLM (kèm client HTTP/gRPC bên trong) được tạo một lần và dùng lại cho mọi lệnh gọi
+  cùng cấu hình, thay vì mỗi nơi tự dựng ChatGoogleGenerativeAI riêng.
+- Hai tầng semaphore: theo mục đích (parse không chiếm hết chỗ của generate) rồi toàn cục
+  (tổng số lệnh gọi tới provider). Semaphore của asyncio xếp hàng FIFO nên traffic dồn dập
+  được phục vụ lần lượt thay vì cùng lúc bắn vào provider rồi cùng timeout.
+- Chờ quá LLM_QUEUE_TIMEOUT -> LLMBusyError ngay (không chiếm thêm chỗ của ai).
+- Script đồng bộ (ingest_data.py) gọi qua invoke(): cùng giới hạn nhưng bằng semaphore của
+  threading, deadline là timeout của client (instance riêng từ sync_model()), không tạo event loop.
+- Mỗi lệnh gọi có deadline riêng theo mục đích; stream có deadline tổng cho cả câu trả lời.
+- Hedging cho stream: quá LLM_HEDGE_AFTER giây (tính từ lúc có slot) chưa có token đầu -> gửi
+  cùng prompt tới provider/model dự phòng (LLM_HEDGE_*, semaphore riêng), stream bên nào ra token
+  trước, hủy bên còn lại. Mặc định chỉ bật khi provider/model dự phòng khác provider chính.
+- Thống kê thời gian chờ hàng đợi / thời gian gọi theo mục đích, TTFT (p50/p99) theo provider
+  (xem /api/v1/health/stats).
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from config.config import settings
+from src.core.utils import percentile
+from src.generation.llm_builder import get_llm, provider_for
+
+logger = logging.getLogger(__name__)
+
+PURPOSE_PARSE = "parse"
+PURPOSE_GENERATE = "generate"
+PURPOSE_CLASSIFY = "classify"
+# Provider/model dự phòng khi generate chậm; có semaphore riêng để không xếp hàng sau chính generate
+PURPOSE_HEDGE = "hedge"
+PURPOSES = (PURPOSE_PARSE, PURPOSE_GENERATE, PURPOSE_CLASSIFY, PURPOSE_HEDGE)
+DEFAULT_HEDGE_AFTER = 4.0
+
+_SLOT, _CHUNK, _END, _ERR = range(4)
+
+
+class LLMBusyError(TimeoutError):
+    """Chờ slot gọi LLM quá lâu (hệ thống đang quá tải)."""
+
+
+@dataclass
+class PurposeStats:
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    queue_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+    call_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_p50_ms": percentile(self.queue_ms, 0.5),
+            "queue_p95_ms": percentile(self.queue_ms, 0.95),
+            "call_p50_ms": percentile(self.call_ms, 0.5),
+            "call_p95_ms": percentile(self.call_ms, 0.95),
+        }
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = 8, per_purpose: Optional[Dict[str, int]] = None,
+                 deadlines: Optional[Dict[str, float]] = None, queue_timeout: float = 10.0):
+        per_purpose = per_purpose or {}
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.deadlines = deadlines or {}
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._limits = {p: max(1, min(per_purpose.get(p, max_concurrency), max_concurrency)) for p in PURPOSES}
+        self._sems = {p: asyncio.Semaphore(n) for p, n in self._limits.items()}
+        # Cho lệnh gọi đồng bộ (ngoài event loop)
+        self._thread_global = threading.BoundedSemaphore(max_concurrency)
+        self._thread_sems = {p: threading.BoundedSemaphore(n) for p, n in self._limits.items()}
+        self._stats = {p: PurposeStats() for p in PURPOSES}
+        self._models: Dict[Tuple[Any, ...], Any] = {}
+        self._ttft: Dict[str, Deque[float]] = {}
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    # --- Model dùng chung ---
+    def model(self, purpose: str = PURPOSE_GENERATE):
+        """LLM cho mục đích `purpose`; cùng (provider, model) -> cùng một instance (và cùng client)."""
+        key = provider_for(purpose)
+        llm = self._models.get(key)
+        if llm is None:
+            # Một instance streaming dùng được cho cả ainvoke (gom chunk) lẫn astream
+            llm = self._models[key] = get_llm(streaming=True, provider=key[0], model=key[1])
+        return llm
+
+    def sync_model(self, purpose: str):
+        """
+        LLM non-streaming cho lệnh gọi đồng bộ qua invoke(): deadline của `purpose` được đặt làm
+        timeout của client, vì lệnh gọi đồng bộ không thể bị hủy từ bên ngoài.
+        """
+        provider, model = provider_for(purpose)
+        key = (provider, model, "sync")
+        llm = self._models.get(key)
+        if llm is None:
+            llm = self._models[key] = get_llm(streaming=False, provider=provider, model=model,
+                                              timeout=self._deadline(purpose, None))
+        return llm
+
+    @staticmethod
+    def label(purpose: str) -> str:
+        """Tên hiển thị 'provider/model' của mục đích (dùng làm khóa thống kê TTFT)."""
+        return "/".join(filter(None, provider_for(purpose)))
+
+    # --- Hàng đợi ---
+    @asynccontextmanager
+    async def slot(self, purpose: str):
+        """Giữ một chỗ gọi LLM (theo mục đích + toàn cục) trong suốt khối `async with`."""
+        st = self._stats[purpose]
+        t0 = time.perf_counter()
+        st.waiting += 1
+        acquired = []
+        try:
+            deadline = t0 + self.queue_timeout
+            for sem in (self._sems[purpose], self._global):
+                remaining = deadline - time.perf_counter()
+                try:
+                    await asyncio.wait_for(sem.acquire(), timeout=max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    st.rejected += 1
+                    raise LLMBusyError(f"LLM quá tải: chờ slot '{purpose}' quá {self.queue_timeout}s")
+                acquired.append(sem)
+        except BaseException:
+            for sem in acquired:
+                sem.release()
+            raise
+        finally:
+            st.waiting -= 1
+
+        st.queue_ms.append((time.perf_counter() - t0) * 1000.0)
+        st.calls += 1
+        st.in_flight += 1
+        t1 = time.perf_counter()
+        try:
+            yield
+        except asyncio.TimeoutError:
+            st.timeouts += 1
+            raise
+        except Exception:
+            st.errors += 1
+            raise
+        finally:
+            st.call_ms.append((time.perf_counter() - t1) * 1000.0)
+            st.in_flight -= 1
+            for sem in reversed(acquired):
+                sem.release()
+
+    @contextmanager
+    def thread_slot(self, purpose: str):
+        """Như slot() nhưng cho code đồng bộ: chờ bằng semaphore của threading."""
+        st = self._stats[purpose]
+        t0 = time.perf_counter()
+        st.waiting += 1
+        acquired = []
+        try:
+            deadline = t0 + self.queue_timeout
+            for sem in (self._thread_sems[purpose], self._thread_global):
+                if not sem.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                    st.rejected += 1
+                    raise LLMBusyError(f"LLM quá tải: chờ slot '{purpose}' quá {self.queue_timeout}s")
+                acquired.append(sem)
+        except BaseException:
+            for sem in acquired:
+                sem.release()
+            raise
+        finally:
+            st.waiting -= 1
+
+        st.queue_ms.append((time.perf_counter() - t0) * 1000.0)
+        st.calls += 1
+        st.in_flight += 1
+        t1 = time.perf_counter()
+        try:
+            yield
+        except TimeoutError:
+            st.timeouts += 1
+            raise
+        except Exception:
+            st.errors += 1
+            raise
+        finally:
+            st.call_ms.append((time.perf_counter() - t1) * 1000.0)
+            st.in_flight -= 1
+            for sem in reversed(acquired):
+                sem.release()
+
+    def _deadline(self, purpose: str, deadline: Optional[float]) -> Optional[float]:
+        return deadline if deadline is not None else self.deadlines.get(purpose)
+
+    def hedge_after(self) -> float:
+        """
+        LLM_HEDGE_AFTER nếu đặt rõ; nếu không, chỉ hedge (sau DEFAULT_HEDGE_AFTER giây) khi
+        provider/model dự phòng khác provider chính. Hedge vào chính instance đang chậm chỉ nhân
+        đôi tải đúng lúc provider đang quá tải.
+        """
+        if settings.LLM_HEDGE_AFTER is not None:
+            return max(0.0, settings.LLM_HEDGE_AFTER)
+        return DEFAULT_HEDGE_AFTER if provider_for(PURPOSE_HEDGE) != provider_for(PURPOSE_GENERATE) else 0.0
+
+    # --- Lệnh gọi ---
+    async def ainvoke(self, purpose: str, runnable: Any, payload: Any, deadline: Optional[float] = None) -> Any:
+        async with self.slot(purpose):
+            return await asyncio.wait_for(runnable.ainvoke(payload), timeout=self._deadline(purpose, deadline))
+
+    def invoke(self, purpose: str, runnable: Any, payload: Any) -> Any:
+        """
+        Phiên bản đồng bộ của ainvoke cho script chạy ngoài event loop (vd. ingest_data.py):
+        qua giới hạn đồng thời và thống kê của `purpose`. Deadline do timeout của client đảm nhận,
+        nên `runnable` nên lấy từ sync_model(purpose).
+        """
+        with self.thread_slot(purpose):
+            return runnable.invoke(payload)
+
+    async def astream(self, purpose: str, runnable: Any, payload: Any,
+                      deadline: Optional[float] = None, on_slot: Optional[Callable[[], None]] = None
+                      ) -> AsyncIterator[Any]:
+        """
+        Stream kết quả; giữ slot tới khi stream xong. Quá deadline (tính cho cả stream, từ lúc có
+        slot) -> TimeoutError. `on_slot` được gọi ngay khi đã giữ slot, trước lệnh gọi provider.
+        """
+        limit = self._deadline(purpose, deadline)
+        async with self.slot(purpose):
+            if on_slot:
+                on_slot()
+            end = time.monotonic() + limit if limit else None
+            stream = runnable.astream(payload).__aiter__()
+            try:
+                while True:
+                    timeout = max(0.0, end - time.monotonic()) if end else None
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose:
+                    await aclose()
+
+    async def astream_hedged(self, candidates: List[Tuple[str, str, Any]], payload: Any,
+                             hedge_after: Optional[float] = None) -> AsyncIterator[Any]:
+        """
+        Stream với hedging. `candidates` = [(purpose, label, runnable), ...] theo thứ tự ưu tiên;
+        mỗi ứng viên giữ slot theo purpose của nó (ứng viên dự phòng dùng PURPOSE_HEDGE).
+        Ứng viên đầu đã có slot mà quá `hedge_after` giây chưa ra chunk đầu (hoặc lỗi / trả về
+        rỗng trước chunk đầu) -> chạy thêm ứng viên kế tiếp. Bên ra chunk đầu trước thắng, các
+        bên khác bị hủy (giải phóng slot ngay). Mọi bên đều thất bại -> raise lỗi cuối cùng.
+        """
+        out: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+        armed_at: Optional[float] = None  # Lúc ứng viên mới nhất có slot (bắt đầu đếm hedge_after)
+
+        async def _run(idx: int, purpose: str, label: str, runnable: Any):
+            started = None
+            first = True
+
+            def _on_slot():
+                nonlocal started
+                started = time.perf_counter()  # TTFT tính từ lúc có slot, không gồm thời gian xếp hàng
+                out.put_nowait((idx, _SLOT, None))
+
+            try:
+                async for chunk in self.astream(purpose, runnable, payload, on_slot=_on_slot):
+                    if first:
+                        self._record_ttft(label, time.perf_counter() - started)
+                        first = False
+                    out.put_nowait((idx, _CHUNK, chunk))
+                out.put_nowait((idx, _END, None))
+            except Exception as e:
+                out.put_nowait((idx, _ERR, e))
+
+        def _launch() -> None:
+            nonlocal armed_at
+            armed_at = None
+            purpose, label, runnable = candidates[len(tasks)]
+            tasks.append(asyncio.create_task(_run(len(tasks), purpose, label, runnable)))
+
+        winner: Optional[int] = None
+        done: set = set()
+        last_error: Optional[BaseException] = None
+        _launch()
+        try:
+            while True:
+                timeout = None
+                if winner is None and hedge_after and armed_at is not None and len(tasks) < len(candidates):
+                    timeout = max(0.0, armed_at + hedge_after - time.perf_counter())
+                try:
+                    idx, kind, value = await asyncio.wait_for(out.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"LLM hedge: {candidates[len(tasks) - 1][1]} chưa ra token sau {hedge_after}s "
+                                   f"-> thử thêm {candidates[len(tasks)][1]}")
+                    _launch()
+                    continue
+
+                if kind == _SLOT:
+                    if idx == len(tasks) - 1:
+                        armed_at = time.perf_counter()
+                    if idx and winner is None:
+                        self.hedges_fired += 1  # Chỉ tính khi ứng viên dự phòng thực sự đã gọi provider
+                    continue
+
+                if winner is None:
+                    if kind != _CHUNK:
+                        # Hỏng trước khi ra token -> chuyển ngay sang ứng viên kế tiếp
+                        done.add(idx)
+                        if kind == _ERR:
+                            last_error = value
+                            logger.warning(f"LLM {candidates[idx][1]} lỗi trước token đầu: {value}")
+                        if len(tasks) < len(candidates):
+                            _launch()
+                        elif len(done) == len(tasks):
+                            if last_error is not None:
+                                raise last_error
+                            return
+                        continue
+                    winner = idx
+                    if idx:
+                        self.hedges_won += 1
+                    for i, task in enumerate(tasks):
+                        if i != winner:
+                            task.cancel()
+
+                if idx != winner:
+                    continue
+                if kind == _CHUNK:
+                    yield value
+                elif kind == _END:
+                    return
+                else:
+                    raise value
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _record_ttft(self, label: str, seconds: float) -> None:
+        self._ttft.setdefault(label, deque(maxlen=512)).append(seconds * 1000.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "providers": {p: self.label(p) for p in PURPOSES},
+            "max_concurrency": self.max_concurrency,
+            "limits": dict(self._limits),
+            "purposes": {p: s.snapshot() for p, s in self._stats.items()},
+            "ttft": {label: {"n": len(s), "p50_ms": percentile(s, 0.5), "p99_ms": percentile(s, 0.99)}
+                     for label, s in self._ttft.items()},
+            "hedge": {"fired": self.hedges_fired, "won": self.hedges_won},
+        }
+
+
+# Instance dùng chung
+llm_gateway = LLMGateway(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    per_purpose={
+        PURPOSE_PARSE: settings.LLM_PARSE_CONCURRENCY,
+        PURPOSE_GENERATE: settings.LLM_GENERATE_CONCURRENCY,
+        PURPOSE_CLASSIFY: settings.LLM_CLASSIFY_CONCURRENCY,
+        PURPOSE_HEDGE: settings.LLM_HEDGE_CONCURRENCY,
+    },
+    deadlines={
+        PURPOSE_PARSE: settings.LLM_PARSE_DEADLINE,
+        PURPOSE_GENERATE: settings.LLM_GENERATE_DEADLINE,
+        PURPOSE_CLASSIFY: settings.LLM_CLASSIFY_DEADLINE,
+        PURPOSE_HEDGE: settings.LLM_GENERATE_DEADLINE,
+    },
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,89 @@
+# src/generation/llms/fake.py
+"""
+LLM giả lập, tất định (không gọi mạng) cho benchmark / load test.
+
+- Câu trả lời suy ra từ hash của prompt: cùng câu hỏi -> cùng câu trả lời.
+- Độ trễ giả lập: FAKE_LLM_TTFT_MS trước token đầu, FAKE_LLM_TOKEN_MS giữa các token.
+- with_structured_output(schema) trả về schema rỗng (QueryParser nhận InterestQuery mặc định).
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WORDS = ("Dạ", "quý khách", "có thể", "tham khảo", "thông tin", "lãi suất", "sản phẩm",
+          "tại", "chi nhánh", "gần nhất", "hoặc", "ứng dụng", "ngân hàng", "số", "ạ")
+
+
+class FakeChatModel(BaseChatModel):
+    model: str = "fake"
+    ttft_ms: float = 0.0
+    token_ms: float = 0.0
+    answer_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        seed = hashlib.sha1(f"{self.model}\n{prompt}".encode("utf-8")).digest()
+        words = [_WORDS[seed[i % len(seed)] % len(_WORDS)] for i in range(self.answer_words)]
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        toks = self._tokens(messages)
+        time.sleep((self.ttft_ms + self.token_ms * len(toks)) / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(toks)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        toks = self._tokens(messages)
+        await asyncio.sleep((self.ttft_ms + self.token_ms * len(toks)) / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(toks)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.ttft_ms / 1000.0)
+        for i, tok in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self.token_ms / 1000.0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=tok))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.ttft_ms / 1000.0)
+        for i, tok in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000.0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=tok))
+
+    def with_structured_output(self, schema: Any, **kwargs: Any):
+        async def _empty(_: Any) -> Any:
+            await asyncio.sleep(self.ttft_ms / 1000.0)
+            return schema() if isinstance(schema, type) else {}
+        return RunnableLambda(lambda _: schema() if isinstance(schema, type) else {}, afunc=_empty)
+
+
+def build_fake_llm(streaming: bool = True, model: Optional[str] = None):
+    """LLM giả lập với độ trễ lấy từ settings (FAKE_LLM_*)."""
+    logger.info(f"Building fake LLM: {model or 'fake'}")
+    return FakeChatModel(
+        model=model or "fake",
+        ttft_ms=settings.FAKE_LLM_TTFT_MS,
+        token_ms=settings.FAKE_LLM_TOKEN_MS,
+        answer_words=settings.FAKE_LLM_ANSWER_WORDS,
+    )
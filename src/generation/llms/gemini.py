@@ -1,17 +1,20 @@
 # src/generation/llms/gemini.py
 import logging
+from typing import Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from config.config import settings
 
 logger = logging.getLogger(__name__)
 
-def build_gemini_llm(streaming: bool = True):
+def build_gemini_llm(streaming: bool = True, model: Optional[str] = None, timeout: Optional[float] = None):
     """Khởi tạo và trả về một instance của ChatGoogleGenerativeAI."""
-    logger.info(f"Building Gemini LLM: {settings.GEMINI_CHAT_MODEL}")
+    model = model or settings.GEMINI_CHAT_MODEL
+    logger.info(f"Building Gemini LLM: {model}")
     return ChatGoogleGenerativeAI(
-        model=settings.GEMINI_CHAT_MODEL,
+        model=model,
         google_api_key=settings.GOOGLE_API_KEY,
         temperature=settings.LLM_TEMPERATURE,
         streaming=streaming,
+        timeout=timeout,
         convert_system_message_to_human=True 
-    )
\ No newline at end of file
+    )
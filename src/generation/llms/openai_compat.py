@@ -0,0 +1,26 @@
+# src/generation/llms/openai_compat.py
+"""
+Backend OpenAI-compatible (/v1/chat/completions): OpenAI, hoặc server nội bộ
+như llama.cpp server, vLLM, Ollama (chế độ OpenAI) chạy trên máy cục bộ / LAN.
+"""
+import logging
+from typing import Optional
+from langchain_openai import ChatOpenAI
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+def build_openai_compat_llm(streaming: bool = True, model: Optional[str] = None, timeout: Optional[float] = None):
+    """Khởi tạo ChatOpenAI trỏ tới OPENAI_BASE_URL."""
+    model = model or settings.OPENAI_CHAT_MODEL
+    logger.info(f"Building OpenAI-compatible LLM: {model} @ {settings.OPENAI_BASE_URL}")
+    return ChatOpenAI(
+        model=model,
+        base_url=settings.OPENAI_BASE_URL,
+        # Server nội bộ thường không kiểm tra key nhưng client bắt buộc phải có
+        api_key=settings.OPENAI_API_KEY or "not-needed",
+        temperature=settings.LLM_TEMPERATURE,
+        streaming=streaming,
+        timeout=timeout or settings.OPENAI_TIMEOUT,
+        max_retries=0,  # Deadline / thử lại do LLM gateway quản lý
+    )
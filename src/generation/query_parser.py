@@ -4,6 +4,7 @@ import logging
 import re
 from typing import Optional, List, Dict, Any
 from langchain_core.messages import HumanMessage, SystemMessage
+from src.generation.llm_gateway import llm_gateway, PURPOSE_PARSE
 
 # Import InterestQuery (Giữ nguyên logic cũ)
 try:
@@ -20,9 +21,31 @@ except ImportError:
         annual_rate_percent: Optional[float] = None
         channel: Optional[str] = "online"
         amount: Optional[float] = None
+        monthly_deposit: Optional[float] = None
 
 logger = logging.getLogger(__name__)
 
+# Số tiền kiểu Việt: "1 tỷ", "1,5 tỷ", "500 triệu", "200tr", "50 nghìn", "1.000.000.000"
+_MONEY_PAT = re.compile(
+    r"(?i)(\d+(?:[.,]\d+)*)\s*(tỷ|tỉ|ty|triệu|trieu|tr|nghìn|ngàn|ngan|k|đồng|vnđ|vnd|đ)?(?![\w])"
+)
+_MONEY_UNITS = {
+    "tỷ": 1e9, "tỉ": 1e9, "ty": 1e9,
+    "triệu": 1e6, "trieu": 1e6, "tr": 1e6,
+    "nghìn": 1e3, "ngàn": 1e3, "ngan": 1e3, "k": 1e3,
+}
+_TERM_TEXT_PAT = re.compile(r"(?i)(\d+)\s*(năm|tháng)")
+_GOAL_PAT = re.compile(r"(?i)(muốn có|mục tiêu|tích lũy|tích luỹ|để dành|dành dụm)")
+# "một tháng" / "1 tháng" chỉ là "mỗi tháng" khi đứng ngay sau số tiền ("20tr một tháng")
+# hoặc ngay trước động từ gửi ("1 tháng gửi 20tr"); còn lại là kỳ hạn ("trong 1 tháng")
+_MONTHLY_PAT = re.compile(
+    r"(?i)(mỗi tháng|hàng tháng|hằng tháng|/\s*tháng"
+    r"|(?:(?<=tr)|(?<=triệu)|(?<=k)|(?<=nghìn)|(?<=ngàn)|(?<=đ))\s*(?:một|1)\s*tháng"
+    r"|\b(?:một|1)\s*tháng(?=\s*(?:gửi|đóng|góp|để dành|dành|bỏ ra)))"
+)
+# Câu hỏi vay / lãi tiền gửi có số liệu -> không phải mục tiêu tiết kiệm, để LLM trích xuất
+_NOT_GOAL_PAT = re.compile(r"(?i)(\bvay\b|trả góp|thế chấp|giải ngân|lãi suất|bao nhiêu lãi|tiền lãi|lãi bao nhiêu)")
+
 class QueryParser:
     def __init__(self, llm):
         self.structured_llm = llm.with_structured_output(InterestQuery)
@@ -61,7 +84,7 @@ class QueryParser:
             "CÁC LOẠI QUERY (query_type) BẮT BUỘC:\n"
             "- 'loan': Vay vốn.\n"
             "- 'savings': Tiết kiệm.\n"
-            "- 'savings_goal': Mục tiêu tiết kiệm.\n"
+            "- 'savings_goal': Mục tiêu tiết kiệm (amount = số tiền mục tiêu, monthly_deposit = số tiền gửi mỗi tháng nếu có).\n"
             "- 'card': Thẻ.\n"
             "- 'promo': Khuyến mãi.\n"
             "- 'digital-banking': Ngân hàng số.\n"
@@ -81,6 +104,56 @@ class QueryParser:
                     return q_type
         return None
 
+    @staticmethod
+    def _parse_money(num: str, unit: Optional[str]) -> Optional[float]:
+        """'1,5' + 'tỷ' -> 1.5e9 ; '1.000.000' -> 1e6"""
+        unit = (unit or "").lower()
+        mult = _MONEY_UNITS.get(unit)
+        if mult:
+            try:
+                return float(num.replace(",", ".")) * mult
+            except ValueError:
+                return None
+        # Không có đơn vị: chỉ nhận số viết đầy đủ (có dấu phân cách nghìn hoặc >= 6 chữ số)
+        digits = re.sub(r"[.,]", "", num)
+        if (re.fullmatch(r"\d{1,3}([.,]\d{3})+", num) or len(digits) >= 6) and digits.isdigit():
+            return float(digits)
+        return None
+
+    def _fast_goal(self, text: str) -> Optional[InterestQuery]:
+        """
+        Fast Path cho câu hỏi mục tiêu tiết kiệm (không cần LLM).
+        Ví dụ: "muốn có 1 tỷ sau 3 năm thì gửi bao nhiêu mỗi tháng"
+        """
+        if not _GOAL_PAT.search(text) or _NOT_GOAL_PAT.search(text):
+            return None
+
+        # Kỳ hạn = cụm "N năm/tháng" đầu tiên không phải là cụm "mỗi tháng"
+        monthly_spans = [m.span() for m in _MONTHLY_PAT.finditer(text)]
+        term_m = next((m for m in _TERM_TEXT_PAT.finditer(text)
+                       if not any(m.start() < e and s < m.end() for s, e in monthly_spans)), None)
+        # Bỏ phần kỳ hạn trước khi tìm số tiền để "3 năm" không bị hiểu là tiền
+        money_text = _TERM_TEXT_PAT.sub(" ", text)
+        amounts = []
+        for m in _MONEY_PAT.finditer(money_text):
+            val = self._parse_money(m.group(1), m.group(2))
+            if val:
+                amounts.append(val)
+        if not amounts:
+            return None
+
+        target = max(amounts)
+        monthly = None
+        if len(amounts) >= 2 and monthly_spans:
+            monthly = min(amounts)
+
+        return InterestQuery(
+            query_type="savings_goal",
+            amount=target,
+            term_text=term_m.group(0) if term_m else None,
+            monthly_deposit=monthly,
+        )
+
     def _has_numbers(self, text: str) -> bool:
         """Kiểm tra xem câu có chứa con số (số tiền, kỳ hạn) không"""
         return bool(re.search(r'\d+', text))
@@ -90,6 +163,14 @@ class QueryParser:
         # Nếu câu hỏi KHÔNG chứa số (chỉ hỏi thông tin chung) -> Dùng Regex
         # Ví dụ: "Lãi suất thẻ tín dụng bao nhiêu?" -> Regex bắt "thẻ" -> về 'card' ngay.
         has_number = self._has_numbers(current_text)
+
+        # Mục tiêu tiết kiệm có số liệu -> trích xuất bằng Regex, trả lời tất định
+        if has_number:
+            goal = self._fast_goal(current_text)
+            if goal:
+                logger.info(f"[QueryParser] Fast Path (savings_goal): '{current_text}'")
+                return goal
+
         fast_type = self._fast_classify(current_text)
 
         if fast_type and not has_number:
@@ -122,7 +203,7 @@ class QueryParser:
                 SystemMessage(content=self.system_prompt),
                 HumanMessage(content=full_prompt),
             ]
-            resp = await self.structured_llm.ainvoke(msg)
+            resp = await llm_gateway.ainvoke(PURPOSE_PARSE, self.structured_llm, msg)
 
             if isinstance(resp, dict):
                 return InterestQuery(**resp)
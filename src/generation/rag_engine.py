@@ -12,21 +12,14 @@ from config.config import settings
 from src.retrieval.vector_db_service import vector_db_service 
 from src.core.cache import cache
 from src.generation.prompts import BANKING_RAG_PROMPT 
-from src.generation.llm_builder import get_llm 
+from src.generation.llm_gateway import llm_gateway, LLMBusyError, PURPOSE_PARSE, PURPOSE_GENERATE, PURPOSE_HEDGE
 
 try:
     from src.generation.query_parser import QueryParser 
 except ImportError:
     QueryParser = None
-try:
-    from src.tools.interest_service import interest_service 
-except ImportError:
-    interest_service = None
-
-try:
-    from src.tools.market_service import market_service 
-except ImportError:
-    market_service = None
+from src.tools.registry import tool_registry
+from src.generation.extractive import extractive_answerer
 
 logger = logging.getLogger(__name__)
 
@@ -63,8 +56,12 @@ class RAGEngine:
 
         logger.info(f"Đang khởi tạo RAG Engine trên Raspberry Pi...")
         
-        self.llm = get_llm(streaming=True)
-        self.internal_llm = get_llm(streaming=False) 
+        # Instance LLM dùng chung qua gateway (giới hạn đồng thời + deadline theo mục đích)
+        self.llm = llm_gateway.model(PURPOSE_GENERATE)
+        self.internal_llm = llm_gateway.model(PURPOSE_PARSE)
+        # Provider/model dự phòng cho hedging (None nếu tắt)
+        self.hedge_after = llm_gateway.hedge_after()
+        self.hedge_llm = llm_gateway.model(PURPOSE_HEDGE) if self.hedge_after > 0 else None
         
         self._reranker = None
         self._use_rerank = False
@@ -76,7 +73,8 @@ class RAGEngine:
     async def start(self): logger.info("RAGEngine started.")
     async def shutdown(self): logger.info("RAGEngine stopped.")
 
-    def _choose_retriever(self, query_type: Optional[str] = None) -> Any:
+    @staticmethod
+    def _domain_for(query_type: Optional[str] = None) -> str:
         domain_map = {
             "loan": "loan",
             "card": "card",
@@ -89,7 +87,10 @@ class RAGEngine:
             "faq": "faq"
         }
         
-        domain_to_search = domain_map.get(query_type, "general")
+        return domain_map.get(query_type, "general")
+
+    def _choose_retriever(self, query_type: Optional[str] = None) -> Any:
+        domain_to_search = self._domain_for(query_type)
         logger.info(f"Routing query '{query_type}' -> Domain '{domain_to_search}'")
         return vector_db_service.get_retriever(domain=domain_to_search, k=3)
 
@@ -123,27 +124,15 @@ class RAGEngine:
             except Exception as e: 
                 logger.warning(f"Parser failed: {e}")
 
-        # 2. TOOLS
+        # 2. TOOLS (tra bảng query_type -> tools, chạy song song dưới deadline)
         tool_answer = None
         tool_sources = []
 
-        # 2.1 Tool: Interest Service
-        if interest_service and query_type in {"loan", "savings", "savings_goal"} and parsed_query:
-             try:
-                answer, sources = await interest_service.answer(parsed_query)
-                if answer:
-                    tool_answer = answer
-                    tool_sources = sources
-             except Exception as e: logger.warning(f"InterestService warning: {e}")
-        
-        # 2.2 Tool: Market Service
-        if not tool_answer and market_service and query_type in {"exchange_rate", "gold_price"}:
-             try:
-                answer, sources = await market_service.answer(query_type)
-                if answer:
-                    tool_answer = answer
-                    tool_sources = sources
-             except Exception as e: logger.warning(f"MarketService failed: {e}")
+        if tool_registry.handles(query_type):
+            result = await tool_registry.dispatch(query_type, parsed_query, deadline=settings.TOOL_DEADLINE)
+            if result:
+                tool_answer = result.answer
+                tool_sources = result.sources
 
         # Nếu Tool trả lời được -> Yield luôn
         if tool_answer:
@@ -159,33 +148,52 @@ class RAGEngine:
             await self.ctx.add_history(session_id, "assistant", tool_answer)
             return
 
-        # 3. RAG STREAMING
-        retriever = self._choose_retriever(query_type)
         search_query = user_text 
         if len(user_text.split()) < 4 and isinstance(current_state, dict):
              product_hint = current_state.get("product") or current_state.get("loan_type")
              if product_hint: 
                  search_query = f"{product_hint} {user_text}"
+
+        # 3. EXTRACTIVE (chỉ kho bật chế độ này; chunk FAQ khớp gần nguyên văn -> trả thẳng, không gọi LLM)
+        # Tìm bằng đúng search_query: vector câu hỏi được nhớ lại nên bước 4 không phải embed lại
+        domain = self._domain_for(query_type)
+        if extractive_answerer.handles(domain):
+            extractive_answer = await extractive_answerer.answer(search_query, domain)
+            if extractive_answer:
+                yield extractive_answer
+                await self.ctx.add_history(session_id, "assistant", extractive_answer)
+                return
+
+        # 4. RAG STREAMING
+        retriever = self._choose_retriever(query_type)
         
         docs = await self._retrieve(search_query, retriever)
         context_text = "\n\n".join([d.page_content for d in docs]) if docs else ""
         chat_history = await self.ctx.get_history_langchain(session_id)
 
-        rag_chain = BANKING_RAG_PROMPT | self.llm
+        candidates = [(PURPOSE_GENERATE, llm_gateway.label(PURPOSE_GENERATE), BANKING_RAG_PROMPT | self.llm)]
+        if self.hedge_llm is not None:
+            candidates.append((PURPOSE_HEDGE, llm_gateway.label(PURPOSE_HEDGE), BANKING_RAG_PROMPT | self.hedge_llm))
         
         full_response = ""
         try:
-            # STREAMING THỰC SỰ
-            async for chunk in rag_chain.astream({
+            # STREAMING THỰC SỰ (kèm hedging nếu provider chính chậm ra token đầu)
+            async for chunk in llm_gateway.astream_hedged(candidates, {
                 "context": context_text,
                 "chat_history": chat_history,
                 "question": user_text 
-            }):
+            }, hedge_after=self.hedge_after):
                 # Chunk thường là AIMessageChunk hoặc string
                 content = chunk.content if hasattr(chunk, 'content') else str(chunk)
                 yield content
                 full_response += content
 
+        except LLMBusyError as e:
+            logger.warning(f"LLM busy: {e}")
+            err_msg = "Hệ thống đang bận, quý khách vui lòng thử lại sau giây lát."
+            yield err_msg
+            full_response += err_msg
+
         except Exception as e:
             logger.error(f"LLM Streaming error: {e}")
             err_msg = "\n[Lỗi kết nối hoặc xử lý]"
@@ -19,11 +19,13 @@ except ImportError:
     print("Hãy chắc chắn rằng file config.py của bạn nằm ở: D:\\banking-rag-agent\\config\\config.py")
     sys.exit(1)
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage
+from langchain_core.language_models import BaseChatModel
+from src.generation.llm_gateway import llm_gateway, PURPOSE_CLASSIFY
 
 # ====== ENV / PATH (Đọc từ settings) ======
 DATA_DIR = Path(settings.DATA_RAW_DIR).resolve() # [SỬA] Đọc từ DATA_RAW_DIR
@@ -32,7 +34,7 @@ GOOGLE_API_KEY = settings.GOOGLE_API_KEY
 GEMINI_EMBEDDING_MODEL = settings.GEMINI_EMBEDDING_MODEL
 INDEX_NAME = settings.INDEX_NAME 
 
-llm_classifier: Optional[ChatGoogleGenerativeAI] = None
+llm_classifier: Optional[BaseChatModel] = None
 
 # [MỚI] Định nghĩa tất cả các kho chuyên dụng
 ALL_DOMAINS = ["card", "loan", "savings", "promo","security", "digital-banking", "network", "faq", "general"]
@@ -40,11 +42,8 @@ ALL_DOMAINS = ["card", "loan", "savings", "promo","security", "digital-banking",
 def init_classifier():
     global llm_classifier
     if GOOGLE_API_KEY:
-        llm_classifier = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=GOOGLE_API_KEY,
-            temperature=0.0
-        )
+        # Instance đồng bộ của gateway: timeout client = LLM_CLASSIFY_DEADLINE
+        llm_classifier = llm_gateway.sync_model(PURPOSE_CLASSIFY)
 
 # --- (Các hàm parse_front_matter, clean_text, split_markdown_optimized giữ nguyên) ---
 YAML_FRONT_MATTER = re.compile(r"(?s)^---\s*(.*?)\s*---\s*")
@@ -72,7 +71,14 @@ def split_markdown_optimized(text: str, chunk_size: int = 1500, chunk_overlap: i
     markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
     md_header_splits = markdown_splitter.split_text(text)
     recursive_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=["\n\n", "\n", r"(?<=\. )", " ", ""])
-    final_splits = recursive_splitter.split_documents(md_header_splits)
+    final_splits: List[Document] = []
+    for section in md_header_splits:
+        # Ghi vị trí chunk trong mục: trả lời trích xuất chỉ dùng chunk chứa trọn một mục
+        pieces = recursive_splitter.split_documents([section])
+        for i, piece in enumerate(pieces):
+            piece.metadata["section_chunk"] = i
+            piece.metadata["section_chunks"] = len(pieces)
+        final_splits.extend(pieces)
     return final_splits
 
 def auto_classify_with_ai(text_snippet: str, fname: str) -> str:
@@ -95,7 +101,8 @@ def auto_classify_with_ai(text_snippet: str, fname: str) -> str:
             "Chỉ trả về 1 từ là tên nhóm (ví dụ: 'loan').\n\n"
             f"--- VĂN BẢN ({fname}) ---\n{snippet}\n--- HẾT ---\nPhân loại:"
         )
-        resp = llm_classifier.invoke([HumanMessage(content=prompt)])
+        # Qua gateway (đồng bộ, không tạo event loop mới mỗi file): LLM_CLASSIFY_CONCURRENCY
+        resp = llm_gateway.invoke(PURPOSE_CLASSIFY, llm_classifier, [HumanMessage(content=prompt)])
         cat = resp.content.strip().lower()
         
         if cat in ALL_DOMAINS:
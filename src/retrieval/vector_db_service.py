@@ -1,17 +1,64 @@
 # src/retrieval/vector_db_service.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, List, Any, Dict, Iterable
+from typing import Optional, List, Any, Dict, Iterable, Tuple
 import logging
 import asyncio
+from collections import OrderedDict
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS 
+from langchain_community.vectorstores.utils import DistanceStrategy
 from config.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+class _QueryEmbeddingCache(Embeddings):
+    """
+    Bọc model embedding, nhớ vector của các câu hỏi gần nhất (LRU) để một câu hỏi chỉ
+    embed một lần dù được tìm ở nhiều kho / nhiều bước (extractive rồi retriever).
+    """
+    def __init__(self, inner: Embeddings, max_entries: int = 256):
+        self.inner = inner
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _get(self, text: str) -> Optional[List[float]]:
+        vec = self._cache.get(text)
+        if vec is not None:
+            self._cache.move_to_end(text)
+        return vec
+
+    def _put(self, text: str, vec: List[float]) -> List[float]:
+        self._cache[text] = vec
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._get(text) or self._put(text, self.inner.embed_query(text))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._get(text) or self._put(text, await self.inner.aembed_query(text))
+
+
+def _relevance(db: FAISS, score: float) -> float:
+    """
+    Điểm FAISS -> độ tương đồng cosine (0..1), tính tường minh theo distance_strategy:
+    IndexFlatL2 trả về bình phương khoảng cách L2; với vector đã chuẩn hóa, cos = 1 - d²/2.
+    """
+    if getattr(db, "distance_strategy", None) == DistanceStrategy.MAX_INNER_PRODUCT:
+        sim = score
+    else:
+        sim = 1.0 - score / 2.0
+    return max(0.0, min(1.0, sim))
+
 # --- Class _CombinedRetriever (để gộp kết quả từ nhiều kho) ---
 class _CombinedRetriever:
     """Gộp kết quả từ nhiều retriever con (ví dụ: 'faq' + 'general')."""
@@ -74,10 +121,10 @@ class VectorDBService:
         """Sử dụng Google Embeddings."""
         if self._emb is None:
             logger.info(f"Đang tải Google Embedding model: {settings.GEMINI_EMBEDDING_MODEL}")
-            self._emb = GoogleGenerativeAIEmbeddings(
+            self._emb = _QueryEmbeddingCache(GoogleGenerativeAIEmbeddings(
                 model=settings.GEMINI_EMBEDDING_MODEL,
                 google_api_key=settings.GOOGLE_API_KEY
-            )
+            ))
         return self._emb
 
     def _load_db(self, domain: str) -> Optional[FAISS]:
@@ -169,4 +216,20 @@ class VectorDBService:
         # Trả về retriever đã gộp
         return _CombinedRetriever(retrievers, final_k=k)
 
+    async def asearch_scored(self, query: str, domains: Iterable[str], k: int = 1) -> List[Tuple[Document, float]]:
+        """
+        Tìm top-k trong nhiều kho, kèm độ tương đồng cosine (0..1, cao = giống), sắp giảm dần.
+        Vector câu hỏi được nhớ lại nên retriever tìm tiếp cùng câu hỏi không phải embed lại.
+        """
+        dbs = [db for db in (self._get_db_instance(d) for d in domains) if db is not None]
+        if not dbs:
+            return []
+        vector = await self.embeddings.aembed_query(query)
+        hits: List[Tuple[Document, float]] = []
+        for db in dbs:
+            for doc, score in await db.asimilarity_search_with_score_by_vector(vector, k=k):
+                hits.append((doc, _relevance(db, score)))
+        hits.sort(key=lambda h: h[1], reverse=True)
+        return hits[:k]
+
 vector_db_service = VectorDBService()
\ No newline at end of file
@@ -0,0 +1,70 @@
+# src/scripts/bench_telex.py
+"""
+Kiểm tra bộ gõ frontend/telex.py với bộ test chuẩn (telex_golden.tsv) và đo tốc độ.
+
+    python src/scripts/bench_telex.py
+Thoát với mã 1 nếu có ca sai.
+"""
+import sys
+import time
+from pathlib import Path
+
+# --- CẤU HÌNH ĐƯỜNG DẪN ---
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from frontend.telex import TelexComposer, compose
+
+GOLDEN_FILE = current_dir / "telex_golden.tsv"
+BENCH_KEYS = "Tooi muoons gowir tieets kieemj 500 trieeuj trong 12 thasng, laix suaats bao nhieeu? "
+BENCH_ROUNDS = 2000
+
+
+def load_golden():
+    cases = []
+    for line in GOLDEN_FILE.read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        method, keys, expected = line.split("\t")
+        cases.append((method, keys, expected))
+    return cases
+
+
+def run_golden():
+    failures = 0
+    cases = load_golden()
+    for method, keys, expected in cases:
+        got = compose(keys, method)
+        if got != expected:
+            failures += 1
+            print(f" [SAI] {method}: '{keys}' -> '{got}' (mong đợi '{expected}')")
+    print(f"1. Golden: {len(cases) - failures}/{len(cases)} ca đúng")
+    return failures
+
+
+def run_bench():
+    composer = TelexComposer()
+    keys = 0
+    touched = 0   # Số ký tự widget phải sửa (xóa + chèn) theo Edit
+    rebuilt = 0   # Số ký tự nếu dựng lại cả ô nhập mỗi phím (cách cũ)
+    length = 0
+    start = time.perf_counter()
+    for _ in range(BENCH_ROUNDS):
+        composer.reset()
+        length = 0
+        for k in BENCH_KEYS:
+            edit = composer.feed(k)
+            length += len(edit.insert) - edit.delete
+            touched += edit.delete + len(edit.insert)
+            rebuilt += length
+            keys += 1
+    elapsed = time.perf_counter() - start
+    print(f"2. Tốc độ: {keys / elapsed:,.0f} phím/s ({elapsed / keys * 1e6:.2f} µs/phím)")
+    print(f"   Ký tự widget phải sửa: {touched / keys:.2f}/phím (dựng lại cả ô nhập: {rebuilt / keys:.1f}/phím)")
+
+
+if __name__ == "__main__":
+    failed = run_golden()
+    run_bench()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,81 @@
+# src/scripts/build_avatar_atlas.py
+"""
+Đóng gói ảnh avatar thành atlas RGBA đã scale sẵn cho kiosk (xem frontend/avatar_atlas.py).
+
+Chạy lại mỗi khi sửa ảnh trong assets/avatar hoặc AVATAR_ATLAS_SIZES:
+    python src/scripts/build_avatar_atlas.py
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+# --- CẤU HÌNH ĐƯỜNG DẪN ---
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from PIL import Image
+
+from frontend.config import AVATAR_ATLAS_SIZES
+from frontend.avatar_atlas import (
+    ATLAS_FORMAT, AVATAR_SOURCES, MANIFEST_NAME,
+    atlas_file_name, size_key, source_frames, sources_mtime,
+)
+
+AVATAR_DIR = project_root / "assets" / "avatar"
+ATLAS_DIR = AVATAR_DIR / "atlas"
+
+
+def build_state(state, sizes):
+    paths = source_frames(str(AVATAR_DIR), state)
+    if not paths:
+        print(f" [BỎ QUA] Không có ảnh cho trạng thái '{state}'")
+        return None
+
+    files = {}
+    outputs = {size: open(ATLAS_DIR / f"{atlas_file_name(state, size)}.tmp", "wb") for size in sizes}
+    try:
+        # Mỗi ảnh gốc chỉ giải mã một lần, scale ra mọi kích thước
+        for p in paths:
+            with Image.open(p) as img:
+                img = img.convert("RGBA")
+                for size, out in outputs.items():
+                    out.write(img.resize(size, Image.LANCZOS).tobytes())
+    finally:
+        for out in outputs.values():
+            out.close()
+
+    for size in sizes:
+        name = atlas_file_name(state, size)
+        os.replace(ATLAS_DIR / f"{name}.tmp", ATLAS_DIR / name)
+        files[size_key(size)] = name
+
+    print(f" [OK] {state}: {len(paths)} khung x {len(sizes)} kích thước")
+    return {
+        "animated": os.path.isdir(AVATAR_DIR / AVATAR_SOURCES[state]),
+        "frames": len(paths),
+        "sources_mtime": sources_mtime(paths),
+        "files": files,
+    }
+
+
+def main():
+    ATLAS_DIR.mkdir(parents=True, exist_ok=True)
+    sizes = [tuple(s) for s in AVATAR_ATLAS_SIZES]
+    states = {}
+    for state in AVATAR_SOURCES:
+        entry = build_state(state, sizes)
+        if entry:
+            states[state] = entry
+
+    manifest = {"format": ATLAS_FORMAT, "states": states}
+    with open(ATLAS_DIR / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    total = sum(p.stat().st_size for p in ATLAS_DIR.glob("*.rgba"))
+    print(f">>> Đã ghi atlas vào {ATLAS_DIR} ({total / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
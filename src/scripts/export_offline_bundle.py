@@ -0,0 +1,34 @@
+# src/scripts/export_offline_bundle.py
+"""
+Xuất gói câu trả lời ngoại tuyến ra file JSON (xem src/tools/offline_bundle.py).
+
+Dùng để cài sẵn gói cho kiosk mới (trước khi kiosk tự tải qua GET /api/v1/bundle):
+    python src/scripts/export_offline_bundle.py [đường_dẫn_ra]
+Mặc định ghi vào data/offline_bundle.json (đúng OFFLINE_BUNDLE_PATH của kiosk).
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+# --- CẤU HÌNH ĐƯỜNG DẪN ---
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.tools.offline_bundle import offline_bundle_builder
+
+
+def main():
+    out = Path(sys.argv[1]) if len(sys.argv) > 1 else project_root / "data" / "offline_bundle.json"
+    bundle = offline_bundle_builder.build()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, out)  # Kiosk đang đọc file cũ không bao giờ thấy file ghi dở
+    print(f">>> Đã ghi {len(bundle['entries'])} mục (version {bundle['version']}) vào {out}")
+
+
+if __name__ == "__main__":
+    main()
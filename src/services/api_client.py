@@ -0,0 +1,145 @@
+# src/services/api_client.py
+"""
+HTTP client dùng chung cho kiosk (chat + TTS).
+
+- Một requests.Session keep-alive với pool kết nối: mỗi câu hỏi / mỗi đoạn TTS dùng lại
+  kết nối TCP sẵn có thay vì bắt tay lại từ đầu.
+- Timeout tách (connect, read): server tắt -> báo lỗi sau vài giây; LLM nghĩ lâu vẫn không bị cắt.
+- Lỗi kết nối (request chưa được gửi) được thử lại cho mọi lệnh gọi, chỉ ở tầng adapter (urllib3).
+  Lỗi đọc / 502-504 chỉ được thử lại ở _send khi lệnh gọi idempotent (TTS): câu hỏi chat không bao
+  giờ bị gửi hai lần, và server tắt không bị thử kết nối lại hai tầng chồng nhau.
+- Thời gian tới byte đầu tiên (TTFB) phía client được đo tại một chỗ cho từng loại lệnh gọi.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
+from urllib3.util.retry import Retry
+
+RETRY_STATUS = (502, 503, 504)
+
+
+def _connect_failed(exc):
+    """Lỗi do không kết nối được (adapter đã thử lại đủ số lần) chứ không phải lỗi đọc."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, ConnectTimeoutError)  # NewConnectionError là lớp con
+
+
+class LatencyStats:
+    """Các mẫu TTFB gần nhất theo tên lệnh gọi (chat, tts, tts_stream...)."""
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds * 1000)
+
+    def summary(self):
+        out = {}
+        with self._lock:
+            items = {k: sorted(v) for k, v in self._samples.items()}
+        for name, s in items.items():
+            if not s:
+                continue
+            out[name] = {
+                "n": len(s),
+                "p50_ms": round(s[len(s) // 2], 1),
+                "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 1),
+                "max_ms": round(s[-1], 1),
+            }
+        return out
+
+
+class ApiClient:
+    def __init__(self, connect_timeout=3.0, read_timeout=20.0, retries=2, backoff=0.2, pool_maxsize=8):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.ttfb = LatencyStats()
+
+        self.session = requests.Session()
+        # Ở tầng adapter chỉ thử lại lỗi kết nối (request chưa tới server) -> an toàn cho cả POST
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=retries, connect=retries, read=0, status=0, redirect=0,
+                              backoff_factor=backoff, raise_on_status=False),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def timeout(self, read=None):
+        return (self.connect_timeout, read if read is not None else self.read_timeout)
+
+    # --- Lệnh gọi ---
+    def post(self, name, url, json, read_timeout=None, idempotent=False):
+        """POST thường (đọc hết body). TTFB = tới khi nhận header."""
+        response = self._send(url, json, stream=False, read_timeout=read_timeout, idempotent=idempotent)
+        self.ttfb.record(name, response.elapsed.total_seconds())
+        return response
+
+    def get(self, name, url, headers=None, read_timeout=None):
+        """GET luôn idempotent -> thử lại lỗi đọc / 5xx."""
+        response = self._send(url, None, stream=False, read_timeout=read_timeout, idempotent=True,
+                              method="GET", headers=headers)
+        self.ttfb.record(name, response.elapsed.total_seconds())
+        return response
+
+    @contextmanager
+    def stream(self, name, url, json, read_timeout=None, idempotent=False,
+               chunk_size=None, decode_unicode=False):
+        """
+        POST stream; yield iterator các chunk body. TTFB = tới chunk body đầu tiên
+        (server stream gửi header ngay, byte có ích mới là cái người dùng chờ).
+        Status lỗi -> raise requests.HTTPError.
+        """
+        t0 = time.perf_counter()
+        response = self._send(url, json, stream=True, read_timeout=read_timeout, idempotent=idempotent)
+        try:
+            response.raise_for_status()
+            if decode_unicode and response.encoding is None:
+                response.encoding = "utf-8"  # Server không khai báo charset
+            yield self._timed(name, t0, response.iter_content(chunk_size=chunk_size, decode_unicode=decode_unicode))
+        finally:
+            response.close()
+
+    def _timed(self, name, t0, chunks):
+        first = True
+        for chunk in chunks:
+            if first and chunk:
+                self.ttfb.record(name, time.perf_counter() - t0)
+                first = False
+            yield chunk
+
+    def _send(self, url, json, stream, read_timeout, idempotent, method="POST", headers=None):
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            last = attempt + 1 >= attempts
+            try:
+                response = self.session.request(method, url, json=json, headers=headers, stream=stream,
+                                                timeout=self.timeout(read_timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last or _connect_failed(e):
+                    raise  # Lỗi kết nối đã được adapter thử lại, không thử thêm ở đây
+            else:
+                if response.status_code not in RETRY_STATUS or last:
+                    return response
+                response.close()
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def stats(self):
+        return self.ttfb.summary()
+
+    def close(self):
+        self.session.close()
@@ -1,65 +1,223 @@
-import requests
-import speech_recognition as sr
-import pygame
-import tempfile
-import os
+import io
 import time
 import threading
+from collections import deque
+
+import pygame
+
+from src.services.api_client import ApiClient
+from src.services.audio_frames import iter_frames
+from src.services.text_segmenter import split_segments
+from src.services.voice_capture import VoiceCapture
+
+# Kết quả speak_stream_blocking
+STREAM_NOT_STARTED = 0  # Chưa phát được đoạn nào -> có thể đọc lại cả bài bằng /speak
+STREAM_PARTIAL = 1      # Đứt giữa chừng sau khi đã xếp một số đoạn -> chỉ đọc tiếp phần còn lại
+STREAM_COMPLETE = 2
+
+
+class SegmentPlayer:
+    """
+    Phát các đoạn audio từ bộ nhớ (không ghi file tạm) trên một Channel riêng của pygame.
+
+    Đoạn sau được xếp vào Channel.queue() trước khi đoạn trước kết thúc nên không có khoảng lặng.
+    Channel chỉ giữ được MỘT đoạn chờ: queue() khi đã có đoạn chờ sẽ thay mất đoạn đó, nên chỉ
+    xếp đoạn mới khi get_queue() trống. Tiến độ lấy từ chính channel (get_sound / get_queue),
+    không ước lượng theo đồng hồ: mixer có độ trễ nên đoạn thực tế phát muộn hơn lúc play().
+    Mỗi đoạn có một threading.Event báo phát xong.
+    """
+    POLL_S = 0.02  # Chu kỳ hỏi channel khi đang phát
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = deque()     # [(Sound, Event)] chưa đưa vào channel
+        self._scheduled = deque()   # [(Sound, Event)] đang phát / đang chờ trong channel
+        self._last_done = None
+        self._channel = None
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._channel is None:
+            pygame.mixer.set_reserved(1)
+            self._channel = pygame.mixer.Channel(0)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def enqueue(self, sound):
+        """Thêm một đoạn vào cuối hàng đợi, trả về Event được set khi đoạn đó phát xong (hoặc bị stop)."""
+        done = threading.Event()
+        with self._cond:
+            self._ensure_started()
+            self._pending.append((sound, done))
+            self._last_done = done
+            self._cond.notify()
+        return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Báo xong các đoạn không còn trong channel (không đang phát, không đang chờ)
+                in_channel = (self._channel.get_sound(), self._channel.get_queue())
+                while self._scheduled and not any(self._scheduled[0][0] is s for s in in_channel):
+                    self._scheduled.popleft()[1].set()
+
+                if self._pending and in_channel[1] is None:
+                    sound, done = self._pending.popleft()
+                    if self._channel.get_busy():
+                        self._channel.queue(sound)  # Gapless: bắt đầu ngay khi đoạn hiện tại hết
+                    else:
+                        self._channel.play(sound)
+                    self._scheduled.append((sound, done))
+                    continue
+
+                # Đang phát -> hỏi lại channel sau POLL_S; rảnh -> ngủ tới khi có đoạn mới / stop
+                self._cond.wait(self.POLL_S if self._scheduled else None)
+
+    def idle(self):
+        with self._cond:
+            return not self._pending and not self._scheduled
+
+    def wait_idle(self, timeout=None):
+        """Chờ đoạn cuối cùng phát xong (hoặc stop). False nếu hết timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            last = self._last_done
+            if last is None:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if last.wait(remaining) and last is self._last_done:
+                return True
+
+    def stop(self):
+        with self._cond:
+            if self._channel is not None:
+                self._channel.stop()
+            for _, done in self._pending:
+                done.set()
+            for _, done in self._scheduled:
+                done.set()
+            self._pending.clear()
+            self._scheduled.clear()
+            self._cond.notify()
+
 
 class AudioClient:
-    def __init__(self, tts_url):
+    def __init__(self, tts_url, stream_url=None, voice_capture=None, api_client=None):
         self.tts_url = tts_url
+        # Mặc định: /tts/speak -> /tts/stream
+        self.stream_url = stream_url or tts_url.rsplit("/", 1)[0] + "/stream"
+        self._stream_stopped = False
+        # Dùng chung session keep-alive với chat (tổng hợp TTS là idempotent -> được thử lại)
+        self.api = api_client or ApiClient()
+        self.player = SegmentPlayer()
+        self.voice_capture = voice_capture
         try:
             pygame.mixer.init()
         except:
             print("Warning: Pygame mixer init failed")
 
-    def speak_blocking(self, text, voice_name="vi-VN-Standard-A", speed=1.0):
+    def _payload(self, text, voice_name, speed):
+        return {
+            "text": text[:2000],  # Increased limit for smoother full-text reading
+            "voice_name": voice_name,
+            "speaking_rate": speed,
+            "audio_encoding": "MP3"
+        }
+
+    def enqueue(self, audio_bytes):
         """
-        Phiên bản blocking của hàm speak, dùng cho queue worker.
+        Giải mã audio từ bộ nhớ và xếp vào hàng đợi phát (không chặn).
+        Trả về Event báo phát xong; None nếu không phát được.
         """
-        tmp_path = None
+        if not audio_bytes or not pygame.mixer.get_init():
+            return None
         try:
-            payload = {
-                "text": text[:2000],  # Increased limit for smoother full-text reading
-                "voice_name": voice_name,
-                "speaking_rate": speed,
-                "audio_encoding": "MP3"
-            }
-            # Gọi API TTS
-            response = requests.post(self.tts_url, json=payload, timeout=20) # Increased timeout
-            
-            if response.ok:
-                # Lưu file tạm
-                with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as fp:
-                    fp.write(response.content)
-                    tmp_path = fp.name
-                
-                # Phát âm thanh
-                if pygame.mixer.get_init():
-                    pygame.mixer.music.load(tmp_path)
-                    pygame.mixer.music.play()
-                    
-                    # Chờ phát xong
-                    while pygame.mixer.music.get_busy():
-                        time.sleep(0.1)
-                        
-            else:
-                print(f"TTS Error: {response.status_code} - {response.text}")
+            sound = pygame.mixer.Sound(file=io.BytesIO(audio_bytes))
+        except Exception as e:
+            # SDL_mixer cũ không giải mã được MP3 vào Sound -> phát bằng mixer.music
+            print(f"Audio decode fallback: {e}")
+            self._play_music_blocking(audio_bytes)
+            return None
+        return self.player.enqueue(sound)
+
+    def _play_music_blocking(self, audio_bytes):
+        namehint = "wav" if audio_bytes[:4] == b"RIFF" else "mp3"
+        pygame.mixer.music.load(io.BytesIO(audio_bytes), namehint)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():  # stop() dừng music -> thoát vòng lặp
+            time.sleep(0.05)
+
+    def wait_idle(self, timeout=None):
+        """Chờ tới khi mọi đoạn đã xếp hàng phát xong (hoặc bị stop)."""
+        return self.player.wait_idle(timeout)
 
+    def fetch(self, text, voice_name="vi-VN-Standard-A", speed=1.0):
+        """Chỉ tải audio của một đoạn ngắn (không phát). Trả về bytes hoặc None nếu lỗi."""
+        try:
+            response = self.api.post("tts", self.tts_url, json=self._payload(text, voice_name, speed), idempotent=True)
+            if response.ok:
+                return response.content
+            print(f"TTS Error: {response.status_code} - {response.text}")
         except Exception as e:
             print(f"TTS Exception: {e}")
-        finally:
-            # Dọn dẹp file tạm
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                except:
-                    pass
+        return None
+
+    def play_blocking(self, audio_bytes):
+        """Phát audio đã tải, chờ tới khi phát xong (hoặc bị stop())."""
+        try:
+            done = self.enqueue(audio_bytes)
+            if done:
+                done.wait()
+        except Exception as e:
+            print(f"Audio play Exception: {e}")
+
+    def speak_stream_blocking(self, text, voice_name="vi-VN-Standard-A", speed=1.0):
+        """
+        Đọc theo từng câu: server trả audio từng đoạn, phát ngay đoạn đầu tiên
+        trong khi các đoạn sau vẫn đang được tổng hợp.
+        Trả về (trạng thái, số frame đã nhận): STREAM_COMPLETE, STREAM_PARTIAL (đứt giữa chừng,
+        các frame đã nhận vẫn được phát) hoặc STREAM_NOT_STARTED (chưa nhận frame nào).
+        """
+        self._stream_stopped = False
+        frames = 0
+        try:
+            with self.api.stream("tts_stream", self.stream_url, json=self._payload(text, voice_name, speed),
+                                 idempotent=True, chunk_size=8192) as chunks:
+                for audio in iter_frames(chunks):
+                    if self._stream_stopped:
+                        break
+                    frames += 1  # Frame rỗng (server tổng hợp lỗi) vẫn ứng với một đoạn
+                    self.enqueue(audio)  # Gapless: đoạn sau nối ngay sau đoạn trước
+        except Exception as e:
+            print(f"TTS stream Exception: {e}")
+            return (STREAM_PARTIAL if frames else STREAM_NOT_STARTED), frames
+        self.wait_idle()
+        return STREAM_COMPLETE, frames
+
+    def speak_blocking(self, text, voice_name="vi-VN-Standard-A", speed=1.0):
+        """
+        Phiên bản blocking của hàm speak, dùng cho queue worker.
+        Ưu tiên /tts/stream (phát sớm). Stream lỗi trước đoạn đầu -> /tts/speak cả bài;
+        đứt giữa chừng -> /tts/speak phần chưa phát (không đọc lại từ đầu).
+        """
+        state, frames = self.speak_stream_blocking(text, voice_name, speed)
+        if state == STREAM_COMPLETE or self._stream_stopped:
+            return
+        if state == STREAM_PARTIAL:
+            # Server tách đoạn bằng split_segments (TTS_SEGMENT_MAX_CHARS mặc định 180, khớp mặc định ở đây)
+            rest = split_segments(self._payload(text, voice_name, speed)["text"])[frames:]
+            if not rest:
+                self.wait_idle()
+                return
+            text = " ".join(rest)
+        self.play_blocking(self.fetch(text, voice_name, speed))
 
     def speak(self, text, voice_name="vi-VN-Standard-A", speed=1.0, on_finish=None):
         """
-        Gửi text tới server TTS, nhận về file audio (bytes) và phát bằng pygame.
+        Gửi text tới server TTS, nhận về audio (bytes) và phát bằng pygame.
         """
         def _run():
             self.speak_blocking(text, voice_name, speed)
@@ -70,41 +228,41 @@ class AudioClient:
         threading.Thread(target=_run, daemon=True).start()
 
     def stop(self):
-        """Dừng phát âm thanh ngay lập tức."""
+        """Dừng phát âm thanh ngay lập tức (xóa cả hàng đợi đoạn)."""
+        self._stream_stopped = True
+        self.player.stop()
         try:
             if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
                 pygame.mixer.music.stop()
         except:
             pass
 
+    # --- Micro (STT) ---
+    def _get_voice_capture(self):
+        # Mở mic một lần ở lần nghe đầu tiên rồi giữ luôn (không mở/đóng mỗi lần bấm)
+        if self.voice_capture is None:
+            self.voice_capture = VoiceCapture()
+        return self.voice_capture
+
     def listen(self, status_callback=None):
         """
-        Thu âm từ microphone và chuyển thành văn bản (STT).
-        Sử dụng thư viện speech_recognition (Google Speech API).
-        Hàm này BLOCKING (nên gọi trong thread).
+        Thu một câu nói và chuyển thành văn bản (STT).
+        Kết thúc câu theo VAD (im lặng ~0.6 s) và gửi nhận dạng ngay.
+        Hàm này BLOCKING (nên gọi trong thread); trả về None nếu không nghe rõ hoặc bị hủy.
         """
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            # Tự động chỉnh độ nhạy mic
-            r.adjust_for_ambient_noise(source, duration=0.5)
-            
-            if status_callback:
-                status_callback("Đang nghe...")
-            
-            try:
-                # Lắng nghe (tối đa 5s chờ, 10s thu)
-                audio = r.listen(source, timeout=5, phrase_time_limit=10)
-                
-                if status_callback:
-                    status_callback("Đang xử lý...")
-                
-                # Gọi Google STT (cần mạng)
-                text = r.recognize_google(audio, language="vi-VN")
-                return text
-            except sr.WaitTimeoutError:
-                return None
-            except sr.UnknownValueError:
-                return None
-            except Exception as e:
-                print(f"STT Error: {e}")
-                return None
+        try:
+            return self._get_voice_capture().listen(status_callback=status_callback)
+        except Exception as e:
+            print(f"STT Error: {e}")
+            return None
+
+    def cancel_listen(self):
+        """Hủy lượt nghe hiện tại; listen() trả về None ngay lập tức."""
+        if self.voice_capture is not None:
+            self.voice_capture.cancel()
+
+    def close(self):
+        self.stop()
+        if self.voice_capture is not None:
+            self.voice_capture.close()
+            self.voice_capture = None
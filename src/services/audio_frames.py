@@ -0,0 +1,35 @@
+# src/services/audio_frames.py
+"""
+Định dạng luồng audio của /tts/stream (dùng chung cho server và kiosk).
+
+Luồng gồm các frame nối tiếp, theo đúng thứ tự đoạn văn bản:
+    [4 byte big-endian: độ dài N][N byte audio]
+N = 0 nghĩa là đoạn đó tổng hợp lỗi (client bỏ qua, phát đoạn tiếp theo).
+"""
+import struct
+from typing import Iterable, Iterator
+
+FRAME_HEADER = struct.Struct(">I")
+MEDIA_TYPE = "application/x-tts-frames"
+
+
+def encode_frame(audio: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(audio)) + audio
+
+
+def iter_frames(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Ghép các chunk mạng tùy ý thành từng frame audio hoàn chỉnh."""
+    buf = bytearray()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf.extend(chunk)
+        while len(buf) >= FRAME_HEADER.size:
+            (size,) = FRAME_HEADER.unpack_from(buf)
+            end = FRAME_HEADER.size + size
+            if len(buf) < end:
+                break
+            yield bytes(buf[FRAME_HEADER.size:end])
+            del buf[:end]
+    if buf:
+        raise ValueError(f"Luồng audio bị cắt ngang ({len(buf)} byte dư)")
@@ -0,0 +1,121 @@
+# src/services/text_segmenter.py
+"""
+Tách câu trả lời thành các đoạn ngắn (câu / mệnh đề) để tổng hợp và phát TTS dần dần.
+
+- Mỗi dòng của bảng tool (🔹 Kỳ hạn..., 💵 Gửi...) là một đơn vị; dòng kẻ (━━━, ----) bị bỏ.
+- Emoji/biểu tượng bị loại khỏi văn bản đọc.
+- Tách câu theo . ! ? … nhưng không cắt số thập phân (5.6%) hay số có dấu phân cách (200,000,000).
+- Đoạn quá ngắn được gộp với đoạn sau; đoạn quá dài được cắt theo , ; : rồi theo khoảng trắng.
+"""
+from __future__ import annotations
+import re
+import unicodedata
+from typing import List
+
+from src.core.utils import speech_text
+
+# Kết thúc câu: dấu câu + khoảng trắng (5.6% hay 200,000 không có khoảng trắng nên không bị cắt)
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+_RULE_LINE = re.compile(r"^[\s━─═\-_=*~.·•]*$")
+# Ký tự nối emoji: ZWJ, variation selector, keycap
+_EMOJI_JOINERS = {"\u200d", "\ufe0e", "\ufe0f", "\u20e3"}
+
+
+def strip_symbols(text: str) -> str:
+    """Bỏ emoji/biểu tượng (Unicode So/Sk, cờ, ký tự nối) nhưng giữ chữ, số và dấu câu."""
+    out = []
+    for ch in text:
+        if ch in _EMOJI_JOINERS or unicodedata.category(ch) in ("So", "Sk", "Cs", "Co"):
+            out.append(" ")
+        else:
+            out.append(ch)
+    return re.sub(r"[ \t]+", " ", "".join(out)).strip()
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts: List[str] = []
+    for clause in _CLAUSE_END.split(sentence):
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            parts.append(clause)
+    return parts
+
+
+def _merge_short(parts: List[str], min_chars: int, max_chars: int) -> List[str]:
+    merged: List[str] = []
+    for p in parts:
+        if merged and len(merged[-1]) < min_chars and len(merged[-1]) + len(p) + 1 <= max_chars:
+            sep = " " if merged[-1][-1:] in ".!?…,;:" else ". "
+            merged[-1] = f"{merged[-1]}{sep}{p}"
+        else:
+            merged.append(p)
+    return merged
+
+
+def split_segments(text: str, max_chars: int = 180, min_chars: int = 24) -> List[str]:
+    """Danh sách đoạn đọc theo thứ tự; đoạn đầu tiên ngắn để phát được sớm nhất."""
+    text = speech_text(text)
+    if not text:
+        return []
+
+    parts: List[str] = []
+    for line in text.splitlines():
+        if _RULE_LINE.match(line):
+            continue
+        line = strip_symbols(line)
+        if not line:
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            if sentence:
+                parts.extend(_split_long(sentence, max_chars))
+
+    return _merge_short(parts, min_chars, max_chars)
+
+
+# Ranh giới có thể cắt khi văn bản đang stream: hết câu + khoảng trắng, hoặc xuống dòng
+_STREAM_BOUNDARY = re.compile(r"[.!?…]\s+|\n+")
+
+
+class StreamingSegmenter:
+    """
+    Tách dần các token LLM đang stream thành câu để đọc ngay, không chờ hết câu trả lời.
+    feed() trả về các đoạn đã hoàn chỉnh; flush() trả về phần còn lại khi stream kết thúc.
+    """
+    def __init__(self, max_chars: int = 180, min_chars: int = 24):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self._buf = ""
+
+    def _find_cut(self) -> int:
+        for m in _STREAM_BOUNDARY.finditer(self._buf):
+            if m.end() >= self.min_chars:
+                return m.end()
+        if len(self._buf) > self.max_chars:
+            cut = self._buf.rfind(" ", 0, self.max_chars)
+            return cut if cut > 0 else self.max_chars
+        return 0
+
+    def feed(self, chunk: str) -> List[str]:
+        self._buf += chunk
+        out: List[str] = []
+        cut = self._find_cut()
+        while cut:
+            piece, self._buf = self._buf[:cut], self._buf[cut:]
+            out.extend(split_segments(piece, self.max_chars, self.min_chars))
+            cut = self._find_cut()
+        return out
+
+    def flush(self) -> List[str]:
+        piece, self._buf = self._buf, ""
+        return split_segments(piece, self.max_chars, self.min_chars)
+
+    def reset(self) -> None:
+        self._buf = ""
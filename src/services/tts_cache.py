@@ -0,0 +1,238 @@
+# src/services/tts_cache.py
+"""
+Cache audio TTS theo nội dung (content-addressed).
+
+Khóa = sha256(văn bản đã chuẩn hóa, ngôn ngữ, giọng, tốc độ, cao độ, định dạng).
+Chỉ audio của provider chính được cache (xem TTSResult.cacheable): audio gTTS / local sinh ra
+lúc Google lỗi không bị phục vụ tiếp sau khi Google hoạt động lại.
+Hai tầng:
+- Bộ nhớ: LRU giới hạn theo tổng số byte.
+- Đĩa: mỗi khóa một file, giới hạn tổng dung lượng, xóa file ít dùng nhất (theo mtime).
+Khóa cũng được dùng làm ETag cho HTTP.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from config.config import settings
+from src.core.utils import speech_text
+
+logger = logging.getLogger(__name__)
+
+
+def audio_key(text: str, language_code: str, voice_name: Optional[str], speaking_rate: float,
+              pitch: float, audio_encoding: str) -> str:
+    """Khóa nội dung; `text` phải là văn bản đã chuẩn hóa (xem normalize_text)."""
+    payload = json.dumps(
+        [text, language_code, voice_name or "", round(float(speaking_rate), 3),
+         round(float(pitch), 3), (audio_encoding or "MP3").upper()],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Văn bản thực sự được tổng hợp: cùng câu trả lời -> cùng chuỗi -> cùng khóa."""
+    return speech_text(text)
+
+
+class TTSAudioCache:
+    def __init__(self, cache_dir: str, memory_bytes: int = 32 * 1024 * 1024,
+                 disk_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        # Mỗi khóa đang tổng hợp có một lock riêng để các request trùng nhau chỉ gọi TTS một lần
+        self._inflight: Dict[str, threading.Lock] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_synthesized = 0
+
+        self._disk_bytes = 0
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*.audio"))
+        except OSError as e:
+            logger.warning(f"TTS cache: không dùng được thư mục {self.cache_dir}: {e}")
+            self.disk_limit = 0
+
+    # --- Tầng bộ nhớ ---
+    def _mem_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+            return data
+
+    def _mem_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_limit:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old)
+            self._mem[key] = data
+            self._mem_bytes += len(data)
+            while self._mem_bytes > self.memory_limit:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_bytes -= len(evicted)
+
+    # --- Tầng đĩa ---
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.audio"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if not self.disk_limit:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Đánh dấu vừa dùng (LRU theo mtime)
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, data: bytes) -> None:
+        if not self.disk_limit or len(data) > self.disk_limit:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+        try:
+            old_size = path.stat().st_size if path.exists() else 0  # Ghi đè -> không cộng trùng
+            tmp.write_bytes(data)
+            os.replace(tmp, path)  # Ghi nguyên tử: không bao giờ đọc phải file dở dang
+        except OSError as e:
+            logger.warning(f"TTS cache: lỗi ghi đĩa {path.name}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - old_size
+            over = self._disk_bytes > self.disk_limit
+        if over:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        try:
+            files = sorted(self.cache_dir.glob("*.audio"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            # Xóa tới 90% giới hạn để không phải dọn lại ngay lần ghi sau
+            target = int(self.disk_limit * 0.9)
+            for p in files:
+                if total <= target:
+                    break
+                size = p.stat().st_size
+                p.unlink(missing_ok=True)
+                total -= size
+        except OSError as e:
+            logger.warning(f"TTS cache: lỗi dọn thư mục cache: {e}")
+            return
+        with self._lock:
+            self._disk_bytes = total
+
+    # --- API ---
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self._mem:
+                return True
+        return bool(self.disk_limit) and self._path(key).exists()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._mem_get(key)
+        if data is not None:
+            self.memory_hits += 1
+        else:
+            data = self._disk_get(key)
+            if data is None:
+                return None
+            self.disk_hits += 1
+            self._mem_put(key, data)
+        self.bytes_served += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._mem_put(key, data)
+        self._disk_put(key, data)
+
+    def get_or_synthesize(self, key: str, synthesize: Callable[[], Tuple[bytes, bool]]) -> Tuple[bytes, bool]:
+        """
+        Hàm blocking (chạy trong threadpool). Chỉ một luồng tổng hợp cho mỗi khóa.
+        `synthesize` trả về (audio, có_được_cache); kết quả trả về cùng dạng.
+        """
+        data = self.get(key)
+        if data is not None:
+            return data, True
+
+        with self._lock:
+            inflight = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with inflight:
+                data = self.get(key)  # Luồng khác có thể vừa tổng hợp xong
+                if data is not None:
+                    return data, True
+                self.misses += 1
+                data, cacheable = synthesize()
+                self.bytes_synthesized += len(data)
+                self.bytes_served += len(data)
+                if cacheable:
+                    self.put(key, data)
+                return data, cacheable
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def warm_up(self, items: Iterable[tuple], synthesize: Callable[[str], Tuple[bytes, bool]]) -> int:
+        """
+        Tổng hợp trước các câu chưa có trong cache.
+        `items`: các cặp (khóa, văn bản đã chuẩn hóa). Trả về số câu mới được tổng hợp.
+        """
+        created = 0
+        for key, text in items:
+            if not text or self.contains(key):
+                continue
+            try:
+                _, cacheable = self.get_or_synthesize(key, lambda t=text: synthesize(t))
+                if not cacheable:
+                    break  # Chỉ còn audio thay thế -> dừng, thử lại ở lượt sau
+                created += 1
+            except Exception as e:
+                logger.warning(f"TTS warm-up lỗi: {e}")
+                break  # Provider lỗi -> dừng, thử lại ở lượt sau
+        return created
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            mem_items, mem_bytes, disk_bytes = len(self._mem), self._mem_bytes, self._disk_bytes
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "bytes_synthesized": self.bytes_synthesized,
+            "memory_items": mem_items,
+            "memory_bytes": mem_bytes,
+            "memory_limit": self.memory_limit,
+            "disk_bytes": disk_bytes,
+            "disk_limit": self.disk_limit,
+        }
+
+
+# Instance dùng chung
+tts_audio_cache = TTSAudioCache(
+    settings.TTS_CACHE_DIR,
+    memory_bytes=settings.TTS_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_bytes=settings.TTS_CACHE_DISK_MB * 1024 * 1024,
+)
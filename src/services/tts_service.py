@@ -1,8 +1,28 @@
 # src/services/tts_service.py
+"""
+Tổng hợp giọng nói qua một pool provider dùng chung cho cả tiến trình.
+
+- Client Google (kênh gRPC + credentials) được tạo một lần lúc khởi động và dùng lại.
+- Semaphore giới hạn số request TTS chạy đồng thời.
+- Chọn provider theo sức khỏe: google -> gtts -> local (audio im lặng thay thế).
+  Provider lỗi bị tạm bỏ qua trong TTS_PROVIDER_COOLDOWN giây.
+"""
 from __future__ import annotations
+import abc
+import io
 import logging
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
 from pydantic.v1 import BaseModel, Field
 
+from config.config import settings
+from src.core.utils import percentile
+
 # Thư viện TTS bạn muốn dùng (ví dụ: Google, gTTS, etc.)
 # Cài đặt: pip install google-cloud-texttospeech
 try:
@@ -24,82 +44,253 @@ class TTSConfig(BaseModel):
     audio_encoding: str = Field("MP3", description="MP3 | LINEAR16 | OGG_OPUS")
 
     def get_google_encoding(self) -> Any:
-        if texttospeech:
-            if self.audio_encoding.upper() == "LINEAR16":
-                return texttospeech.AudioEncoding.LINEAR16
-            if self.audio_encoding.upper() == "OGG_OPUS":
-                return texttospeech.AudioEncoding.OGG_OPUS
+        if self.audio_encoding.upper() == "LINEAR16":
+            return texttospeech.AudioEncoding.LINEAR16
+        if self.audio_encoding.upper() == "OGG_OPUS":
+            return texttospeech.AudioEncoding.OGG_OPUS
         return texttospeech.AudioEncoding.MP3  # Mặc định
 
-class TTSService:
-    """
-    Đây là class service (logic) mà file API (tts.py) cần.
-    Nó chứa logic thực sự để gọi API của Google hoặc thư viện khác.
-    """
-    def __init__(self, config: TTSConfig):
-        self.config = config
-        self.provider = config.provider
-        
-        # Ưu tiên Google Cloud TTS nếu đã cài đặt
-        if self.provider == "auto" or self.provider == "google":
-            if texttospeech is not None:
-                try:
-                    self.client = texttospeech.TextToSpeechClient()
-                    self.provider = "google"
-                except Exception as e:
-                    logger.warning(f"Không thể khởi tạo Google TTS Client: {e}. Fallback sang gTTS.")
-                    self.provider = "gtts"
-            else:
-                self.provider = "gtts"
-        
-        logger.info(f"TTSService đang dùng provider: {self.provider}")
 
-    def synthesize(self, text: str) -> bytes:
-        """
-        Đây là hàm blocking (đồng bộ) thực hiện việc tạo âm thanh.
-        FastAPI sẽ chạy hàm này trong một threadpool.
-        """
-        if self.provider == "google" and self.client:
-            return self._synthesize_google(text)
-        
-        # Fallback (hoặc nếu chọn gTTS)
-        # Cài đặt: pip install gTTS
-        try:
-            from gtts import gTTS
-            from io import BytesIO
-            
-            tts = gTTS(text=text, lang=self.config.language_code.split('-')[0]) # gTTS dùng 'vi'
-            mp3_fp = BytesIO()
-            tts.write_to_fp(mp3_fp)
-            mp3_fp.seek(0)
-            return mp3_fp.read()
-            
-        except ImportError:
-            logger.error("Provider 'gtts' được chọn nhưng chưa cài đặt 'pip install gTTS'")
-            raise
-        except Exception as e:
-            logger.error(f"gTTS lỗi: {e}")
-            raise
+@dataclass(frozen=True)
+class TTSResult:
+    audio: bytes
+    provider: str
+    latency_ms: float
+    fallback: bool = False  # Không phải provider chính (provider chính lỗi / đang cooldown)
+
+    @property
+    def cacheable(self) -> bool:
+        # Chỉ cache audio của provider chính: audio dự phòng (gTTS, im lặng) sinh ra lúc provider
+        # chính lỗi sẽ được tổng hợp lại bằng provider chính khi nó hoạt động trở lại
+        return not self.fallback and self.provider != LocalProvider.name
+
+
+class TTSProvider(abc.ABC):
+    name = "base"
 
-    def _synthesize_google(self, text: str) -> bytes:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=256)
+        self.unhealthy_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def setup(self) -> None:
+        """Khởi tạo tài nguyên dùng lâu dài (gọi một lần lúc khởi động)."""
+
+    def available(self) -> bool:
+        return True
+
+    def healthy(self) -> bool:
+        return self.available() and time.monotonic() >= self.unhealthy_until
+
+    @abc.abstractmethod
+    def synthesize(self, text: str, cfg: TTSConfig) -> bytes:
+        """Trả về audio theo cfg.audio_encoding; ném lỗi nếu provider không tổng hợp được."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available(),
+            "healthy": self.healthy(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_ms": percentile(self.latencies_ms, 0.5),
+            "p95_ms": percentile(self.latencies_ms, 0.95),
+            "last_error": self.last_error,
+        }
+
+
+class GoogleProvider(TTSProvider):
+    name = "google"
+
+    def __init__(self):
+        super().__init__()
+        self.client = None
+        self.init_ms: Optional[float] = None
+        self.init_error: Optional[str] = None
+        self._init_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if texttospeech is None or self.client is not None:
+            return
+        with self._init_lock:
+            if self.client is not None:
+                return
+            t0 = time.perf_counter()
+            try:
+                # Client gRPC an toàn khi dùng chung giữa nhiều luồng
+                self.client = texttospeech.TextToSpeechClient()
+            except Exception as e:
+                # Thiếu credentials -> coi như không có Google TTS trên máy này
+                self.init_error = str(e)
+                raise
+            self.init_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+            logger.info(f"Google TTS client sẵn sàng ({self.init_ms} ms)")
+
+    def available(self) -> bool:
+        return texttospeech is not None and self.init_error is None
+
+    def synthesize(self, text: str, cfg: TTSConfig) -> bytes:
         """Logic gọi Google Cloud TTS."""
-        if not self.client:
-            raise ValueError("Google TTS client chưa được khởi tạo.")
-            
+        self.setup()
         synthesis_input = texttospeech.SynthesisInput(text=text)
-        
+
         voice = texttospeech.VoiceSelectionParams(
-            language_code=self.config.language_code,
-            name=self.config.voice_name
+            language_code=cfg.language_code,
+            name=cfg.voice_name
         )
-        
+
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=self.config.get_google_encoding(),
-            speaking_rate=self.config.speaking_rate,
-            pitch=self.config.pitch
+            audio_encoding=cfg.get_google_encoding(),
+            speaking_rate=cfg.speaking_rate,
+            pitch=cfg.pitch
         )
-        
+
         response = self.client.synthesize_speech(
             input=synthesis_input, voice=voice, audio_config=audio_config
         )
-        return response.audio_content
\ No newline at end of file
+        return response.audio_content
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "client_init_ms": self.init_ms}
+
+
+class GTTSProvider(TTSProvider):
+    name = "gtts"
+
+    def __init__(self):
+        super().__init__()
+        try:
+            from gtts import gTTS
+        except ImportError:
+            gTTS = None
+        self._gtts = gTTS
+
+    def available(self) -> bool:
+        return self._gtts is not None
+
+    def synthesize(self, text: str, cfg: TTSConfig) -> bytes:
+        # gTTS luôn trả MP3, dùng mã 'vi' thay vì 'vi-VN'
+        tts = self._gtts(text=text, lang=cfg.language_code.split('-')[0])
+        mp3_fp = io.BytesIO()
+        tts.write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+
+class LocalProvider(TTSProvider):
+    """Thay thế cuối cùng khi mọi provider mạng đều lỗi: WAV im lặng ngắn để kiosk không bị treo."""
+    name = "local"
+    SAMPLE_RATE = 16000
+    DURATION_S = 0.3
+
+    def __init__(self):
+        super().__init__()
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.SAMPLE_RATE)
+            w.writeframes(b"\x00\x00" * int(self.SAMPLE_RATE * self.DURATION_S))
+        self._silence = buf.getvalue()
+
+    def synthesize(self, text: str, cfg: TTSConfig) -> bytes:
+        return self._silence
+
+
+PROVIDERS = {p.name: p for p in (GoogleProvider, GTTSProvider, LocalProvider)}
+
+
+class TTSProviderPool:
+    def __init__(self, order: Sequence[str] = ("google", "gtts", "local"), max_concurrency: int = 4,
+                 queue_timeout: float = 10.0, cooldown: float = 30.0):
+        self.providers: Dict[str, TTSProvider] = {name: PROVIDERS[name]() for name in order if name in PROVIDERS}
+        self.order = list(self.providers)
+        self.cooldown = cooldown
+        self.queue_timeout = queue_timeout
+        self.max_concurrency = max_concurrency
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+        self.queue_wait_ms: Deque[float] = deque(maxlen=256)
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Gọi lúc khởi động app (blocking): tạo sẵn client để request đầu tiên không phải chờ."""
+        for p in self.providers.values():
+            try:
+                p.setup()
+            except Exception as e:
+                p.last_error = str(e)
+                p.unhealthy_until = time.monotonic() + self.cooldown
+                logger.warning(f"Không thể khởi tạo TTS provider '{p.name}': {e}")
+
+    def ranked(self, preferred: Optional[str] = None) -> List[TTSProvider]:
+        """Các provider dùng được trên máy này, theo thứ tự ưu tiên (kể cả đang cooldown)."""
+        order = self.order
+        if preferred in self.providers:
+            order = [preferred] + [n for n in order if n != preferred]
+        return [self.providers[n] for n in order if self.providers[n].available()]
+
+    def candidates(self, preferred: Optional[str] = None) -> List[TTSProvider]:
+        providers = self.ranked(preferred)
+        healthy = [p for p in providers if p.healthy()]
+        # Tất cả đang "ốm" -> vẫn thử theo thứ tự thay vì từ chối ngay
+        return healthy or providers
+
+    def synthesize(self, text: str, cfg: TTSConfig) -> TTSResult:
+        """Hàm blocking (chạy trong threadpool)."""
+        t0 = time.perf_counter()
+        if not self._sem.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise RuntimeError(f"TTS quá tải (chờ quá {self.queue_timeout}s)")
+        self.queue_wait_ms.append((time.perf_counter() - t0) * 1000.0)
+        try:
+            last_error: Optional[Exception] = None
+            ranked = self.ranked(cfg.provider)
+            # Provider chính = provider dùng được xếp đầu; kết quả là "dự phòng" chỉ khi đã bỏ qua
+            # (lỗi / đang cooldown) một provider xếp trên mà máy này có
+            primary = ranked[0] if ranked else None
+            for p in self.candidates(cfg.provider):
+                p.calls += 1
+                t1 = time.perf_counter()
+                try:
+                    audio = p.synthesize(text, cfg)
+                except Exception as e:
+                    p.errors += 1
+                    p.last_error = str(e)
+                    p.unhealthy_until = time.monotonic() + self.cooldown
+                    logger.warning(f"TTS provider '{p.name}' lỗi: {e}. Thử provider tiếp theo.")
+                    last_error = e
+                    continue
+                latency = (time.perf_counter() - t1) * 1000.0
+                p.latencies_ms.append(latency)
+                return TTSResult(audio, p.name, latency, fallback=p is not primary)
+            raise RuntimeError(f"Không có TTS provider khả dụng: {last_error}")
+        finally:
+            self._sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_wait_p95_ms": percentile(self.queue_wait_ms, 0.95),
+            "rejected": self.rejected,
+            "providers": {name: p.stats() for name, p in self.providers.items()},
+        }
+
+
+class TTSService:
+    """
+    Giữ tương thích với code cũ: mọi instance dùng chung pool `tts_pool`.
+    """
+    def __init__(self, config: TTSConfig):
+        self.config = config
+
+    def synthesize(self, text: str) -> bytes:
+        return tts_pool.synthesize(text, self.config).audio
+
+
+# Instance dùng chung (khởi tạo client trong tts_pool.start() lúc app startup)
+tts_pool = TTSProviderPool(
+    order=[p.strip() for p in settings.TTS_PROVIDER_ORDER.split(",") if p.strip()],
+    max_concurrency=settings.TTS_MAX_CONCURRENCY,
+    queue_timeout=settings.TTS_QUEUE_TIMEOUT,
+    cooldown=settings.TTS_PROVIDER_COOLDOWN,
+)
@@ -0,0 +1,270 @@
+# src/services/voice_capture.py
+"""
+Thu âm liên tục + VAD cho kiosk.
+
+- Mic được mở một lần và đọc liên tục theo frame 30 ms trong một luồng nền.
+- Ngưỡng nhiễu (noise floor) được cập nhật liên tục từ mọi frame ngoài lượt đang thu (phân vị
+  thấp của RMS gần đây), nên không cần hiệu chỉnh 0.5 s (adjust_for_ambient_noise) mỗi lần bấm
+  mic, và vẫn theo kịp khi sảnh ồn lên (kể cả khi nhiễu đã vượt ngưỡng "có tiếng nói").
+- VAD theo năng lượng từng frame (kết hợp webrtcvad nếu có cài); kết thúc câu khi
+  im lặng đủ lâu rồi gửi ngay cho bộ nhận dạng.
+- Bộ nhận dạng có thể thay thế (Google hoặc bản offline giả lập để test) và mọi lượt
+  nghe đều hủy được bằng cancel().
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import speech_recognition as sr
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # int16
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def frame_rms(frame):
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+# =========================
+# Nguồn âm thanh
+# =========================
+class MicrophoneSource:
+    """Stream PyAudio giữ mở suốt vòng đời ứng dụng (qua sr.Microphone)."""
+    def __init__(self, device_index=None):
+        self._mic = sr.Microphone(device_index=device_index, sample_rate=SAMPLE_RATE, chunk_size=FRAME_SAMPLES)
+        self._stream = None
+
+    def open(self):
+        self._stream = self._mic.__enter__().stream
+
+    def read_frame(self):
+        return self._stream.read(FRAME_SAMPLES)
+
+    def close(self):
+        if self._stream is not None:
+            self._mic.__exit__(None, None, None)
+            self._stream = None
+
+
+# =========================
+# VAD
+# =========================
+class NoiseFloor:
+    """
+    Phân vị thấp (mặc định 10%) của RMS trong `window_ms` gần nhất. Không phụ thuộc kết quả VAD:
+    tiếng nói có khoảng lặng giữa các từ nên ít kéo ngưỡng lên, còn nhiễu nền liên tục (sảnh đông
+    người) nâng ngưỡng lên sau vài giây thay vì bị coi là tiếng nói mãi.
+    """
+    def __init__(self, window_ms=5000, quantile=0.1, initial=300.0, minimum=50.0):
+        self.quantile = quantile
+        self.value = initial
+        self.minimum = minimum
+        self._recent = deque(maxlen=max(1, window_ms // FRAME_MS))
+
+    def update(self, rms):
+        self._recent.append(rms)
+        if len(self._recent) < self._recent.maxlen // 4:
+            return  # Chưa đủ mẫu: giữ giá trị ban đầu
+        self.value = max(self.minimum, float(np.quantile(self._recent, self.quantile)))
+
+
+class EnergyVAD:
+    def __init__(self, ratio=3.0, min_rms=200.0, aggressiveness=2):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self._webrtc = webrtcvad.Vad(aggressiveness) if webrtcvad else None
+
+    def is_speech(self, frame, rms, floor):
+        if rms < max(self.min_rms, floor * self.ratio):
+            return False
+        if self._webrtc is not None:
+            try:
+                return self._webrtc.is_speech(frame, SAMPLE_RATE)
+            except Exception:
+                pass
+        return True
+
+
+# =========================
+# Bộ nhận dạng
+# =========================
+class GoogleRecognizer:
+    def __init__(self, language="vi-VN"):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+class FixedTextRecognizer:
+    """Bản giả lập offline: luôn trả về cùng một câu (dùng cho test / demo không có mạng)."""
+    def __init__(self, text="Lãi suất tiết kiệm 12 tháng là bao nhiêu"):
+        self.text = text
+
+    def recognize(self, audio):
+        return self.text
+
+
+# =========================
+# Capture engine
+# =========================
+class _Turn:
+    """Một lượt nghe: gom frame từ lúc có tiếng nói tới khi im lặng đủ lâu."""
+    def __init__(self, start_timeout, end_silence_ms, max_ms, min_speech_frames):
+        self.start_deadline = time.monotonic() + start_timeout
+        self.end_silence_ms = end_silence_ms
+        self.max_ms = max_ms
+        self.min_speech_frames = min_speech_frames
+        self.frames = []
+        self.started = False
+        self.speech_run = 0
+        self.silence_ms = 0
+        self.cancelled = False
+        self.timed_out = False
+        self.recognizing = False  # Đã thu xong, đang chờ bộ nhận dạng
+        self.wake = threading.Event()  # set khi: có kết quả thu âm / nhận dạng xong / bị hủy
+
+    def feed(self, frame, speech, preroll):
+        if not self.started:
+            self.speech_run = self.speech_run + 1 if speech else 0
+            if self.speech_run >= self.min_speech_frames:
+                self.started = True
+                self.frames = list(preroll) + [frame]
+            elif time.monotonic() > self.start_deadline:
+                self.timed_out = True
+                self.wake.set()
+            return
+        self.frames.append(frame)
+        self.silence_ms = 0 if speech else self.silence_ms + FRAME_MS
+        if self.silence_ms >= self.end_silence_ms or len(self.frames) * FRAME_MS >= self.max_ms:
+            self.wake.set()
+
+
+class VoiceCapture:
+    def __init__(self, recognizer=None, source=None, vad=None, start_timeout=5.0,
+                 end_silence_ms=600, max_utterance_ms=10000, preroll_ms=300, min_speech_ms=90):
+        self.recognizer = recognizer or GoogleRecognizer()
+        self.source = source or MicrophoneSource()
+        self.vad = vad or EnergyVAD()
+        self.noise = NoiseFloor()
+        self.start_timeout = start_timeout
+        self.end_silence_ms = end_silence_ms
+        self.max_utterance_ms = max_utterance_ms
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self._preroll = deque(maxlen=max(1, preroll_ms // FRAME_MS))
+        self._turn = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    # --- Luồng đọc mic ---
+    def start(self):
+        if self._running:
+            return
+        self.source.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                frame = self.source.read_frame()
+            except Exception as e:
+                print(f"Mic read error: {e}")
+                time.sleep(0.1)
+                continue
+            rms = frame_rms(frame)
+            turn = self._turn
+            speech = self.vad.is_speech(frame, rms, self.noise.value)
+            if turn is not None and not turn.recognizing and not turn.wake.is_set():
+                turn.feed(frame, speech, self._preroll)
+            if turn is None or not turn.started:
+                self.noise.update(rms)
+            self._preroll.append(frame)
+
+    def close(self):
+        self._running = False
+        self.cancel()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self.source.close()
+
+    # --- API ---
+    def cancel(self):
+        """Hủy lượt nghe hiện tại (kể cả khi đang chờ nhận dạng)."""
+        turn = self._turn
+        if turn is not None:
+            turn.cancelled = True
+            turn.wake.set()
+
+    def _begin(self):
+        self.start()
+        turn = _Turn(self.start_timeout, self.end_silence_ms, self.max_utterance_ms, self.min_speech_frames)
+        with self._lock:
+            self._turn = turn
+        return turn
+
+    def _end(self, turn):
+        with self._lock:
+            if self._turn is turn:
+                self._turn = None
+
+    def _capture(self, turn, status_callback):
+        if status_callback:
+            status_callback("Đang nghe...")
+        turn.wake.wait(self.start_timeout + self.max_utterance_ms / 1000.0 + 1.0)
+        if turn.cancelled or turn.timed_out or not turn.frames:
+            return None
+        return sr.AudioData(b"".join(turn.frames), SAMPLE_RATE, SAMPLE_WIDTH)
+
+    def capture(self, status_callback=None):
+        """Chờ một câu nói; trả về sr.AudioData, hoặc None nếu hết giờ / bị hủy."""
+        turn = self._begin()
+        try:
+            return self._capture(turn, status_callback)
+        finally:
+            self._end(turn)
+
+    def listen(self, status_callback=None):
+        """Thu một câu rồi nhận dạng ngay khi phát hiện im lặng. None nếu không nghe rõ / bị hủy."""
+        turn = self._begin()
+        try:
+            audio = self._capture(turn, status_callback)
+            if audio is None:
+                return None
+            if status_callback:
+                status_callback("Đang xử lý...")
+
+            # Nhận dạng trong luồng riêng để cancel() trả quyền điều khiển ngay lập tức
+            result = {}
+
+            def run():
+                try:
+                    result["text"] = self.recognizer.recognize(audio)
+                except Exception as e:
+                    print(f"STT Error: {e}")
+                finally:
+                    turn.wake.set()
+
+            turn.recognizing = True
+            turn.wake.clear()
+            threading.Thread(target=run, daemon=True).start()
+            if not turn.cancelled:
+                turn.wake.wait()
+            return None if turn.cancelled else result.get("text")
+        finally:
+            self._end(turn)
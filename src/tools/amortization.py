@@ -0,0 +1,274 @@
+# src/tools/amortization.py
+"""
+Bộ máy tính lịch trả nợ (amortization) dùng NumPy.
+
+- Hỗ trợ lãi suất ưu đãi cố định N tháng đầu, sau đó thả nổi.
+- Hai phương thức: dư nợ giảm dần trả đều (annuity) và trả gốc đều (equal_principal).
+- Tính hàng nghìn kịch bản (lãi suất × kỳ hạn) trong một lần gọi: vòng lặp theo
+  tháng, mỗi bước là phép toán vector trên toàn bộ kịch bản.
+"""
+from __future__ import annotations
+import io
+import csv
+import re
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Union, Dict, Any, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ANNUITY = "annuity"
+EQUAL_PRINCIPAL = "equal_principal"
+METHODS = (ANNUITY, EQUAL_PRINCIPAL)
+
+SCHEDULE_COLUMNS = ("month", "payment", "principal", "interest", "balance")
+
+_PROMO_PAT = re.compile(r"ưu đãi\s*(\d+)\s*tháng đầu\D*?([\d.]+)\s*%", re.I)
+_AFTER_PROMO_PAT = re.compile(r"sau ưu đãi\D*?([\d.]+)\s*%?(?:\s*-\s*([\d.]+)\s*%)?", re.I)
+
+
+@dataclass(frozen=True)
+class RatePlan:
+    """Kế hoạch lãi suất: `promo_rate` (%/năm) trong `promo_months` tháng đầu, sau đó `float_rate`."""
+    promo_rate: float
+    promo_months: int = 0
+    float_rate: Optional[float] = None
+
+    @classmethod
+    def fixed(cls, rate: float) -> "RatePlan":
+        return cls(promo_rate=float(rate))
+
+    @property
+    def after_promo_rate(self) -> float:
+        return self.promo_rate if self.float_rate is None else self.float_rate
+
+    @property
+    def is_floating(self) -> bool:
+        return self.promo_months > 0 and self.after_promo_rate != self.promo_rate
+
+
+def plan_from_loan_info(loan_info: Dict[str, Any], fallback_rate: float = 12.0) -> RatePlan:
+    """
+    Dựng RatePlan từ một gói trong loan_rates.json.
+    Ví dụ details: "Lãi suất ưu đãi 3 tháng đầu: 7.9%. Lãi suất sau ưu đãi: 8.5% - 10.5%"
+    -> RatePlan(7.9, 3, 9.5) (lấy trung bình khoảng thả nổi).
+    """
+    base_rate = loan_info.get("interest_rate") or fallback_rate
+    details = loan_info.get("details") or ""
+
+    promo = _PROMO_PAT.search(details)
+    after = _AFTER_PROMO_PAT.search(details)
+    if not promo or not after:
+        return RatePlan.fixed(base_rate)
+
+    lo = float(after.group(1))
+    hi = float(after.group(2)) if after.group(2) else lo
+    return RatePlan(
+        promo_rate=float(promo.group(2)),
+        promo_months=int(promo.group(1)),
+        float_rate=round((lo + hi) / 2, 4),
+    )
+
+
+def _annuity_payment(balance: np.ndarray, r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """EMI: B * r / (1 - (1+r)^-n), vector hóa; r == 0 -> B / n."""
+    n = np.maximum(n, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pay = balance * r / (1.0 - np.power(1.0 + r, -n))
+    return np.where(r > 0, pay, balance / n)
+
+
+def simulate(principal, promo_rate, promo_months, float_rate, term_months,
+             method: str = ANNUITY, keep_schedule: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Mô phỏng S kịch bản song song. Mọi tham số là mảng (hoặc scalar) broadcast về shape (S,).
+    Lãi suất tính theo %/năm. Trả về tổng hợp (và ma trận (S, N) nếu keep_schedule).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Phương thức không hợp lệ: {method} (chọn {METHODS})")
+
+    principal, promo_rate, promo_months, float_rate, term_months = np.broadcast_arrays(
+        np.asarray(principal, dtype=float),
+        np.asarray(promo_rate, dtype=float),
+        np.asarray(promo_months, dtype=np.int64),
+        np.asarray(float_rate, dtype=float),
+        np.asarray(term_months, dtype=np.int64),
+    )
+    principal = principal.ravel()
+    term_months = np.maximum(term_months.ravel(), 1)
+    promo_months = promo_months.ravel()
+    r_promo = promo_rate.ravel() / 1200.0
+    r_float = float_rate.ravel() / 1200.0
+
+    S = principal.shape[0]
+    N = int(term_months.max()) if S else 0
+
+    balance = principal.copy()
+    payment = np.zeros(S)
+    equal_part = principal / term_months
+
+    first_payment = np.zeros(S)
+    post_promo_payment = np.zeros(S)
+    max_payment = np.zeros(S)
+    total_interest = np.zeros(S)
+
+    if keep_schedule:
+        rows = {c: np.zeros((S, N)) for c in ("payment", "principal", "interest", "balance")}
+
+    for k in range(N):
+        active = k < term_months
+        r = np.where(k < promo_months, r_promo, r_float)
+        interest = balance * r
+
+        if method == ANNUITY:
+            # Tính lại khoản trả đều ở tháng đầu và khi hết ưu đãi (đổi lãi suất)
+            reset = (k == 0) | (k == promo_months)
+            payment = np.where(reset, _annuity_payment(balance, r, term_months - k), payment)
+            princ = payment - interest
+        else:
+            princ = equal_part
+
+        # Tháng cuối: tất toán phần dư do sai số làm tròn
+        princ = np.where(k == term_months - 1, balance, np.minimum(princ, balance))
+        princ = np.where(active, princ, 0.0)
+        interest = np.where(active, interest, 0.0)
+        pay = princ + interest
+        balance = balance - princ
+
+        total_interest += interest
+        np.maximum(max_payment, pay, out=max_payment)
+        if k == 0:
+            first_payment = pay.copy()
+        post_promo_payment = np.where(k == np.minimum(promo_months, term_months - 1), pay, post_promo_payment)
+
+        if keep_schedule:
+            rows["payment"][:, k] = pay
+            rows["principal"][:, k] = princ
+            rows["interest"][:, k] = interest
+            rows["balance"][:, k] = balance
+
+    out = {
+        "first_payment": first_payment,
+        "post_promo_payment": post_promo_payment,
+        "max_payment": max_payment,
+        "total_interest": total_interest,
+        "total_paid": principal + total_interest,
+    }
+    if keep_schedule:
+        out.update(rows)
+    return out
+
+
+@dataclass(frozen=True)
+class AmortizationSchedule:
+    """Lịch trả nợ của một khoản vay. Các mảng là read-only (được dùng chung qua cache)."""
+    principal: float
+    plan: RatePlan
+    term_months: int
+    method: str
+    payment: np.ndarray
+    principal_paid: np.ndarray
+    interest: np.ndarray
+    balance: np.ndarray
+
+    @property
+    def first_payment(self) -> float:
+        return float(self.payment[0])
+
+    @property
+    def post_promo_payment(self) -> float:
+        idx = min(self.plan.promo_months, self.term_months - 1)
+        return float(self.payment[idx])
+
+    @property
+    def total_interest(self) -> float:
+        return float(self.interest.sum())
+
+    @property
+    def total_paid(self) -> float:
+        return float(self.payment.sum())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "principal": self.principal,
+            "term_months": self.term_months,
+            "method": self.method,
+            "promo_rate": self.plan.promo_rate,
+            "promo_months": self.plan.promo_months,
+            "float_rate": self.plan.after_promo_rate,
+            "first_payment": round(self.first_payment),
+            "post_promo_payment": round(self.post_promo_payment),
+            "total_interest": round(self.total_interest),
+            "total_paid": round(self.total_paid),
+        }
+
+    def to_rows(self) -> List[List[int]]:
+        """Dạng gọn: mỗi dòng [tháng, trả, gốc, lãi, dư nợ] làm tròn tới đồng."""
+        cols = np.rint(np.stack([self.payment, self.principal_paid, self.interest, self.balance], axis=1))
+        months = np.arange(1, self.term_months + 1)
+        return np.column_stack([months, cols]).astype(np.int64).tolist()
+
+    def to_csv(self) -> str:
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(SCHEDULE_COLUMNS)
+        writer.writerows(self.to_rows())
+        return buf.getvalue()
+
+
+@lru_cache(maxsize=512)
+def _cached_schedule(principal: float, plan: RatePlan, term_months: int, method: str) -> AmortizationSchedule:
+    res = simulate(principal, plan.promo_rate, plan.promo_months, plan.after_promo_rate,
+                   term_months, method=method, keep_schedule=True)
+    arrays = {}
+    for name in ("payment", "principal", "interest", "balance"):
+        arr = res[name][0]
+        arr.setflags(write=False)
+        arrays[name] = arr
+    return AmortizationSchedule(
+        principal=principal,
+        plan=plan,
+        term_months=term_months,
+        method=method,
+        payment=arrays["payment"],
+        principal_paid=arrays["principal"],
+        interest=arrays["interest"],
+        balance=arrays["balance"],
+    )
+
+
+class AmortizationEngine:
+    def schedule(self, principal: float, plan: Union[RatePlan, float], term_months: int,
+                 method: str = ANNUITY) -> AmortizationSchedule:
+        """Lịch trả nợ đầy đủ theo tháng, memoize theo (gốc, kế hoạch lãi suất, kỳ hạn, phương thức)."""
+        if not isinstance(plan, RatePlan):
+            plan = RatePlan.fixed(plan)
+        if principal <= 0 or term_months <= 0:
+            raise ValueError("Số tiền vay và kỳ hạn phải lớn hơn 0")
+        return _cached_schedule(float(principal), plan, int(term_months), method)
+
+    def grid(self, principal: float, plans: Sequence[Union[RatePlan, float]], terms_months: Sequence[int],
+             method: str = ANNUITY) -> Dict[str, np.ndarray]:
+        """
+        Tính toàn bộ lưới kịch bản (kế hoạch lãi suất × kỳ hạn) trong một lần gọi.
+        Trả về các ma trận shape (len(plans), len(terms_months)).
+        """
+        plans = [p if isinstance(p, RatePlan) else RatePlan.fixed(p) for p in plans]
+        terms = np.asarray(terms_months, dtype=np.int64)
+        promo_rate = np.array([p.promo_rate for p in plans])[:, None]
+        promo_months = np.array([p.promo_months for p in plans])[:, None]
+        float_rate = np.array([p.after_promo_rate for p in plans])[:, None]
+
+        shape = (len(plans), len(terms))
+        res = simulate(principal, promo_rate, promo_months, float_rate, terms[None, :], method=method)
+        return {k: v.reshape(shape) for k, v in res.items()}
+
+    def cache_info(self):
+        return _cached_schedule.cache_info()
+
+
+# Instance dùng chung
+amortization_engine = AmortizationEngine()
@@ -0,0 +1,153 @@
+# src/tools/goal_planner.py
+"""
+Lập kế hoạch mục tiêu tiết kiệm ("muốn có 1 tỷ sau 3 năm thì gửi bao nhiêu mỗi tháng").
+
+Mỗi phương án = (sản phẩm, kỳ hạn, kênh) trong savings_rates.json. Tiền gửi được giả định
+tự động tái tục theo kỳ hạn, quy đổi ra hệ số tăng trưởng tháng:
+    g = (1 + r * t / 12) ^ (1 / t)
+Gửi đều D đầu mỗi tháng trong n tháng:
+    FV = D * g * (g^n - 1) / (g - 1)
+Mọi phương án được tính cùng lúc bằng NumPy, không gọi LLM.
+"""
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from src.tools.savings_projection import channel_rate
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("online", "counter")
+
+# Lưới lãi suất (%/năm) dùng cho bài toán tìm lãi suất tối thiểu
+_RATE_GRID = np.round(np.arange(0.01, 30.0, 0.01), 2)
+
+
+@dataclass(frozen=True)
+class GoalOption:
+    product: str
+    term_months: int
+    channel: str
+    rate: float
+    monthly_deposit: Optional[float] = None
+    months_needed: Optional[int] = None
+    lump_sum: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.product} - kỳ hạn {self.term_months} tháng ({self.channel})"
+
+
+def _annuity_factor(g: np.ndarray, n) -> np.ndarray:
+    """Hệ số g*(g^n - 1)/(g - 1) (gửi đầu kỳ), g == 1 -> n."""
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = g * (np.power(g, n) - 1.0) / (g - 1.0)
+    return np.where(np.isclose(g, 1.0), n, f)
+
+
+class GoalPlanner:
+    def __init__(self, savings_rates: Dict[str, Any]):
+        self.load(savings_rates)
+
+    def load(self, savings_rates: Dict[str, Any]) -> None:
+        """Trải phẳng savings_rates.json thành các mảng song song (mỗi phần tử = 1 phương án)."""
+        products, terms, channels, rates, mins = [], [], [], [], []
+        for product, pdata in (savings_rates or {}).items():
+            for term, info in (pdata.get("terms") or {}).items():
+                for ch in CHANNELS:
+                    # Cùng quy tắc với SavingsProjector: thiếu lãi suất kênh này -> dùng kênh còn lại
+                    rate = channel_rate(info, ch)
+                    if rate is None:
+                        continue
+                    min_key = "min_amount_online" if ch == "online" else "min_amount"
+                    products.append(product)
+                    terms.append(int(term))
+                    channels.append(ch)
+                    rates.append(float(rate))
+                    mins.append(float(info.get(min_key) or info.get("min_amount") or 0))
+
+        self.products = np.array(products, dtype=object)
+        self.terms = np.array(terms, dtype=np.int64)
+        self.channels = np.array(channels, dtype=object)
+        self.rates = np.array(rates, dtype=float)
+        self.min_amounts = np.array(mins, dtype=float)
+        # Hệ số tăng trưởng tháng tương đương khi tái tục liên tục
+        self.growth = np.power(1.0 + self.rates / 100.0 * self.terms / 12.0, 1.0 / np.maximum(self.terms, 1))
+        logger.info(f"GoalPlanner: {len(self.rates)} phương án (sản phẩm × kỳ hạn × kênh)")
+
+    def _mask(self, horizon_months: Optional[int], channel: Optional[str]) -> np.ndarray:
+        mask = np.ones(len(self.rates), dtype=bool)
+        if horizon_months:
+            mask &= self.terms <= horizon_months
+        if channel in CHANNELS:
+            mask &= self.channels == channel
+        return mask
+
+    def _option(self, i: int, **kw) -> GoalOption:
+        return GoalOption(
+            product=self.products[i],
+            term_months=int(self.terms[i]),
+            channel=self.channels[i],
+            rate=float(self.rates[i]),
+            **kw,
+        )
+
+    def solve_deposit(self, target: float, horizon_months: int, channel: Optional[str] = None,
+                      top_n: int = 3) -> List[GoalOption]:
+        """Số tiền gửi mỗi tháng (và gửi một lần) để đạt `target` sau `horizon_months`."""
+        if target <= 0 or horizon_months <= 0 or not len(self.rates):
+            return []
+        mask = self._mask(horizon_months, channel)
+        deposit = target / _annuity_factor(self.growth, horizon_months)
+        lump = target / np.power(self.growth, horizon_months)
+        mask &= deposit >= self.min_amounts
+
+        order = [i for i in np.argsort(deposit, kind="stable") if mask[i]]
+        return [self._option(i, monthly_deposit=float(deposit[i]), lump_sum=float(lump[i]))
+                for i in order[:top_n]]
+
+    def solve_term(self, target: float, monthly_deposit: float, channel: Optional[str] = None,
+                   top_n: int = 3) -> List[GoalOption]:
+        """Số tháng cần gửi đều `monthly_deposit` để đạt `target`."""
+        if target <= 0 or monthly_deposit <= 0 or not len(self.rates):
+            return []
+        g = self.growth
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.log1p(target * (g - 1.0) / (monthly_deposit * g)) / np.log(g)
+        n = np.where(np.isclose(g, 1.0), target / monthly_deposit, n)
+        months = np.ceil(np.round(n, 6))
+        # Kỳ hạn sản phẩm không được dài hơn tổng thời gian gửi
+        months = np.maximum(months, self.terms)
+        mask = self._mask(None, channel) & (monthly_deposit >= self.min_amounts) & np.isfinite(months)
+
+        order = [i for i in np.lexsort((-self.rates, months)) if mask[i]]
+        return [self._option(i, months_needed=int(months[i]), monthly_deposit=monthly_deposit)
+                for i in order[:top_n]]
+
+    def required_rate(self, target: float, monthly_deposit: float, horizon_months: int,
+                      term_months: int = 12) -> Optional[float]:
+        """
+        Lãi suất (%/năm) tối thiểu cần có: tìm vector hóa trên lưới lãi suất, kỳ hạn tái tục `term_months`.
+        None nếu không lãi suất nào trong lưới đạt được.
+        """
+        if target <= 0 or monthly_deposit <= 0 or horizon_months <= 0:
+            return None
+        t = max(1, min(term_months, horizon_months))
+        g = np.power(1.0 + _RATE_GRID / 100.0 * t / 12.0, 1.0 / t)
+        fv = monthly_deposit * _annuity_factor(g, horizon_months)
+        ok = np.flatnonzero(fv >= target)
+        return float(_RATE_GRID[ok[0]]) if len(ok) else None
+
+    def options_meeting_rate(self, rate: float, horizon_months: int, channel: Optional[str] = None,
+                             top_n: int = 3) -> List[GoalOption]:
+        mask = self._mask(horizon_months, channel) & (self.rates >= rate)
+        order = [i for i in np.argsort(-self.rates, kind="stable") if mask[i]]
+        return [self._option(i) for i in order[:top_n]]
+
+    def future_value(self, monthly_deposit: float, horizon_months: int) -> np.ndarray:
+        """Giá trị cuối kỳ của mọi phương án (tiện cho so sánh/benchmark)."""
+        return monthly_deposit * _annuity_factor(self.growth, horizon_months)
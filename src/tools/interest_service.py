@@ -1,8 +1,10 @@
 # src/tools/interest_service.py
 from __future__ import annotations
+import asyncio
 import json
 import re
 import logging
+import threading
 import unicodedata
 from math import isclose
 from pathlib import Path
@@ -24,6 +26,14 @@ except ImportError:
         annual_rate_percent: Optional[float] = None
         channel: Optional[str] = "online"
         amount: Optional[float] = None
+        monthly_deposit: Optional[float] = None
+
+from src.tools.amortization import amortization_engine, plan_from_loan_info, RatePlan, EQUAL_PRINCIPAL
+from src.tools.goal_planner import GoalPlanner
+from src.tools.savings_projection import SavingsProjector
+from src.tools.templates import AnswerTemplate, SEPARATOR
+from src.core.cache import answer_memo
+from src.core.utils import stable_hash
 
 logger = logging.getLogger(__name__)
 
@@ -35,14 +45,98 @@ except Exception:
     # Fallback đường dẫn tương đối nếu không load được config
     DATA_DIR_PATH = Path(__file__).resolve().parent.parent.parent / "data"
 
+# --- TEMPLATE CÂU TRẢ LỜI (biên dịch một lần khi import) ---
+LOAN_PACKAGE_TPL = AnswerTemplate(header=[
+    "🏦 **GÓI {name_upper}**\n",
+    "📉 Lãi suất ưu đãi: từ **{rate}%/năm**\n",
+    "⏳ Thời hạn vay tối đa: {max_term} năm\n",
+    "📝 *{details}*\n\n",
+    "💡 *Ví dụ: Bạn muốn vay 500 triệu trong 5 năm? Hãy nhập số tiền để mình tính thử nhé!*",
+])
+
+LOAN_LIST_TPL = AnswerTemplate(
+    header=["🏦 **LÃI SUẤT CÁC GÓI VAY TIÊU BIỂU:**\n"],
+    row="🔹 **{name}**: {rate}%/năm\n",
+    footer=["\n💬 *Bạn dự định vay bao nhiêu tiền?*"],
+)
+
+LOAN_QUOTE_TPL = AnswerTemplate(header=[
+    "📋 **BẢNG TÍNH TRẢ GÓP (ƯỚC TÍNH)**\n",
+    SEPARATOR,
+    "📦 Gói vay: **{loan_name}**\n",
+    "💰 Số tiền: {principal:,.0f} VNĐ\n",
+    "⏳ Thời hạn: {term_years} năm ({term_months} tháng)\n",
+    "📉 Lãi suất áp dụng: {rate}%/năm\n",
+    SEPARATOR,
+    "💸 **TRẢ HÀNG THÁNG:** {monthly_pay:,.0f} VNĐ\n",
+    "*(Gồm gốc + lãi tính theo dư nợ giảm dần)*\n",
+    "{float_line}",
+    "❗️ Tổng lãi dự kiến: {total_interest:,.0f} VNĐ\n",
+    "📐 Nếu trả gốc đều: tháng đầu {eq_first:,.0f} VNĐ, tổng lãi {eq_interest:,.0f} VNĐ\n",
+    "{disclaimer}",
+])
+
+SAVINGS_QUOTE_TPL = AnswerTemplate(
+    header=[
+        "🐖 **DỰ TÍNH TIẾT KIỆM**\n",
+        "💵 Gửi: {principal:,.0f} VNĐ\n",
+        "📅 Kỳ hạn: {months} tháng\n",
+        "{rate_line}",
+        SEPARATOR,
+        "💰 **TIỀN LÃI:** +{interest:,.0f} VNĐ\n",
+        "💎 **TỔNG VỀ:** {total:,.0f} VNĐ",
+        "{compare_title}",
+    ],
+    row="   • {label}: +{alt_interest:,.0f} VNĐ\n",
+)
+
+SAVINGS_TABLE_TPL = AnswerTemplate(
+    header=["📊 **BẢNG LÃI SUẤT TIẾT KIỆM ({channel_upper})**\n", SEPARATOR],
+    row="{icon} Kỳ hạn **{term} tháng**: **{rate}%/năm**\n",
+    footer=["\n💬 *Bạn muốn tính thử lãi với số tiền cụ thể không?*"],
+)
+
 class InterestService:
     def __init__(self):
         self.data_dir = DATA_DIR_PATH
+        self.TERM_PAT = re.compile(r"(\d+)\s*(tháng|thang|thg|m|month|months|năm|nam|year|years)", re.I)
+        self.goal_planner: Optional[GoalPlanner] = None
+        self.projector: Optional[SavingsProjector] = None
+        # answer() chạy phần đồng bộ trong thread: khóa để nạp lại dữ liệu / cache không chạy chồng
+        self._lock = threading.Lock()
         logger.info(f"InterestService đang tải dữ liệu từ: {self.data_dir}")
         # Load dữ liệu ngay khi khởi tạo
+        self._load_data()
+
+    def _data_files(self) -> List[Path]:
+        return [self.data_dir / "savings_rates.json", self.data_dir / "loan_rates.json"]
+
+    def _data_mtime(self) -> Tuple[float, ...]:
+        return tuple(p.stat().st_mtime if p.exists() else 0.0 for p in self._data_files())
+
+    def _load_data(self) -> None:
+        self._mtime = self._data_mtime()
         self.savings_rates = self._load_json(self.data_dir / "savings_rates.json")
         self.loan_rates = self._load_json(self.data_dir / "loan_rates.json")
-        self.TERM_PAT = re.compile(r"(\d+)\s*(tháng|thang|thg|m|month|months|năm|nam|year|years)", re.I)
+        # Phiên bản dữ liệu: đổi khi nội dung JSON đổi -> câu trả lời đã memoize tự hết hiệu lực
+        self.data_version = stable_hash([self.savings_rates, self.loan_rates])
+        if self.goal_planner is None:
+            self.goal_planner = GoalPlanner(self.savings_rates)
+            self.projector = SavingsProjector(self.savings_rates)
+        else:
+            self.goal_planner.load(self.savings_rates)
+            self.projector.load(self.savings_rates)
+
+    def reload_if_changed(self) -> bool:
+        """Nạp lại JSON nếu file thay đổi (chỉ tốn 2 lệnh stat mỗi request)."""
+        try:
+            if self._data_mtime() == self._mtime:
+                return False
+        except OSError:
+            return False
+        logger.info("InterestService: dữ liệu lãi suất thay đổi, đang nạp lại...")
+        self._load_data()
+        return True
 
     def _load_json(self, path: Path) -> Dict[str, Any]:
         try:
@@ -69,19 +163,23 @@ class InterestService:
 
     # Trong class InterestService (file interest_service.py)
 
+    def resolve_savings_product(self, product: str) -> Optional[str]:
+        """Tên sản phẩm -> key trong savings_rates.json (so khớp chính xác hoặc bỏ dấu)."""
+        if product in self.savings_rates: return product
+        norm_product = self._normalize_text(product)
+        for key in self.savings_rates:
+            if self._normalize_text(key) == norm_product:
+                return key
+        return None
+
     def get_savings_rate(self, product: str, term_months: int, channel: str = "online") -> Tuple[Optional[float], int]:
         """
         Trả về: (Lãi suất tìm được, Kỳ hạn gốc được áp dụng)
         Ví dụ: Hỏi 15 tháng -> Trả về (Lãi suất 12 tháng, 12)
         """
         # 1. Tìm dữ liệu sản phẩm
-        product_data = self.savings_rates.get(product)
-        if not product_data:
-             norm_product = self._normalize_text(product)
-             for key, data in self.savings_rates.items():
-                 if self._normalize_text(key) == norm_product:
-                     product_data = data
-                     break
+        product_key = self.resolve_savings_product(product)
+        product_data = self.savings_rates.get(product_key) if product_key else None
         if not product_data: return (None, 0)
 
         # 2. Lấy danh sách các kỳ hạn có sẵn (dạng số nguyên)
@@ -147,7 +245,43 @@ class InterestService:
         monthly_payment = principal * (r * (1 + r) ** n) / ((1 + r) ** n - 1)
         return monthly_payment
 
+    def get_loan_rate_plan(self, loan_info: Dict[str, Any], user_rate: Optional[float] = None) -> RatePlan:
+        """Lãi suất user nhập -> cố định cả kỳ; nếu không, dùng kế hoạch ưu đãi/thả nổi của gói vay."""
+        if user_rate:
+            return RatePlan.fixed(user_rate)
+        if loan_info:
+            return plan_from_loan_info(loan_info)
+        return RatePlan.fixed(12.0)
+
+    def _query_signature(self, q: InterestQuery) -> str:
+        fields = q.model_dump() if hasattr(q, "model_dump") else q.dict()
+        return stable_hash(fields)
+
     async def answer(self, q: InterestQuery) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Tính toán là CPU đồng bộ -> chạy trong thread để không chặn event loop và để
+        timeout của ToolRegistry thực sự cắt được lệnh gọi chậm.
+        """
+        return await asyncio.to_thread(self.answer_sync, q)
+
+    def answer_sync(self, q: InterestQuery) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Câu trả lời chỉ phụ thuộc (câu hỏi, dữ liệu JSON) -> memoize theo
+        (chữ ký câu hỏi, phiên bản dữ liệu).
+        """
+        with self._lock:
+            self.reload_if_changed()
+            signature = self._query_signature(q)
+            cached = answer_memo.get("interest", signature, self.data_version)
+            if cached is not None:
+                return (cached, [])
+
+            text, sources = self._answer(q)
+            if text:
+                answer_memo.set("interest", signature, self.data_version, text)
+            return (text, sources)
+
+    def _answer(self, q: InterestQuery) -> Tuple[Optional[str], List[Dict]]:
         try:
             # ==================== 1. XỬ LÝ VAY (LOAN) ====================
             if q.query_type == "loan":
@@ -166,22 +300,22 @@ class InterestService:
                 # [Case 1] Chưa có số tiền -> Tư vấn gói
                 if not principal:
                     if loan_info:
-                        return (f"🏦 **GÓI {loan_name.upper()}**\n"
-                                f"📉 Lãi suất ưu đãi: từ **{base_rate}%/năm**\n"
-                                f"⏳ Thời hạn vay tối đa: {max_term} năm\n"
-                                f"📝 *{loan_info.get('details', '')}*\n\n"
-                                f"💡 *Ví dụ: Bạn muốn vay 500 triệu trong 5 năm? Hãy nhập số tiền để mình tính thử nhé!*", [])
+                        return (LOAN_PACKAGE_TPL.render(
+                            name_upper=loan_name.upper(),
+                            rate=base_rate,
+                            max_term=max_term,
+                            details=loan_info.get('details', ''),
+                        ), [])
                     
                     # Nếu không rõ gói nào, liệt kê tất cả
-                    msg = "🏦 **LÃI SUẤT CÁC GÓI VAY TIÊU BIỂU:**\n"
-                    for k, v in self.loan_rates.items():
-                        msg += f"🔹 **{v.get('product_name')}**: {v.get('interest_rate')}%/năm\n"
-                    msg += "\n💬 *Bạn dự định vay bao nhiêu tiền?*"
-                    return (msg, [])
+                    rows = [{"name": v.get('product_name'), "rate": v.get('interest_rate')}
+                            for v in self.loan_rates.values()]
+                    return (LOAN_LIST_TPL.render(rows), [])
 
                 # [Case 2] Có số tiền -> Tính toán lịch trả nợ
-                # Lãi suất: Ưu tiên user nhập -> Lãi gói vay -> Mặc định 12%
-                final_rate = q.annual_rate_percent or base_rate or 12.0
+                # Lãi suất: Ưu tiên user nhập -> Kế hoạch ưu đãi/thả nổi của gói vay -> Mặc định 12%
+                plan = self.get_loan_rate_plan(loan_info, q.annual_rate_percent)
+                final_rate = plan.promo_rate
                 
                 # Xử lý kỳ hạn
                 term_years = q.term_years
@@ -197,28 +331,33 @@ class InterestService:
                      return (f"⚠️ Gói **{loan_name}** chỉ hỗ trợ vay tối đa **{max_term} năm**.\n"
                              f"Bạn vui lòng chọn thời gian ngắn hơn nhé.", [])
 
-                # Tính toán
-                monthly_pay = self._calc_loan_payment(principal, final_rate, term_years)
-                total_payment = monthly_pay * term_years * 12
-                total_interest = total_payment - principal
+                # Tính toán lịch trả nợ đầy đủ (dư nợ giảm dần + trả gốc đều để so sánh)
+                term_months = max(1, int(round(term_years * 12)))
+                sched = amortization_engine.schedule(principal, plan, term_months)
+                sched_eq = amortization_engine.schedule(principal, plan, term_months, EQUAL_PRINCIPAL)
+                monthly_pay = sched.first_payment
+                total_interest = sched.total_interest
 
-                # [Quan trọng] Tạo Disclaimer về lãi suất thả nổi
+                # [Quan trọng] Lãi thả nổi sau ưu đãi: hiển thị khoản trả sau ưu đãi
+                float_line = ""
                 disclaimer = ""
-                if final_rate < 10: # Thường lãi <10% là lãi ưu đãi
-                    disclaimer = f"\n⚠️ *Lưu ý: Lãi suất {final_rate}% thường chỉ cố định trong 6-12 tháng đầu, sau đó sẽ thả nổi theo thị trường.*"
-
-                msg = (
-                    f"📋 **BẢNG TÍNH TRẢ GÓP (ƯỚC TÍNH)**\n"
-                    f"━━━━━━━━━━━━━━━━━━\n"
-                    f"📦 Gói vay: **{loan_name}**\n"
-                    f"💰 Số tiền: {principal:,.0f} VNĐ\n"
-                    f"⏳ Thời hạn: {term_years} năm ({int(term_years*12)} tháng)\n"
-                    f"📉 Lãi suất áp dụng: {final_rate}%/năm\n"
-                    f"━━━━━━━━━━━━━━━━━━\n"
-                    f"💸 **TRẢ HÀNG THÁNG:** {monthly_pay:,.0f} VNĐ\n"
-                    f"*(Gồm gốc + lãi tính theo dư nợ giảm dần)*\n"
-                    f"❗️ Tổng lãi dự kiến: {total_interest:,.0f} VNĐ\n"
-                    f"{disclaimer}"
+                if plan.is_floating and term_months > plan.promo_months:
+                    float_line = (f"🔁 Sau {plan.promo_months} tháng ưu đãi (~{plan.after_promo_rate}%/năm): "
+                                  f"{sched.post_promo_payment:,.0f} VNĐ/tháng\n")
+                    disclaimer = f"\n⚠️ *Lưu ý: Lãi suất sau ưu đãi thả nổi theo thị trường, số liệu chỉ mang tính ước tính.*"
+
+                msg = LOAN_QUOTE_TPL.render(
+                    loan_name=loan_name,
+                    principal=principal,
+                    term_years=term_years,
+                    term_months=term_months,
+                    rate=final_rate,
+                    monthly_pay=monthly_pay,
+                    float_line=float_line,
+                    total_interest=total_interest,
+                    eq_first=sched_eq.first_payment,
+                    eq_interest=sched_eq.total_interest,
+                    disclaimer=disclaimer,
                 )
                 return (msg, [])
 
@@ -239,28 +378,30 @@ class InterestService:
                 if principal and principal > 0:
                     calc_tm = tm if tm > 0 else 12 # Nếu khách không nói kỳ hạn, mặc định tính thử 12 tháng
                     
-                    rate, applied_term = self.get_savings_rate(product, calc_tm, channel)
+                    # Tìm chuỗi kỳ hạn tối ưu (có tái tục) cho đúng số tháng khách gửi
+                    product_key = self.resolve_savings_product(product) or next(iter(self.savings_rates), None)
+                    best = self.projector.optimal_ladder(principal, calc_tm, channel, product_key) if product_key else None
                     
-                    if rate is None: 
+                    if best is None or not best.steps: 
                          return (f"Hiện chưa có lãi suất chuẩn cho kỳ hạn **{calc_tm} tháng**. Bạn thử 6, 12 hoặc 24 tháng xem?", [])
                     
-                    # Tính toán
-                    years = calc_tm / 12.0
-                    interest = principal * (rate / 100) * years
-                    total = principal + interest
-                    
-                    note = ""
-                    if applied_term > 0 and applied_term != calc_tm:
-                        note = f"\n*(Áp dụng lãi suất của kỳ hạn {applied_term} tháng)*"
-
-                    return (
-                        f"🐖 **DỰ TÍNH TIẾT KIỆM**\n"
-                        f"💵 Gửi: {principal:,.0f} VNĐ\n"
-                        f"📅 Kỳ hạn: {calc_tm} tháng\n"
-                        f"📉 Lãi suất: {rate}%/năm ({channel}){note}\n"
-                        f"━━━━━━━━━━━━━━━━━━\n"
-                        f"💰 **TIỀN LÃI:** +{interest:,.0f} VNĐ\n"
-                        f"💎 **TỔNG VỀ:** {total:,.0f} VNĐ"
+                    if best.is_single_term:
+                        rate_line = f"📉 Lãi suất: {best.steps[0].rate}%/năm ({channel})\n"
+                    else:
+                        rate_line = f"🔁 Phương án tối ưu: {best.label}\n"
+
+                    # So sánh với các phương án tái tục một kỳ hạn khác (ví dụ 6 tháng ×2 vs 12 tháng)
+                    alts = [p for p in self.projector.compare(principal, calc_tm, channel, product_key)
+                            if p.label != best.label][:2]
+
+                    return SAVINGS_QUOTE_TPL.render(
+                        [{"label": p.label, "alt_interest": p.interest} for p in alts],
+                        principal=principal,
+                        months=calc_tm,
+                        rate_line=rate_line,
+                        interest=best.interest,
+                        total=best.total,
+                        compare_title="\n⚖️ So sánh:\n" if alts else "",
                     ), []
 
                 # CASE B: Không có số tiền -> Tra cứu thông tin
@@ -290,22 +431,16 @@ class InterestService:
                         # Sắp xếp kỳ hạn từ nhỏ đến lớn
                         sorted_terms = sorted(terms.items(), key=lambda x: int(x[0]))
                         
-                        msg = f"📊 **BẢNG LÃI SUẤT TIẾT KIỆM ({channel.upper()})**\n"
-                        msg += "━━━━━━━━━━━━━━━━━━\n"
-                        
-                        count = 0
-                        for t, r_obj in sorted_terms:
-                            r = r_obj.get(channel, 0)
-                            # Chỉ hiện một số kỳ hạn tiêu biểu để bảng không quá dài
-                            # Hoặc hiện hết nếu muốn
-                            icon = "🔹"
-                            if t in ["6", "12", "24", "36"]: icon = "⭐"
-                            
-                            msg += f"{icon} Kỳ hạn **{t} tháng**: **{r}%/năm**\n"
-                            count += 1
-                        
-                        msg += "\n💬 *Bạn muốn tính thử lãi với số tiền cụ thể không?*"
-                        return (msg, [])
+                        # Kỳ hạn tiêu biểu được đánh dấu ⭐
+                        rows = [{"icon": "⭐" if t in ("6", "12", "24", "36") else "🔹",
+                                 "term": t,
+                                 "rate": r_obj.get(channel, 0)}
+                                for t, r_obj in sorted_terms]
+                        return (SAVINGS_TABLE_TPL.render(rows, channel_upper=channel.upper()), [])
+
+            # --- 3. MỤC TIÊU TIẾT KIỆM (SAVINGS GOAL) ---
+            elif q.query_type == "savings_goal":
+                return (self._answer_savings_goal(q), [])
 
             return (None, [])
 
@@ -313,5 +448,74 @@ class InterestService:
             logger.error(f"Service Error: {e}")
             return (None, [])
 
+    def _answer_savings_goal(self, q: InterestQuery) -> str:
+        target = q.amount or q.principal
+        monthly = getattr(q, "monthly_deposit", None)
+        channel = (q.channel or "").lower() or None
+
+        months = 0
+        if q.term_text: months = self.parse_term_months(q.term_text)
+        elif q.term_years: months = int(round(q.term_years * 12))
+
+        if not target:
+            return "🎯 Bạn muốn tích lũy **bao nhiêu tiền** và trong **bao lâu**? (ví dụ: 1 tỷ sau 3 năm)"
+
+        # Đủ cả 3 dữ kiện -> Tìm lãi suất tối thiểu cần có
+        if months > 0 and monthly:
+            rate = self.goal_planner.required_rate(target, monthly, months)
+            if rate is None:
+                return (f"⚠️ Gửi {monthly:,.0f} VNĐ/tháng trong {months} tháng khó đạt **{target:,.0f} VNĐ** "
+                        f"với mọi mức lãi suất hiện có. Bạn thử tăng số tiền gửi hoặc kéo dài thời gian nhé.")
+            opts = self.goal_planner.options_meeting_rate(rate, months, channel)
+            lines = [
+                f"🎯 **KẾ HOẠCH TIẾT KIỆM**\n",
+                f"💵 Gửi {monthly:,.0f} VNĐ/tháng trong {months} tháng\n",
+                f"📈 Cần lãi suất tối thiểu: **{rate}%/năm** để đạt {target:,.0f} VNĐ\n",
+                f"━━━━━━━━━━━━━━━━━━\n",
+            ]
+            if opts:
+                lines += [f"✅ {o.label}: {o.rate}%/năm\n" for o in opts]
+            else:
+                lines.append("❌ Hiện chưa có sản phẩm nào đạt mức lãi suất này.\n")
+            return "".join(lines)
+
+        # Có thời gian -> Tính số tiền gửi mỗi tháng
+        if months > 0:
+            opts = self.goal_planner.solve_deposit(target, months, channel)
+            if not opts:
+                return f"Hiện chưa có phương án tiết kiệm phù hợp cho mục tiêu {target:,.0f} VNĐ sau {months} tháng."
+            best = opts[0]
+            lines = [
+                f"🎯 **KẾ HOẠCH TIẾT KIỆM**\n",
+                f"🏁 Mục tiêu: {target:,.0f} VNĐ sau {months} tháng\n",
+                f"━━━━━━━━━━━━━━━━━━\n",
+                f"💸 **GỬI MỖI THÁNG:** {best.monthly_deposit:,.0f} VNĐ\n",
+                f"🏦 Phương án tốt nhất: {best.label} - {best.rate}%/năm\n",
+                f"💰 Hoặc gửi một lần: {best.lump_sum:,.0f} VNĐ\n",
+            ]
+            if len(opts) > 1:
+                lines.append("\n🔹 Phương án khác:\n")
+                lines += [f"   • {o.label}: {o.monthly_deposit:,.0f} VNĐ/tháng\n" for o in opts[1:]]
+            lines.append("\n💡 *Ước tính với giả định tự động tái tục, lãi suất không đổi.*")
+            return "".join(lines)
+
+        # Có số tiền gửi hàng tháng -> Tính thời gian cần thiết
+        if monthly:
+            opts = self.goal_planner.solve_term(target, monthly, channel)
+            if not opts:
+                return f"Số tiền gửi {monthly:,.0f} VNĐ/tháng chưa đủ mức tối thiểu của các sản phẩm tiết kiệm."
+            best = opts[0]
+            lines = [
+                f"🎯 **KẾ HOẠCH TIẾT KIỆM**\n",
+                f"💵 Gửi {monthly:,.0f} VNĐ/tháng để có {target:,.0f} VNĐ\n",
+                f"━━━━━━━━━━━━━━━━━━\n",
+                f"⏳ **CẦN KHOẢNG:** {best.months_needed} tháng (~{best.months_needed / 12:.1f} năm)\n",
+                f"🏦 Phương án tốt nhất: {best.label} - {best.rate}%/năm\n",
+            ]
+            lines += [f"   • {o.label}: {o.months_needed} tháng\n" for o in opts[1:]]
+            return "".join(lines)
+
+        return f"⏳ Bạn muốn có **{target:,.0f} VNĐ** sau bao lâu (ví dụ: 3 năm), hoặc mỗi tháng gửi được bao nhiêu?"
+
 # Instance duy nhất để rag_engine import
 interest_service = InterestService()
\ No newline at end of file
@@ -1,9 +1,31 @@
 # src/tools/market_service.py
+import asyncio
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime
 import random
 
+from src.tools.templates import AnswerTemplate, SEPARATOR
+from src.core.cache import answer_memo
+from src.core.utils import stable_hash
+
+CURRENCY_ICONS = {"USD": "🇺🇸", "EUR": "🇪🇺", "JPY": "🇯🇵", "GBP": "🇬🇧", "AUD": "🇦🇺"}
+
+EXCHANGE_RATE_TPL = AnswerTemplate(
+    header=["💱 **TỶ GIÁ NGOẠI TỆ VIETCOMBANK** ({date})\n", SEPARATOR],
+    row="{icon} **{code}**: Mua {buy} - Bán {sell}\n",
+    footer=["\n💡 *Đơn vị: VND. Nguồn: Vietcombank.*"],
+)
+
+GOLD_PRICE_TPL = AnswerTemplate(
+    header=["🏆 **BẢNG GIÁ VÀNG SJC HÔM NAY**\n", "🕒 Cập nhật: {updated}\n", SEPARATOR],
+    row=("{icon} **{type}**\n"
+         "   🔻 Mua: {buy:,.0f} đ\n"
+         "   🔺 Bán: {sell:,.0f} đ\n"
+         "   ----------------\n"),  # Đường kẻ mờ giữa các loại
+    footer=["\n💡 *Giá đã bao gồm thuế phí ước tính.*"],
+)
+
 class MarketService:
     def __init__(self):
         # Nguồn tỷ giá chính thức của Vietcombank
@@ -72,26 +94,21 @@ class MarketService:
         
         # --- 1. TRA CỨU TỶ GIÁ ---
         if query_type == "exchange_rate":
-            rates = self.get_exchange_rates()
+            # requests là blocking -> chạy trong thread để không chặn event loop
+            rates = await asyncio.to_thread(self.get_exchange_rates)
             if not rates:
                 return ("Xin lỗi, hiện tại hệ thống Vietcombank đang bảo trì. Bạn vui lòng thử lại sau.", [])
             
             date_str = datetime.now().strftime("%d/%m/%Y")
-            msg = f"💱 **TỶ GIÁ NGOẠI TỆ VIETCOMBANK** ({date_str})\n"
-            msg += "━━━━━━━━━━━━━━━━━━\n"
-            
-            for r in rates:
-                # Chọn icon cờ
-                icon = "💵"
-                if r['code'] == "USD": icon = "🇺🇸"
-                elif r['code'] == "EUR": icon = "🇪🇺"
-                elif r['code'] == "JPY": icon = "🇯🇵"
-                elif r['code'] == "GBP": icon = "🇬🇧"
-                elif r['code'] == "AUD": icon = "🇦🇺"
-                
-                msg += f"{icon} **{r['code']}**: Mua {r['buy']} - Bán {r['sell']}\n"
-            
-            msg += "\n💡 *Đơn vị: VND. Nguồn: Vietcombank.*"
+            # Bảng tỷ giá không đổi -> dùng lại câu trả lời đã render
+            version = stable_hash([date_str, rates])
+            cached = answer_memo.get("market", query_type, version)
+            if cached is not None:
+                return (cached, [])
+
+            rows = [{**r, "icon": CURRENCY_ICONS.get(r['code'], "💵")} for r in rates]
+            msg = EXCHANGE_RATE_TPL.render(rows, date=date_str)
+            answer_memo.set("market", query_type, version, msg)
             return (msg, [])
 
         # --- 2. TRA CỨU GIÁ VÀNG (ĐÃ NÂNG CẤP) ---
@@ -100,25 +117,10 @@ class MarketService:
             
             updated_time = gold_list[0]['updated'] if gold_list else ""
             
-            msg = f"🏆 **BẢNG GIÁ VÀNG SJC HÔM NAY**\n"
-            msg += f"🕒 Cập nhật: {updated_time}\n"
-            msg += "━━━━━━━━━━━━━━━━━━\n"
-            
-            for item in gold_list:
-                # Format tiền tệ cho đẹp (ví dụ: 82,000,000)
-                buy_str = f"{item['buy']:,.0f}"
-                sell_str = f"{item['sell']:,.0f}"
-                
-                # Icon phân loại
-                icon = "💍" if "Nhẫn" in item['type'] or "Nữ trang" in item['type'] else "👑"
-                
-                msg += f"{icon} **{item['type']}**\n"
-                msg += f"   🔻 Mua: {buy_str} đ\n"
-                msg += f"   🔺 Bán: {sell_str} đ\n"
-                msg += "   ----------------\n" # Đường kẻ mờ giữa các loại
-            
-            msg += "\n💡 *Giá đã bao gồm thuế phí ước tính.*"
-            return (msg, [])
+            # Icon phân loại; giá vàng biến động mỗi lần hỏi nên không memoize
+            rows = [{**item, "icon": "💍" if "Nhẫn" in item['type'] or "Nữ trang" in item['type'] else "👑"}
+                    for item in gold_list]
+            return (GOLD_PRICE_TPL.render(rows, updated=updated_time), [])
 
         return (None, [])
 
@@ -0,0 +1,148 @@
+# src/tools/offline_bundle.py
+"""
+Gói câu trả lời ngoại tuyến (offline bundle) cho kiosk.
+
+Kiosk tải gói này định kỳ (GET /api/v1/bundle, có ETag) và dùng khi backend / LLM không trả lời
+kịp deadline. Mỗi mục gồm các cụm từ khóa (keywords), nhóm (domain), các từ loại trừ (exclude:
+câu hỏi chứa một trong các từ này thì không dùng mục, ví dụ câu hỏi về "vay" / "thẻ" không bao giờ
+nhận bảng lãi suất tiết kiệm) và câu trả lời đã render sẵn:
+
+- Bảng lãi suất tiết kiệm theo kênh + lãi suất từng kỳ hạn (từ savings_rates.json).
+- Danh sách gói vay + thông tin từng gói (từ loan_rates.json).
+- FAQ (data/faq.json) và mạng lưới chi nhánh (data/branches.json), nếu có.
+
+Câu trả lời được sinh bằng chính InterestService nên giống hệt câu trả lời online.
+Tỷ giá / giá vàng thay đổi liên tục nên không đưa vào gói.
+"""
+from __future__ import annotations
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.utils import stable_hash
+from src.tools.interest_service import interest_service, InterestQuery
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 2
+FAQ_FILE = "faq.json"            # [{"question": ..., "answer": ..., "keywords": [...], "exclude": [...]}]
+BRANCHES_FILE = "branches.json"  # [{"name": ..., "address": ..., "hours": ..., "phone": ...}]
+
+# Từ loại trừ theo nhóm (so khớp có dấu phía kiosk: "thẻ" không đụng "có thể" / "thế chấp")
+DOMAIN_EXCLUDE: Dict[str, List[str]] = {
+    "savings": ["vay", "thẻ", "tín dụng", "trả góp", "thế chấp", "tín chấp", "giải ngân"],
+    "loan": ["tiết kiệm", "thẻ", "tiền gửi"],
+}
+
+
+def _entry(entry_id: str, title: str, keywords: List[str], answer: Optional[str], domain: str,
+           exclude: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    if not answer:
+        return None
+    return {"id": entry_id, "title": title, "domain": domain, "keywords": keywords,
+            "exclude": exclude if exclude is not None else DOMAIN_EXCLUDE.get(domain, []), "answer": answer}
+
+
+class OfflineBundleBuilder:
+    def __init__(self, service=interest_service):
+        self.service = service
+        self._key: Optional[Tuple] = None
+        self._bundle: Optional[Dict[str, Any]] = None
+
+    # --- Nguồn dữ liệu ---
+    def _extra_files(self) -> List[Path]:
+        return [self.service.data_dir / FAQ_FILE, self.service.data_dir / BRANCHES_FILE]
+
+    def _load_list(self, path: Path) -> List[Dict[str, Any]]:
+        try:
+            if path.exists():
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+                return data if isinstance(data, list) else []
+        except Exception as e:
+            logger.error(f"Lỗi đọc file {path.name}: {e}")
+        return []
+
+    def _savings_entries(self) -> List[Dict[str, Any]]:
+        out = []
+        channels = sorted({ch for product in self.service.savings_rates.values()
+                           for rates in product.get("terms", {}).values()
+                           for ch in rates if not ch.startswith("min_")})
+        for channel in channels:
+            kw = ["lãi suất tiết kiệm", "bảng lãi suất", "lãi suất gửi tiết kiệm"]
+            if channel == "counter":
+                kw = [k + " tại quầy" for k in kw]
+            text, _ = self.service._answer(InterestQuery(query_type="savings", channel=channel))
+            out.append(_entry(f"savings_table_{channel}", f"Bảng lãi suất tiết kiệm ({channel})", kw, text,
+                              "savings"))
+
+        terms = sorted({int(t) for product in self.service.savings_rates.values() for t in product.get("terms", {})})
+        for term in terms:
+            text, _ = self.service._answer(InterestQuery(query_type="savings", term_text=f"{term} tháng"))
+            out.append(_entry(f"savings_rate_{term}", f"Lãi suất kỳ hạn {term} tháng",
+                              [f"lãi suất {term} tháng", f"lãi suất tiết kiệm {term} tháng",
+                               f"gửi {term} tháng", f"kỳ hạn {term} tháng"], text, "savings"))
+        return out
+
+    def _loan_entries(self) -> List[Dict[str, Any]]:
+        text, _ = self.service._answer(InterestQuery(query_type="loan"))
+        out = [_entry("loan_list", "Lãi suất các gói vay",
+                      ["lãi suất vay", "gói vay", "vay vốn", "các khoản vay"], text, "loan")]
+        for key, info in self.service.loan_rates.items():
+            name = info.get("product_name", key)
+            text, _ = self.service._answer(InterestQuery(query_type="loan", loan_type=name))
+            out.append(_entry(f"loan_{key}", name, [name, key.replace("_", " ")], text, "loan"))
+        return out
+
+    def _faq_entries(self, faq: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [_entry(f"faq_{i}", item.get("question", ""),
+                       list(item.get("keywords") or [item.get("question", "")]), item.get("answer"),
+                       "faq", list(item.get("exclude") or []))
+                for i, item in enumerate(faq)]
+
+    def _branch_entries(self, branches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not branches:
+            return []
+        lines = ["🏢 **MẠNG LƯỚI CHI NHÁNH / PHÒNG GIAO DỊCH:**\n"]
+        out = []
+        for i, b in enumerate(branches):
+            detail = f"📍 {b.get('address', '')}" + (f"\n🕘 {b['hours']}" if b.get("hours") else "") \
+                     + (f"\n📞 {b['phone']}" if b.get("phone") else "")
+            lines.append(f"🔹 **{b.get('name', '')}**: {b.get('address', '')}\n")
+            out.append(_entry(f"branch_{i}", b.get("name", ""), [b.get("name", "")],
+                              f"🏢 **{b.get('name', '')}**\n{detail}", "branch"))
+        out.insert(0, _entry("branches", "Mạng lưới chi nhánh",
+                             ["chi nhánh", "phòng giao dịch", "địa chỉ", "giờ làm việc"], "".join(lines), "branch"))
+        return out
+
+    # --- Build ---
+    def build(self) -> Dict[str, Any]:
+        self.service.reload_if_changed()
+        faq_path, branches_path = self._extra_files()
+        entries = (self._savings_entries() + self._loan_entries()
+                   + self._faq_entries(self._load_list(faq_path))
+                   + self._branch_entries(self._load_list(branches_path)))
+        entries = [e for e in entries if e]
+        return {
+            "format": BUNDLE_FORMAT,
+            "version": stable_hash(entries),
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "entries": entries,
+        }
+
+    def get(self) -> Dict[str, Any]:
+        """Gói hiện tại; chỉ build lại khi dữ liệu JSON / FAQ / chi nhánh thay đổi."""
+        self.service.reload_if_changed()
+        key = (self.service.data_version,
+               tuple(p.stat().st_mtime if p.exists() else 0.0 for p in self._extra_files()))
+        if self._bundle is None or key != self._key:
+            self._bundle = self.build()
+            self._key = key
+            logger.info(f"Offline bundle: {len(self._bundle['entries'])} mục (version {self._bundle['version']})")
+        return self._bundle
+
+
+# Instance dùng chung
+offline_bundle_builder = OfflineBundleBuilder()
@@ -0,0 +1,212 @@
+# src/tools/registry.py
+"""
+Registry các tool trả lời trực tiếp (không qua LLM).
+
+Mỗi tool khai báo các query_type nó xử lý, nhóm chi phí và timeout riêng.
+Handler là coroutine không được chặn event loop: phần đồng bộ (CPU, requests) phải chạy qua
+asyncio.to_thread, nếu không timeout của tool (và deadline chung) không cắt được lệnh gọi.
+RAGEngine tra bảng query_type -> tools (O(1)), chạy song song các tool đủ điều kiện
+dưới một deadline chung và lấy câu trả lời hợp lệ đầu tiên.
+Thêm tool mới (phí dịch vụ, tìm chi nhánh...) chỉ cần gọi `tool_registry.register(...)`.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.core.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Nhóm chi phí: tool rẻ được ưu tiên khi nhiều tool cùng xong trong một nhịp
+COST_CPU = "cpu"          # tính toán cục bộ (JSON, NumPy)
+COST_NETWORK = "network"  # gọi HTTP bên ngoài
+COST_CLASSES = (COST_CPU, COST_NETWORK)
+
+ToolAnswer = Tuple[Optional[str], List[Dict]]
+ToolHandler = Callable[[Any], Awaitable[ToolAnswer]]
+
+
+@dataclass(frozen=True)
+class Tool:
+    name: str
+    handler: ToolHandler
+    query_types: FrozenSet[str]
+    cost_class: str = COST_CPU
+    timeout: float = 1.0
+
+
+@dataclass(frozen=True)
+class ToolResult:
+    tool: str
+    answer: str
+    sources: List[Dict]
+    latency_ms: float
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    hits: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def percentile(self, q: float) -> Optional[float]:
+        return percentile(self.latencies_ms, q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.calls, 3) if self.calls else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+        }
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+        self._by_type: Dict[str, Tuple[Tool, ...]] = {}
+        self._stats: Dict[str, ToolStats] = {}
+
+    def register(self, tool: Tool) -> Tool:
+        if tool.cost_class not in COST_CLASSES:
+            raise ValueError(f"cost_class không hợp lệ: {tool.cost_class} (chọn {COST_CLASSES})")
+        self._tools[tool.name] = tool
+        self._stats.setdefault(tool.name, ToolStats())
+        for qt in tool.query_types:
+            tools = [t for t in self._by_type.get(qt, ()) if t.name != tool.name] + [tool]
+            self._by_type[qt] = tuple(sorted(tools, key=lambda t: COST_CLASSES.index(t.cost_class)))
+        logger.info(f"ToolRegistry: đăng ký '{tool.name}' cho {sorted(tool.query_types)}")
+        return tool
+
+    def tool(self, name: str, query_types: Iterable[str], cost_class: str = COST_CPU,
+             timeout: float = 1.0) -> Callable[[ToolHandler], ToolHandler]:
+        """Decorator: `@tool_registry.tool("fees", {"fee"})`."""
+        def deco(fn: ToolHandler) -> ToolHandler:
+            self.register(Tool(name, fn, frozenset(query_types), cost_class, timeout))
+            return fn
+        return deco
+
+    def handles(self, query_type: Optional[str]) -> bool:
+        return query_type in self._by_type
+
+    def tools_for(self, query_type: Optional[str]) -> Tuple[Tool, ...]:
+        return self._by_type.get(query_type, ())
+
+    async def _run(self, tool: Tool, query: Any) -> Optional[ToolResult]:
+        stats = self._stats[tool.name]
+        stats.calls += 1
+        t0 = time.perf_counter()
+        try:
+            answer, sources = await asyncio.wait_for(tool.handler(query), timeout=tool.timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            logger.warning(f"Tool '{tool.name}' quá thời gian ({tool.timeout}s)")
+            return None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"Tool '{tool.name}' lỗi: {e}")
+            return None
+        finally:
+            stats.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        if not answer:
+            return None
+        stats.hits += 1
+        return ToolResult(tool.name, answer, sources or [], stats.latencies_ms[-1])
+
+    async def dispatch(self, query_type: Optional[str], query: Any,
+                       deadline: Optional[float] = None) -> Optional[ToolResult]:
+        """
+        Chạy song song các tool xử lý `query_type`, trả về câu trả lời hợp lệ đầu tiên
+        (None nếu không tool nào trả lời được trước `deadline` giây).
+        """
+        tools = self._by_type.get(query_type)
+        if not tools or query is None:
+            return None
+
+        # Đường nhanh: chỉ một tool -> không cần tạo task
+        if len(tools) == 1:
+            try:
+                return await asyncio.wait_for(self._run(tools[0], query), timeout=deadline)
+            except asyncio.TimeoutError:
+                return None
+
+        order = {t.name: i for i, t in enumerate(tools)}
+        pending = {asyncio.create_task(self._run(t, query)) for t in tools}
+        end = None if deadline is None else time.monotonic() + deadline
+        try:
+            while pending:
+                remaining = None if end is None else max(0.0, end - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.warning(f"ToolRegistry: hết deadline {deadline}s cho '{query_type}'")
+                    return None
+                results = [r for r in (t.result() for t in done) if r]
+                if results:
+                    return min(results, key=lambda r: order[r.tool])
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {**self._stats[name].snapshot(),
+                   "cost_class": tool.cost_class,
+                   "timeout": tool.timeout,
+                   "query_types": sorted(tool.query_types)}
+            for name, tool in self._tools.items()
+        }
+
+
+def build_default_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+
+    try:
+        from src.tools.interest_service import interest_service
+        registry.register(Tool(
+            name="interest",
+            handler=interest_service.answer,
+            query_types=frozenset({"loan", "savings", "savings_goal"}),
+            cost_class=COST_CPU,
+            timeout=1.0,
+        ))
+    except ImportError as e:
+        logger.warning(f"Không tải được InterestService: {e}")
+
+    try:
+        from src.tools.market_service import market_service
+
+        async def _market_answer(q: Any) -> ToolAnswer:
+            return await market_service.answer(q.query_type)
+
+        registry.register(Tool(
+            name="market",
+            handler=_market_answer,
+            query_types=frozenset({"exchange_rate", "gold_price"}),
+            cost_class=COST_NETWORK,
+            timeout=6.0,
+        ))
+    except ImportError as e:
+        logger.warning(f"Không tải được MarketService: {e}")
+
+    return registry
+
+
+# Instance dùng chung
+tool_registry = build_default_registry()
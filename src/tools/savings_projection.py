@@ -0,0 +1,187 @@
+# src/tools/savings_projection.py
+"""
+Dự phóng tiết kiệm có tái tục (rollover) và tối ưu chuỗi kỳ hạn (term ladder).
+
+Quy hoạch động trên số tháng:
+    best[m] = max( best[m - t] * (1 + r_t * t / 12)   với mọi kỳ hạn t <= m đủ điều kiện,
+                   best[m - 1] * (1 + r_kkh / 12) )      (tháng lẻ gửi không kỳ hạn)
+Kỳ hạn chỉ đủ điều kiện khi số tiền >= min_amount (quầy) / min_amount_online (online).
+Kết quả DP không phụ thuộc số tiền ngoài các ngưỡng tối thiểu, nên được cache theo
+(nhóm số tiền, số tháng, kênh, sản phẩm).
+"""
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.core.cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+NON_TERM = 0  # Ký hiệu bước gửi không kỳ hạn trong chuỗi
+
+
+def channel_rate(info: Dict[str, Any], channel: str) -> Optional[float]:
+    """Lãi suất của kỳ hạn theo kênh; thiếu thì lấy lãi suất kênh còn lại (dùng chung với GoalPlanner)."""
+    return info.get(channel) or info.get("online" if channel == "counter" else "counter")
+
+
+@dataclass(frozen=True)
+class LadderStep:
+    term_months: int  # 0 = không kỳ hạn (tính theo tháng)
+    rate: float
+    count: int
+
+    @property
+    def label(self) -> str:
+        if self.term_months == NON_TERM:
+            return f"{self.count} tháng không kỳ hạn ({self.rate}%)"
+        suffix = f" ×{self.count}" if self.count > 1 else ""
+        return f"{self.term_months} tháng{suffix} ({self.rate}%)"
+
+
+@dataclass(frozen=True)
+class Projection:
+    product: str
+    channel: str
+    amount: float
+    horizon_months: int
+    factor: float
+    steps: Tuple[LadderStep, ...]
+
+    @property
+    def total(self) -> float:
+        return self.amount * self.factor
+
+    @property
+    def interest(self) -> float:
+        return self.total - self.amount
+
+    @property
+    def label(self) -> str:
+        return " + ".join(s.label for s in self.steps) if self.steps else "Không có phương án"
+
+    @property
+    def is_single_term(self) -> bool:
+        return len(self.steps) == 1 and self.steps[0].count == 1 and self.steps[0].term_months != NON_TERM
+
+
+class SavingsProjector:
+    def __init__(self, savings_rates: Dict[str, Any], cache_size: int = 1024, cache_ttl: int = 3600):
+        self._cache = ResponseCache(maxsize=cache_size, ttl=cache_ttl)
+        self.load(savings_rates)
+
+    def load(self, savings_rates: Dict[str, Any]) -> None:
+        """Nạp (hoặc nạp lại) bảng lãi suất; xóa cache vì kết quả phụ thuộc dữ liệu."""
+        self.savings_rates = savings_rates or {}
+        self._cache.clear()
+
+    def _min_key(self, channel: str) -> str:
+        return "min_amount_online" if channel == "online" else "min_amount"
+
+    def _terms(self, product: str, channel: str) -> List[Tuple[int, float, float]]:
+        """[(kỳ hạn, lãi suất %/năm, số tiền tối thiểu)] sắp theo kỳ hạn."""
+        pdata = self.savings_rates.get(product) or {}
+        out = []
+        for t, info in (pdata.get("terms") or {}).items():
+            rate = channel_rate(info, channel)
+            if rate is None:
+                continue
+            out.append((int(t), float(rate), float(info.get(self._min_key(channel)) or info.get("min_amount") or 0)))
+        return sorted(out)
+
+    def _non_term(self, product: str, channel: str) -> Tuple[float, float]:
+        info = (self.savings_rates.get(product) or {}).get("non_term") or {}
+        rate = channel_rate(info, channel) or 0.0
+        return float(rate), float(info.get(self._min_key(channel)) or info.get("min_amount") or 0)
+
+    def amount_bucket(self, product: str, channel: str, amount: float) -> int:
+        """Số ngưỡng tối thiểu mà `amount` vượt qua: hai số tiền cùng nhóm cho cùng kết quả DP."""
+        thresholds = sorted({m for _, _, m in self._terms(product, channel)} | {self._non_term(product, channel)[1]})
+        return sum(1 for m in thresholds if amount >= m)
+
+    def _solve(self, product: str, channel: str, amount: float, horizon: int) -> Tuple[float, Tuple[LadderStep, ...]]:
+        terms = [(t, r) for t, r, m in self._terms(product, channel) if amount >= m]
+        nt_rate, nt_min = self._non_term(product, channel)
+        nt_ok = amount >= nt_min
+
+        best = [1.0] + [0.0] * horizon
+        choice = [NON_TERM] * (horizon + 1)
+        for m in range(1, horizon + 1):
+            if nt_ok:
+                best[m] = best[m - 1] * (1.0 + nt_rate / 1200.0)
+            else:
+                best[m] = best[m - 1]
+            choice[m] = NON_TERM
+            for t, r in terms:
+                if t > m:
+                    break
+                cand = best[m - t] * (1.0 + r * t / 1200.0)
+                if cand > best[m] + 1e-12:
+                    best[m] = cand
+                    choice[m] = t
+
+        # Truy vết chuỗi kỳ hạn, gom nhóm theo kỳ hạn (dài trước, không kỳ hạn sau cùng)
+        counts: Dict[int, int] = {}
+        m = horizon
+        while m > 0:
+            t = choice[m]
+            counts[t] = counts.get(t, 0) + 1
+            m -= t if t != NON_TERM else 1
+
+        rate_by_term = dict(terms)
+        rate_by_term[NON_TERM] = nt_rate
+        steps = tuple(
+            LadderStep(term_months=t, rate=rate_by_term[t], count=c)
+            for t, c in sorted(counts.items(), key=lambda x: (x[0] == NON_TERM, -x[0]))
+        )
+        return best[horizon], steps
+
+    def optimal_ladder(self, amount: float, horizon_months: int, channel: str = "online",
+                       product: str = "Tiết kiệm thường") -> Optional[Projection]:
+        """Chuỗi kỳ hạn cho tổng tiền cuối kỳ lớn nhất sau đúng `horizon_months` tháng."""
+        if amount <= 0 or horizon_months <= 0 or product not in self.savings_rates:
+            return None
+
+        bucket = self.amount_bucket(product, channel, amount)
+        key = f"ladder:{product}:{channel}:{bucket}:{horizon_months}"
+        cached, hit = self._cache.get(key)
+        if not hit:
+            cached = self._solve(product, channel, amount, horizon_months)
+            self._cache.set(key, cached)
+
+        factor, steps = cached
+        return Projection(product, channel, amount, horizon_months, factor, steps)
+
+    def rollover(self, amount: float, term_months: int, horizon_months: int, channel: str = "online",
+                 product: str = "Tiết kiệm thường") -> Optional[Projection]:
+        """Gửi một kỳ hạn rồi tự động tái tục; phần tháng lẻ cuối cùng tính không kỳ hạn."""
+        info = {t: (r, m) for t, r, m in self._terms(product, channel)}
+        if term_months not in info or term_months > horizon_months:
+            return None
+        rate, min_amount = info[term_months]
+        if amount < min_amount:
+            return None
+
+        n, rest = divmod(horizon_months, term_months)
+        factor = (1.0 + rate * term_months / 1200.0) ** n
+        steps = [LadderStep(term_months, rate, n)]
+        if rest:
+            nt_rate, nt_min = self._non_term(product, channel)
+            if amount >= nt_min:
+                factor *= (1.0 + nt_rate / 1200.0) ** rest
+            steps.append(LadderStep(NON_TERM, nt_rate, rest))
+        return Projection(product, channel, amount, horizon_months, factor, tuple(steps))
+
+    def compare(self, amount: float, horizon_months: int, channel: str = "online",
+                product: str = "Tiết kiệm thường") -> List[Projection]:
+        """Mọi phương án tái tục một kỳ hạn, sắp theo tổng tiền cuối kỳ giảm dần."""
+        out = []
+        for t, _, _ in self._terms(product, channel):
+            p = self.rollover(amount, t, horizon_months, channel, product)
+            if p:
+                out.append(p)
+        return sorted(out, key=lambda p: p.factor, reverse=True)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
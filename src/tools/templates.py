@@ -0,0 +1,61 @@
+# src/tools/templates.py
+"""
+Template câu trả lời của các tool (bảng lãi suất, danh sách gói vay, tỷ giá...).
+
+Template được "biên dịch" một lần khi import: các dòng tĩnh liền nhau được gộp sẵn,
+các dòng có tham số giữ lại hàm `str.format_map` đã bind. Khi render chỉ cần một lần
+`"".join(...)` thay vì nối chuỗi `+=` từng dòng.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+_Segment = Union[str, Callable[..., str]]
+
+
+def _is_static(line: str) -> bool:
+    # "{{" / "}}" là dấu ngoặc thật, không phải tham số
+    return "{" not in line.replace("{{", "").replace("}}", "")
+
+
+def _compile(lines: Sequence[str]) -> List[_Segment]:
+    segments: List[_Segment] = []
+    static: List[str] = []
+    for line in lines:
+        if _is_static(line):
+            static.append(line.replace("{{", "{").replace("}}", "}"))
+            continue
+        if static:
+            segments.append("".join(static))
+            static = []
+        segments.append(line.format_map)
+    if static:
+        segments.append("".join(static))
+    return segments
+
+
+class AnswerTemplate:
+    """
+    header / row / footer: danh sách dòng dạng `str.format`.
+    `row` được lặp lại cho từng phần tử của `rows` khi render.
+    """
+    def __init__(self, header: Sequence[str] = (), row: Optional[str] = None, footer: Sequence[str] = ()):
+        self._header = _compile(header)
+        self._row = row.format_map if row else None
+        self._footer = _compile(footer)
+
+    @staticmethod
+    def _emit(segments: List[_Segment], fields: Dict[str, Any], out: List[str]) -> None:
+        for seg in segments:
+            out.append(seg if isinstance(seg, str) else seg(fields))
+
+    def render(self, rows: Iterable[Dict[str, Any]] = (), **fields: Any) -> str:
+        out: List[str] = []
+        self._emit(self._header, fields, out)
+        if self._row:
+            row = self._row
+            out.extend(row({**fields, **r}) for r in rows)
+        self._emit(self._footer, fields, out)
+        return "".join(out)
+
+
+SEPARATOR = "━━━━━━━━━━━━━━━━━━\n"